@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from CRUD.reference_data import reference_data
+from DATABASE.transaction import after_transaction, transaction_depth
+
+
+class EntityCache:
+    """
+    Bounded LRU cache with a time-to-live for single-entity reads
+    使用示例：
+    user = user_cache.get_or_load(user_id, lambda: fetch_user(user_id))
+    user_cache.invalidate(user_id, conn)   # after every write to that user
+
+    Disabled caches pass every read straight to the loader. Callers get copies,
+    so mutating a returned dict never changes the cached entry.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60.0, enabled: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()   # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._generation = 0            # bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def enable(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self.enabled = True
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            self._entries.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """Cached copy of the entity, loading it on a miss (None results are not cached)"""
+        if not self.enabled:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[key]   # expired
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        if value is not None:
+            self.put(key, value, generation)
+        return value
+
+    def put(self, key: Hashable, value: Dict, generation: Optional[int] = None):
+        """Store a copy; skipped if an invalidation happened since `generation` was read"""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (dict(value), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable, conn=None):
+        """Drop the entry; with the writing connection, again once its open transaction ends"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+        if conn is not None and transaction_depth(conn):
+            # A read on that connection before the COMMIT (or a rollback) could cache uncommitted data
+            after_transaction(conn, lambda: self.invalidate(key))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'maxsize': self.maxsize, 'enabled': self.enabled}
+
+
+# Process-wide caches in front of UserCRUD.get_user / MaterialCRUD.get_material,
+# off unless the application enables them (the desk client does at startup)
+user_cache = EntityCache()
+material_cache = EntityCache()
+
+
+def invalidate_from_event(event: Dict):
+    """Apply one change event (DATABASE/change_listener.py) to the process-wide caches"""
+    table = event.get('table')
+    if event.get('op') == 'RESET':
+        user_cache.clear()
+        material_cache.clear()
+        reference_data.invalidate()
+    elif table == 'users':
+        _invalidate_or_clear(user_cache, event.get('id'))
+    elif table == 'materials':
+        _invalidate_or_clear(material_cache, event.get('id'))
+    elif table in ('loans', 'reservations'):
+        _invalidate_or_clear(material_cache, event.get('material_id'))
+    elif table in ('user_types', 'material_types'):
+        reference_data.invalidate()
+        user_cache.clear()      # cached users carry their type's name and limits
+        material_cache.clear()
+
+
+def _invalidate_or_clear(cache: EntityCache, key):
+    # Statements that changed several rows are reported without keys (migration 0008)
+    if key is None:
+        cache.clear()
+    else:
+        cache.invalidate(key)
+
+
+def register_invalidators(listener):
+    """Subscribe the caches to a ChangeListener, so writes by other processes invalidate them"""
+    listener.subscribe(invalidate_from_event)
@@ -1,13 +1,17 @@
 from datetime import datetime
 from typing import Tuple, Union, List, Dict
 from CRUD.constants import InvoiceStatus
+from DATABASE.transaction import transaction
 from typing import Optional
+from CRUD.query_cache import writes
+from CRUD.rows import as_dict, fetch_dicts
 
 
 class InvoiceCRUD:
     def __init__(self, db_connection):
         self.conn = db_connection
 
+    @writes('invoices')
     def create(
             self,
             user_id: int,
@@ -26,19 +30,18 @@ class InvoiceCRUD:
         sql = """INSERT INTO invoices(user_id, amount, invoice_date, reason, status)
                  VALUES (%s, %s, %s, %s, %s) RETURNING invoice_id"""
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql, (
-                    user_id,
-                    amount,
-                    datetime.now(),
-                    reason,
-                    InvoiceStatus.UNPAID.value  # Default status
-                ))
-                inv_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return (True, inv_id)
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute(sql, (
+                        user_id,
+                        amount,
+                        datetime.now(),
+                        reason,
+                        InvoiceStatus.UNPAID.value  # Default status
+                    ))
+                    inv_id = cursor.fetchone()[0]
+                    return (True, inv_id)
         except Exception as e:
-            self.conn.rollback()
             return (False, str(e))
 
     def get_unpaid_by_user(self, user_id: int) -> List[Dict]:
@@ -56,9 +59,9 @@ class InvoiceCRUD:
                  ORDER BY i.invoice_date DESC"""
         with self.conn.cursor() as cursor:
             cursor.execute(sql, (user_id, InvoiceStatus.UNPAID.value))
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return fetch_dicts(cursor)
 
+    @writes('invoices')
     def mark_as_paid(self, invoice_id: int) -> Tuple[bool, str]:
         """Mark invoice as paid (without recording payment details)
         Args:
@@ -68,19 +71,64 @@ class InvoiceCRUD:
             (success, message)
         """
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(
-                    "UPDATE invoices SET status=%s WHERE invoice_id=%s",
-                    (InvoiceStatus.PAID.value, invoice_id)
-                )
-                self.conn.commit()
-                return (True, "Invoice marked as paid")
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute(
+                        "UPDATE invoices SET status=%s WHERE invoice_id=%s",
+                        (InvoiceStatus.PAID.value, invoice_id)
+                    )
+                    return (True, "Invoice marked as paid")
         except Exception as e:
-            self.conn.rollback()
             return (False, str(e))
 
-    def get_by_user(self, user_id):
-        pass
+    _WITH_PAYMENT_TOTALS = """
+        SELECT i.*,
+               COALESCE(SUM(p.amount), 0) AS paid_amount,
+               GREATEST(i.amount - COALESCE(SUM(p.amount), 0), 0) AS outstanding_amount,
+               CASE WHEN COALESCE(SUM(p.amount), 0) >= i.amount
+                    THEN 'Paid' ELSE 'Unpaid' END AS payment_status
+        FROM invoices i
+        LEFT JOIN payments p ON p.invoice_id = i.invoice_id
+        WHERE {where}
+        GROUP BY i.invoice_id
+        ORDER BY i.user_id, i.invoice_date DESC"""
+
+    def get_by_user(self, user_id: int, include_paid: bool = True) -> List[Dict]:
+        """Get a user's invoices with paid_amount, outstanding_amount and payment_status
+        Args:
+            user_id: ID of the user
+            include_paid: Also return invoices already marked as paid
+
+        Returns:
+            List of invoice records, newest first
+        """
+        return self.get_by_users([user_id], include_paid).get(user_id, [])
+
+    def get_by_users(self, user_ids: List[int], include_paid: bool = True) -> Dict[int, List[Dict]]:
+        """Get invoices with payment totals for several users in one query
+        Args:
+            user_ids: IDs of the users
+            include_paid: Also return invoices already marked as paid
+
+        Returns:
+            {user_id: list of invoice records, newest first}
+        """
+        ids = list(set(user_ids))
+        if not ids:
+            return {}
+
+        where = "i.user_id = ANY(%s)"
+        params = [ids]
+        if not include_paid:
+            where += " AND i.status = %s"
+            params.append(InvoiceStatus.UNPAID.value)
+
+        with self.conn.cursor() as cursor:
+            cursor.execute(self._WITH_PAYMENT_TOTALS.format(where=where), params)
+            invoices = {}
+            for invoice in fetch_dicts(cursor):
+                invoices.setdefault(invoice['user_id'], []).append(invoice)
+            return invoices
 
     def get_invoice(self, invoice_id):
         pass
@@ -93,8 +141,7 @@ class InvoiceCRUD:
                 cursor.execute(sql, (invoice_id,))
                 result = cursor.fetchone()
                 if result:
-                    columns = [desc[0] for desc in cursor.description]
-                    invoice = dict(zip(columns, result))
+                    invoice = as_dict(cursor, result)
                     print(f"Invoice query successful: {invoice}")
                     return invoice
                 else:
@@ -2,23 +2,53 @@ from datetime import datetime as dt_class, date, timedelta
 from typing import Tuple, Union, List, Dict, Optional
 from DATABASE.transaction import transaction
 from CRUD.constants import MaterialStatus, UserType
+from CRUD.reference_data import BorrowingRules, reference_data
+from CRUD.entity_cache import material_cache
+from CRUD.query_cache import query_cache, writes
+from CRUD.streaming import DEFAULT_BATCH_SIZE, iter_rows
+from CRUD.rows import fetch_dicts
+from CRUD.prepared import prepared_statements
 from datetime import datetime, timedelta, date
 
+# The borrow and return path runs these on every desk operation; each is planned once per connection
+OPEN_LOAN_INFO = prepared_statements.register('open_loan_info', """
+    SELECT l.material_id, l.return_date, u.user_type_id
+    FROM loans l
+    JOIN users u ON l.user_id = u.user_id
+    WHERE l.loan_id = %s AND l.actual_return_date IS NULL
+""")
+OPEN_LOAN_COUNT = prepared_statements.register('open_loan_count', """
+    SELECT COUNT(*) FROM loans
+    WHERE user_id = %s AND actual_return_date IS NULL
+""")
+# The interval type is explicit: CURRENT_DATE + <unknown> has no unique operator
+LOAN_INSERT = prepared_statements.register('loan_insert', """
+    INSERT INTO loans(user_id, material_id, loan_date, return_date)
+    VALUES (%s, %s, CURRENT_DATE, CURRENT_DATE + %s)
+    RETURNING loan_id
+""", ('integer', 'integer', 'interval'))
+LOAN_MARK_RETURNED = prepared_statements.register('loan_mark_returned', """
+    UPDATE loans
+    SET actual_return_date = %s
+    WHERE loan_id = %s
+""")
+MATERIAL_SET_STATUS = prepared_statements.register('material_set_status', """
+    UPDATE materials
+    SET status = %s
+    WHERE material_id = %s
+""")
+
 
 class LoanCRUD:
     def __init__(self, db_connection):
         self.conn = db_connection
+        self._has_overdue_table = None
 
-    def _get_borrowing_rules(self, user_type_id: int) -> Optional[dict]:
-        """Read borrowing rules from the database"""
-        with self.conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT max_borrowings, max_borrowing_days, 0.5 as late_fee_per_day 
-                FROM user_types 
-                WHERE type_id = %s
-            """, (user_type_id,))
-            return cursor.fetchone()
+    def _get_borrowing_rules(self, user_type_id: int) -> Optional[BorrowingRules]:
+        """Borrowing rules of a user type, from the reference-data cache"""
+        return reference_data.borrowing_rules(self.conn, user_type_id)
 
+    @writes('loans', 'materials')
     def create_loan(self, user_id: int, material_id: int, user_type_id: int) -> Tuple[bool, Union[int, str]]:
         """Create a borrowing record (dynamic rules version)"""
         try:
@@ -28,45 +58,33 @@ class LoanCRUD:
 
             max_books, max_days, _ = rules
 
-            with transaction(self.conn):
+            with transaction(self.conn, pipeline=True):
                 with self.conn.cursor() as cursor:
                     # Check the borrowing quantity limit
-                    cursor.execute("""
-                        SELECT COUNT(*) FROM loans 
-                        WHERE user_id = %s AND actual_return_date IS NULL
-                    """, (user_id,))
+                    prepared_statements.execute(cursor, OPEN_LOAN_COUNT, (user_id,))
                     if cursor.fetchone()[0] >= max_books:
                         return False, f"The maximum borrowing limit has been reached({max_books} books)"
 
                     # Create a borrowing record
-                    cursor.execute("""
-                        INSERT INTO loans(user_id, material_id, loan_date, return_date)
-                        VALUES (%s, %s, CURRENT_DATE, CURRENT_DATE + %s)
-                        RETURNING loan_id
-                    """, (user_id, material_id, timedelta(days=max_days)))
+                    prepared_statements.execute(cursor, LOAN_INSERT,
+                                                (user_id, material_id, timedelta(days=max_days)))
                     loan_id = cursor.fetchone()[0]
 
                     # Update the material status
-                    cursor.execute("""
-                        UPDATE materials 
-                        SET status = %s 
-                        WHERE material_id = %s
-                    """, (MaterialStatus.BORROWED.value, material_id))
+                    prepared_statements.execute(cursor, MATERIAL_SET_STATUS,
+                                                (MaterialStatus.BORROWED.value, material_id))
+                    material_cache.invalidate(material_id, self.conn)
 
                     return (True, loan_id)
         except Exception as e:
             return (False, f"Failed to borrow: {str(e)}")
 
+    @writes('loans', 'materials')
     def return_material(self, loan_id: int) -> Tuple[bool, float, str]:
         """Return of information (dynamic acquisition of overdue rates)"""
         # Get the borrowing record and user type
         with self.conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT l.material_id, l.return_date, u.user_type_id
-                FROM loans l
-                JOIN users u ON l.user_id = u.user_id
-                WHERE l.loan_id = %s AND l.actual_return_date IS NULL
-            """, (loan_id,))
+            prepared_statements.execute(cursor, OPEN_LOAN_INFO, (loan_id,))
             record = cursor.fetchone()
 
         if not record:
@@ -104,19 +122,12 @@ class LoanCRUD:
 
         # Update the database
         try:
-            with transaction(self.conn):
+            with transaction(self.conn, pipeline=True):
                 with self.conn.cursor() as cursor:
-                    cursor.execute("""
-                        UPDATE loans 
-                        SET actual_return_date = %s 
-                        WHERE loan_id = %s
-                    """, (return_date, loan_id))
-
-                    cursor.execute("""
-                        UPDATE materials 
-                        SET status = %s 
-                        WHERE material_id = %s
-                    """, (MaterialStatus.AVAILABLE.value, material_id))
+                    prepared_statements.execute(cursor, LOAN_MARK_RETURNED, (return_date, loan_id))
+                    prepared_statements.execute(cursor, MATERIAL_SET_STATUS,
+                                                (MaterialStatus.AVAILABLE.value, material_id))
+                    material_cache.invalidate(material_id, self.conn)
 
             return (True, late_fee, "The return process was successful")
         except Exception as e:
@@ -124,23 +135,68 @@ class LoanCRUD:
 
     def get_overdue_loans(self) -> List[Dict[str, Union[int, str, date]]]:
         """Get all overdue borrowing records"""
-        sql = """
-            SELECT l.*, u.name, m.material_name
-            FROM loans l
-            JOIN users u ON l.user_id = u.user_id
-            JOIN materials m ON l.material_id = m.material_id
-            WHERE l.actual_return_date IS NULL 
-              AND l.return_date < CURRENT_DATE
-            ORDER BY l.return_date
+        return query_cache.fetch(self.conn, self._overdue_sql(),
+                                 tables=('loans', 'overdue_loans', 'users', 'materials'))
+
+    def iter_overdue_loans(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Stream the overdue borrowing records, for reports and exports of any size"""
+        return iter_rows(self.conn, self._overdue_sql(), batch_size=batch_size)
+
+    def _overdue_set(self, user_id: Optional[int] = None) -> Tuple[str, List]:
         """
-        with self.conn.cursor() as cursor:
-            cursor.execute(sql)
-            return self._dict_results(cursor)
+        SQL and parameters of the open overdue loans, optionally of one user
+        (migration 0003 only; check _overdue_table_available() first)
+
+        Precomputed set plus loans that fell due since the last daily
+        roll-forward, which is empty once the job has run today. Columns:
+        loan_id, user_id, material_id, loan_date, return_date,
+        actual_return_date, name, material_name.
+        """
+        precomputed_user = "AND o.user_id = %s" if user_id is not None else ""
+        recent_user = "AND l.user_id = %s" if user_id is not None else ""
+        sql = f"""
+                SELECT o.loan_id, o.user_id, o.material_id, o.loan_date, o.return_date,
+                       NULL::date AS actual_return_date, o.name, o.material_name
+                FROM overdue_loans o
+                WHERE o.return_date < CURRENT_DATE {precomputed_user}
+                UNION ALL
+                SELECT l.loan_id, l.user_id, l.material_id, l.loan_date, l.return_date,
+                       l.actual_return_date, u.name, m.material_name
+                FROM overdue_state s
+                JOIN loans l ON l.return_date >= s.as_of
+                JOIN users u ON l.user_id = u.user_id
+                JOIN materials m ON l.material_id = m.material_id
+                WHERE l.actual_return_date IS NULL
+                  AND l.return_date < CURRENT_DATE {recent_user}
+        """
+        return sql, [user_id, user_id] if user_id is not None else []
+
+    def _overdue_sql(self) -> str:
+        if self._overdue_table_available():
+            sql = self._overdue_set()[0] + "ORDER BY return_date"
+        else:
+            sql = """
+                SELECT l.*, u.name, m.material_name
+                FROM loans l
+                JOIN users u ON l.user_id = u.user_id
+                JOIN materials m ON l.material_id = m.material_id
+                WHERE l.actual_return_date IS NULL 
+                  AND l.return_date < CURRENT_DATE
+                ORDER BY l.return_date
+            """
+        return sql
+
+    def _overdue_table_available(self) -> bool:
+        """Whether the overdue_loans table from migration 0003 exists (checked once)"""
+        if self._has_overdue_table is None:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT to_regclass('overdue_loans') IS NOT NULL")
+                self._has_overdue_table = bool(cursor.fetchone()[0])
+        return self._has_overdue_table
 
     def _dict_results(self, cursor) -> List[Dict[str, Union[int, str, date]]]:
         """Convert query results to a list of dictionaries"""
-        columns = [desc[0] for desc in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return fetch_dicts(cursor)
 
     def get_reservations_by_user(self, user_id: int) -> List[Dict]:
         """Get the user's reservation records"""
@@ -151,7 +207,7 @@ class LoanCRUD:
                 JOIN materials m ON r.material_id = m.material_id
                 WHERE r.user_id = %s
             """, (user_id,))
-            return [dict(row) for row in cursor.fetchall()]
+            return fetch_dicts(cursor)
 
     def get_active_loans_by_user(self, user_id):
         """Get the user's current unreturned borrowing records"""
@@ -167,6 +223,45 @@ class LoanCRUD:
             print(f"Error getting active loans: {str(e)}")
             return []
 
+    def get_loan_history(self, user_id: int, before: Optional[Tuple[date, int]] = None,
+                         limit: int = 50) -> List[Dict]:
+        """
+        One page of a user's borrowing records, newest first
+        使用示例：
+        page = crud.get_loan_history(user_id)
+        older = crud.get_loan_history(user_id, before=(page[-1]['loan_date'], page[-1]['loan_id']))
+
+        Keyset pagination on (loan_date, loan_id) DESC, served by the index of migration 0007
+        """
+        if before is None:
+            condition, params = "", [user_id, limit]
+        else:
+            condition, params = "AND (l.loan_date, l.loan_id) < (%s, %s)", [user_id, before[0], before[1], limit]
+
+        sql = f"""
+            SELECT l.*, m.material_name
+            FROM loans l
+            JOIN materials m ON l.material_id = m.material_id
+            WHERE l.user_id = %s {condition}
+            ORDER BY l.loan_date DESC, l.loan_id DESC
+            LIMIT %s
+        """
+        try:
+            return query_cache.fetch(self.conn, sql, params, tables=('loans', 'materials'))
+        except Exception as e:
+            print(f"Error getting loan history: {str(e)}")
+            return []
+
+    def get_loans_by_ids(self, loan_ids) -> Dict[int, Dict]:
+        """Get several borrowing records in one query - returns {loan_id: loan}"""
+        ids = list(set(loan_ids))
+        if not ids:
+            return {}
+
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT * FROM loans WHERE loan_id = ANY(%s)", (ids,))
+            return {loan['loan_id']: loan for loan in self._dict_results(cursor)}
+
     def get_active_loan_by_user_and_material(self, user_id, material_id):
         try:
             with self.conn.cursor() as cursor:
@@ -176,18 +271,14 @@ class LoanCRUD:
                 """, (user_id, material_id))
                 return cursor.fetchone()
         except Exception as e:
-            self.conn.rollback()
+            # No rollback here: inside transaction() it would end the caller's unit of work
+            print(f"Failed to get the active loan: {str(e)}")
             return None
 
     def _get_loan_info(self, loan_id):
         try:
             with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    SELECT l.material_id, l.return_date, u.user_type_id
-                    FROM loans l
-                    JOIN users u ON l.user_id = u.user_id
-                    WHERE l.loan_id = %s AND l.actual_return_date IS NULL
-                """, (loan_id,))
+                prepared_statements.execute(cursor, OPEN_LOAN_INFO, (loan_id,))
                 record = cursor.fetchone()
                 if record:
                     columns = ['material_id', 'return_date', 'user_type_id']
@@ -197,22 +288,21 @@ class LoanCRUD:
             print(f"Failed to get borrowing record: {str(e)}")
             return None
 
+    @writes('loans')
     def update_loan(self, loan_id: int, update_data: Dict) -> Tuple[bool, str]:
         """Update the borrowing record"""
         try:
             with transaction(self.conn):
-                cursor = self.conn.cursor()
-                # Remove the late_fee field
-                if 'late_fee' in update_data:
-                    del update_data['late_fee']
-
-                update_fields = ", ".join([f"{key} = %s" for key in update_data.keys()])
-                update_values = list(update_data.values()) + [loan_id]
-                sql = f"UPDATE loans SET {update_fields} WHERE loan_id = %s"
-                cursor.execute(sql, update_values)
-                self.conn.commit()
-                return True, "Borrowing record updated successfully"
+                with self.conn.cursor() as cursor:
+                    # Remove the late_fee field
+                    if 'late_fee' in update_data:
+                        del update_data['late_fee']
+
+                    update_fields = ", ".join([f"{key} = %s" for key in update_data.keys()])
+                    update_values = list(update_data.values()) + [loan_id]
+                    sql = f"UPDATE loans SET {update_fields} WHERE loan_id = %s"
+                    cursor.execute(sql, update_values)
+                    return True, "Borrowing record updated successfully"
         except Exception as e:
-            self.conn.rollback()
             return False, f"Failed to update borrowing record: {str(e)}"
 
@@ -1,10 +1,32 @@
 from CRUD.constants import MaterialStatus
+from DATABASE.transaction import transaction
+from CRUD.tokenizer import to_tsquery
+from CRUD.reference_data import reference_data
+from CRUD.entity_cache import material_cache
+from CRUD.query_cache import query_cache, writes
+from CRUD.streaming import DEFAULT_BATCH_SIZE, iter_rows
+from CRUD.rows import as_dict, fetch_dicts, merge, projection
+from CRUD.prepared import prepared_statements
 from typing import Tuple
 
+# Explicit column list, so auxiliary columns such as search_vector stay on the server
+MATERIAL_COLUMNS = ("m.material_id, m.material_name, m.author, m.publisher, "
+                    "m.publication_date, m.type_id, m.status, m.price")
+
+# Fields the list methods can project (fields=...); material_id always comes first
+MATERIAL_FIELDS = ('material_id', 'material_name', 'author', 'publisher',
+                   'publication_date', 'type_id', 'status', 'price')
+MATERIAL_DERIVED_FIELDS = {'type_name': 'type_id'}
+
+# Single-material lookups run on every desk interaction; planned once per connection
+MATERIAL_BY_ID = prepared_statements.register(
+    'material_by_id', f"SELECT {MATERIAL_COLUMNS} FROM materials m WHERE m.material_id = %s", ('integer',))
+
 
 class MaterialCRUD:
     def __init__(self, db_connection):
         self.conn = db_connection
+        self._has_search_index = None
 
         # Move the status mapping dictionary to class attributes
         self.STATUS_MAP = {
@@ -13,33 +35,31 @@ class MaterialCRUD:
             3: "Lost"
         }
 
+    @writes('materials')
     def create_material(self, name, author, publisher, material_type_id, publication_date, price, status):
         """Add new material - returns (success_status, material_id/error_message)"""
         sql = """INSERT INTO materials(material_name, author, publisher, type_id, publication_date, price, status)
                  VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING material_id"""
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql, (name, author, publisher, material_type_id, publication_date, price, status))
-                material_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return (True, material_id)
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute(sql, (name, author, publisher, material_type_id, publication_date, price, status))
+                    material_id = cursor.fetchone()[0]
+                    return (True, material_id)
         except Exception as e:
-            self.conn.rollback()
             return (False, str(e))
 
     def get_material(self, material_id):
-        """Get single material with type info - returns material dict or None"""
-        sql = """SELECT m.*, t.type_name 
-                 FROM materials m
-                 JOIN material_types t ON m.type_id = t.type_id
-                 WHERE m.material_id = %s"""
+        """Get single material with type info - returns material dict or None (read through material_cache)"""
+        return material_cache.get_or_load(material_id, lambda: self._fetch_material(material_id))
+
+    def _fetch_material(self, material_id):
         try:
             with self.conn.cursor() as cursor:
-                cursor.execute(sql, (material_id,))
-                columns = [desc[0] for desc in cursor.description]
-                material = cursor.fetchone()
+                prepared_statements.execute(cursor, MATERIAL_BY_ID, (material_id,))
+                material = as_dict(cursor, cursor.fetchone())
                 if material:
-                    material = dict(zip(columns, material))
+                    material = self._add_type_info(material)
                     # Add the status name field
                     material["status_name"] = self.STATUS_MAP.get(material.get("status"), "Unknown")
                 return material
@@ -47,22 +67,157 @@ class MaterialCRUD:
             print("Material query error:", e)
             return None
 
+    def _add_type_info(self, material):
+        """Fill in the type name from the reference-data cache instead of a join"""
+        if material.get("type_id") is None:
+            return material  # Not projected
+        info = reference_data.material_type(self.conn, material["type_id"])
+        if info:
+            material = merge(material, type_name=info.type_name)
+        return material
+
+    def get_materials_by_ids(self, material_ids):
+        """Get several materials with type info in one query - returns {material_id: material}"""
+        ids = list(set(material_ids))
+        if not ids:
+            return {}
+
+        sql = f"""SELECT {MATERIAL_COLUMNS}
+                 FROM materials m
+                 WHERE m.material_id = ANY(%s)"""
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql, (ids,))
+                materials = {}
+                for material in fetch_dicts(cursor):
+                    material = self._add_type_info(material)
+                    material["status_name"] = self.STATUS_MAP.get(material.get("status"), "Unknown")
+                    materials[material["material_id"]] = material
+                return materials
+        except Exception as e:
+            print("Materials query error:", e)
+            return {}
+
     def get_available_materials(self):
         """Get all available materials - returns list of materials"""
-        sql = """SELECT m.*, t.type_name 
+        sql = f"""SELECT {MATERIAL_COLUMNS}, t.type_name
                  FROM materials m
                  JOIN material_types t ON m.type_id = t.type_id
                  WHERE m.status = %s
                  ORDER BY m.material_id"""
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql, (MaterialStatus.AVAILABLE.value,))
-                columns = [desc[0] for desc in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return query_cache.fetch(self.conn, sql, (MaterialStatus.AVAILABLE.value,),
+                                     tables=('materials', 'material_types'))
         except Exception as e:
             print("Available materials query error:", e)
             return []
 
+    def list_materials(self, after_id=None, type_id=None, status=None, limit=50, fields=None):
+        """
+        One page of materials in id order - returns list of materials
+        使用示例：
+        page = crud.list_materials(limit=100, fields=('material_name', 'author', 'status'))
+        next_page = crud.list_materials(after_id=page[-1]['material_id'], limit=100)
+
+        Keyset pagination: the page starts right after `after_id` on the primary
+        key (or the status/type indexes of migration 0007), so every page costs
+        the same as the first one, unlike OFFSET. `fields` limits the columns to
+        what the view shows (MATERIAL_FIELDS plus type_name; default all).
+        """
+        columns = projection(fields, 'm', MATERIAL_FIELDS, MATERIAL_DERIVED_FIELDS)
+        conditions = []
+        params = []
+        if after_id is not None:
+            conditions.append("m.material_id > %s")
+            params.append(after_id)
+        if type_id is not None:
+            conditions.append("m.type_id = %s")
+            params.append(type_id)
+        if status is not None:
+            conditions.append("m.status = %s")
+            params.append(status)
+        params.append(limit)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"""SELECT {columns}
+                 FROM materials m
+                 {where}
+                 ORDER BY m.material_id
+                 LIMIT %s"""
+        try:
+            materials = query_cache.fetch(self.conn, sql, params, tables=('materials',))
+            return [self._add_type_info(material) for material in materials]
+        except Exception as e:
+            print("Material page query error:", e)
+            return []
+
+    def search(self, query, type_id=None, status=None, limit=50, offset=0):
+        """
+        Ranked catalog search - returns list of materials, best match first
+
+        Matches the full-text index on name/author/publisher (CJK-aware tokens,
+        migration 0005) and falls back to trigram-indexed substring matches on
+        name and author. Before migration 0004 only plain substring matches on
+        name and author are used, in catalog order.
+        """
+        query = (query or "").strip()
+        if not query:
+            return []
+
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        ranked = self._search_index_available()
+        if ranked:
+            conditions = ["(m.search_vector @@ q.query OR m.material_name ILIKE %s OR m.author ILIKE %s)"]
+            params = [to_tsquery(query), pattern, pattern]
+        else:
+            conditions = ["(m.material_name ILIKE %s OR m.author ILIKE %s)"]
+            params = [pattern, pattern]
+        if type_id is not None:
+            conditions.append("m.type_id = %s")
+            params.append(type_id)
+        if status is not None:
+            conditions.append("m.status = %s")
+            params.append(status)
+
+        if ranked:
+            params.extend([query, limit, offset])
+            sql = f"""SELECT {MATERIAL_COLUMNS}, t.type_name,
+                            COALESCE(ts_rank(m.search_vector, q.query), 0) AS rank
+                     FROM materials m
+                     JOIN material_types t ON m.type_id = t.type_id
+                     CROSS JOIN (SELECT CAST(%s AS tsquery)) AS q(query)
+                     WHERE {" AND ".join(conditions)}
+                     ORDER BY rank DESC, similarity(m.material_name, %s) DESC, m.material_id
+                     LIMIT %s OFFSET %s"""
+        else:
+            params.extend([limit, offset])
+            sql = f"""SELECT {MATERIAL_COLUMNS}, t.type_name
+                     FROM materials m
+                     JOIN material_types t ON m.type_id = t.type_id
+                     WHERE {" AND ".join(conditions)}
+                     ORDER BY m.material_id
+                     LIMIT %s OFFSET %s"""
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                materials = fetch_dicts(cursor)
+                for material in materials:
+                    material["status_name"] = self.STATUS_MAP.get(material.get("status"), "Unknown")
+                return materials
+        except Exception as e:
+            print("Material search error:", e)
+            return []
+
+    def _search_index_available(self) -> bool:
+        """Whether materials.search_vector from migration 0004 exists (checked once)"""
+        if self._has_search_index is None:
+            with self.conn.cursor() as cursor:
+                cursor.execute("""SELECT EXISTS (SELECT 1 FROM information_schema.columns
+                                  WHERE table_name = 'materials' AND column_name = 'search_vector')""")
+                self._has_search_index = bool(cursor.fetchone()[0])
+        return self._has_search_index
+
+    @writes('materials')
     def update_material(self, material_id: int, update_data: dict) -> Tuple[bool, str]:
         """
         Update material information in the database
@@ -75,61 +230,66 @@ class MaterialCRUD:
             Tuple of (success, message)
         """
         try:
-            cursor = self.conn.cursor()
-
-            # Prepare the SET clause for the SQL update
-            set_clause = ", ".join([f"{key} = %s" for key in update_data.keys()])
-            values = list(update_data.values())
-            values.append(material_id)  # Add material_id for WHERE clause
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    # Prepare the SET clause for the SQL update
+                    set_clause = ", ".join([f"{key} = %s" for key in update_data.keys()])
+                    values = list(update_data.values())
+                    values.append(material_id)  # Add material_id for WHERE clause
 
-            query = f"UPDATE materials SET {set_clause} WHERE material_id = %s"
-            cursor.execute(query, values)
-            self.conn.commit()
+                    query = f"UPDATE materials SET {set_clause} WHERE material_id = %s"
+                    cursor.execute(query, values)
+                    material_cache.invalidate(material_id, self.conn)
 
             return True, "Material updated successfully"
         except Exception as e:
-            self.conn.rollback()
             return False, f"Failed to update material: {str(e)}"
 
     # New deletion method
+    @writes('materials')
     def delete_material(self, material_id):
         """Delete material by ID - returns (success_status, affected_rows/error_message)"""
         sql = "DELETE FROM materials WHERE material_id = %s"
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql, (material_id,))
-                self.conn.commit()
-                return (True, cursor.rowcount)
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute(sql, (material_id,))
+                    material_cache.invalidate(material_id, self.conn)
+                    return (True, cursor.rowcount)
         except Exception as e:
-            self.conn.rollback()
             return (False, str(e))
 
     def get_all_materials(self):
         """Get all materials regardless of status"""
-        with self.conn.cursor() as cursor:
-            cursor.execute("""
+        return query_cache.fetch(self.conn, """
                 SELECT m.material_id, m.material_name, m.author, m.publisher, 
                        m.publication_date, m.price, m.status, 
-                       mt.type_name
+                       m.type_id, mt.type_name
                 FROM materials m
                 JOIN material_types mt ON m.type_id = mt.type_id
                 ORDER BY m.material_id
-            """)
-            columns = [desc[0] for desc in cursor.description]  # Get column names
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            """, tables=('materials', 'material_types'))
 
+    def iter_all_materials(self, batch_size=DEFAULT_BATCH_SIZE, fields=None):
+        """Stream all materials in id order as read-only records, one batch in memory at a time"""
+        columns = projection(fields, 'm', MATERIAL_FIELDS, MATERIAL_DERIVED_FIELDS)
+        sql = f"SELECT {columns} FROM materials m ORDER BY m.material_id"
+        for material in iter_rows(self.conn, sql, batch_size=batch_size):
+            yield self._add_type_info(material)
+
+    @writes('materials')
     def update_material_price(self, material_id, new_price):
         """Update the material price"""
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    UPDATE materials
-                    SET price = %s
-                    WHERE material_id = %s
-                """, (new_price, material_id))
-                self.conn.commit()
-                return True
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE materials
+                        SET price = %s
+                        WHERE material_id = %s
+                    """, (new_price, material_id))
+                    material_cache.invalidate(material_id, self.conn)
+                    return True
         except Exception as e:
-            self.conn.rollback()
             print(f"Error updating material price: {str(e)}")
             return False
@@ -1,12 +1,15 @@
 from datetime import datetime
 from typing import Tuple, Union, List, Dict
 from DATABASE.transaction import transaction
+from CRUD.query_cache import writes
+from CRUD.rows import fetch_dicts
 
 
 class PaymentCRUD:
     def __init__(self, db_connection):
         self.conn = db_connection
 
+    @writes('payments', 'invoices')
     def record(
             self,
             invoice_id: int,
@@ -21,7 +24,7 @@ class PaymentCRUD:
         sql_update_invoice = "UPDATE invoices SET status = 2 WHERE invoice_id = %s"
 
         try:
-            with transaction(self.conn):
+            with transaction(self.conn, pipeline=True):
                 # Verify if the invoice exists
                 with self.conn.cursor() as cursor:
                     cursor.execute("SELECT 1 FROM invoices WHERE invoice_id = %s", (invoice_id,))
@@ -56,8 +59,7 @@ class PaymentCRUD:
                  ORDER BY payment_date DESC"""
         with self.conn.cursor() as cursor:
             cursor.execute(sql, (invoice_id,))
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return fetch_dicts(cursor)
 
     def get_total_paid(self, invoice_id: int) -> float:
         """Get total amount paid towards an invoice
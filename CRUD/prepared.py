@@ -0,0 +1,166 @@
+import re
+import threading
+from typing import Dict, NamedTuple, Optional, Sequence, Set, Tuple
+
+from DATABASE.drivers import is_psycopg3
+from DATABASE.transaction import transaction_depth
+
+# SQLSTATE 26000: the session has no prepared statement of that name
+INVALID_STATEMENT_NAME = '26000'
+
+_placeholders = re.compile(r"%%|%s")
+
+
+class Statement(NamedTuple):
+    name: str
+    sql: str                      # with %s placeholders, as passed to cursor.execute
+    prepare_sql: str              # PREPARE name (types) AS ... with $n placeholders
+    param_count: int
+
+
+def _prepare_sql(name: str, sql: str, types: Sequence[str]) -> Tuple[str, int]:
+    """PREPARE statement for the query, and its number of parameters"""
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group() == '%%':
+            return '%'
+        count += 1
+        return f"${count}"
+
+    body = _placeholders.sub(number, sql)
+    if types and len(types) != count:
+        raise ValueError(f"{name}: {count} placeholders but {len(types)} parameter types")
+    signature = f" ({', '.join(types)})" if types else ""
+    return f"PREPARE {name}{signature} AS {body}", count
+
+
+class PreparedStatements:
+    """
+    Registry of named server-side prepared statements for the hot CRUD queries
+    使用示例：
+    USER_BY_ID = prepared_statements.register('user_by_id', "SELECT ... WHERE user_id = %s", ('integer',))
+    prepared_statements.execute(cursor, USER_BY_ID, (user_id,))
+
+    A statement is PREPAREd the first time it runs on a connection and then
+    executed by name, so PostgreSQL parses and plans it once per session.
+    What has been prepared is tracked per backend process: a reconnected
+    connection prepares again, and a session whose statements were dropped
+    (DISCARD ALL, DEALLOCATE) falls back to the plain query. Disabled, every
+    call is a plain cursor.execute(sql, params). On psycopg 3 connections the
+    driver's own prepared statements are used instead (execute(prepare=True)),
+    since its server-side parameters cannot be bound to an EXECUTE.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._statements: Dict[str, Statement] = {}
+        self._sessions: Dict[int, Tuple[object, Set[str]]] = {}   # id(conn) -> (backend pid, names)
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.executions = 0
+        self.fallbacks = 0
+
+    def register(self, name: str, sql: str, types: Sequence[str] = ()) -> str:
+        """Add a statement (types: optional PostgreSQL parameter types); returns its name"""
+        prepare_sql, count = _prepare_sql(name, sql, tuple(types))
+        with self._lock:
+            existing = self._statements.get(name)
+            if existing is not None and existing.sql != sql:
+                raise ValueError(f"Prepared statement {name} is already registered with other SQL")
+            self._statements[name] = Statement(name, sql, prepare_sql, count)
+        return name
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        # What sessions have prepared is kept: re-enabling must not PREPARE a name twice
+        self.enabled = False
+
+    def execute(self, cursor, name: str, params: Sequence = ()):
+        """Run a registered statement on the cursor, preparing it on first use per session"""
+        statement = self._statements[name]
+        if not self.enabled:
+            return cursor.execute(statement.sql, params)
+
+        conn = cursor.connection
+        if is_psycopg3(conn):
+            cursor.execute(statement.sql, params, prepare=True)
+            self._count('executions')
+            return
+
+        if not self._is_prepared(conn, name):
+            cursor.execute(statement.prepare_sql)
+            self._mark_prepared(conn, name)
+
+        try:
+            cursor.execute(self._execute_sql(statement), params)
+        except Exception as e:
+            if getattr(e, 'pgcode', None) != INVALID_STATEMENT_NAME:
+                raise
+            # The session lost the statement; prepare it again next time
+            self.forget(conn, name)
+            if transaction_depth(conn):
+                raise   # The open transaction is aborted; transaction() rolls it back
+            if not conn.autocommit:
+                conn.rollback()   # Only implicit read transactions run outside transaction()
+            self._count('fallbacks')
+            return cursor.execute(statement.sql, params)
+        self._count('executions')
+
+    def forget(self, conn, name: Optional[str] = None):
+        """Mark one statement (or all) as no longer prepared on the connection's session"""
+        with self._lock:
+            if name is None:
+                self._sessions.pop(id(conn), None)
+            elif id(conn) in self._sessions:
+                self._sessions[id(conn)][1].discard(name)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'statements': len(self._statements), 'sessions': len(self._sessions),
+                    'prepares': self.prepares, 'executions': self.executions,
+                    'fallbacks': self.fallbacks, 'enabled': self.enabled}
+
+    def _count(self, counter: str):
+        # Connections of several threads share the registry; += alone can lose updates
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _execute_sql(statement: Statement) -> str:
+        if not statement.param_count:
+            return f"EXECUTE {statement.name}"
+        return f"EXECUTE {statement.name} ({', '.join(['%s'] * statement.param_count)})"
+
+    def _is_prepared(self, conn, name: str) -> bool:
+        pid = _backend_pid(conn)
+        with self._lock:
+            session = self._sessions.get(id(conn))
+            return session is not None and session[0] == pid and name in session[1]
+
+    def _mark_prepared(self, conn, name: str):
+        pid = _backend_pid(conn)
+        with self._lock:
+            session = self._sessions.get(id(conn))
+            if session is None or session[0] != pid:
+                # New connection, or the same object reconnected to another backend
+                session = (pid, set())
+                self._sessions[id(conn)] = session
+            session[1].add(name)
+            self.prepares += 1
+
+
+def _backend_pid(conn) -> Optional[int]:
+    """Server process of the connection's session (read locally, no round trip)"""
+    try:
+        return conn.info.backend_pid
+    except Exception:
+        return None   # Closed or not a live connection: never matches a prepared session
+
+
+# Process-wide; off unless the application enables it (the desk client does at startup)
+prepared_statements = PreparedStatements()
@@ -0,0 +1,162 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from CRUD.rows import fetch_dicts, fetch_records
+from DATABASE.transaction import after_transaction, transaction_depth
+
+
+class TableVersions:
+    """Per-table change counters; a cached result is valid while its tables' counters are unchanged"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0     # bumped when every table must be considered changed
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def bump_all(self):
+        with self._lock:
+            self._epoch += 1
+
+    def snapshot(self, tables: Iterable[str]) -> tuple:
+        with self._lock:
+            return (self._epoch,) + tuple(self._versions.get(table, 0) for table in tables)
+
+
+def _freeze(value):
+    """Hashable form of query parameters (lists become tuples)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+class QueryCache:
+    """
+    Result cache for read queries, keyed by SQL text and parameters
+    使用示例：
+    rows = query_cache.fetch(conn, sql, params, tables=('materials', 'material_types'))
+
+    Each entry records the versions of the tables it reads; a write through the
+    CRUD layer (@writes) or a change event from another process bumps them, so
+    the next read runs the query again. Entries also expire after `ttl` seconds,
+    which covers queries that depend on CURRENT_DATE. Rows are held as compact
+    read-only records and handed out as fresh dicts.
+    """
+
+    def __init__(self, versions: TableVersions, maxsize: int = 128, ttl: Optional[float] = 300.0,
+                 enabled: bool = False):
+        self.versions = versions
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()   # (sql, params) -> (snapshot, expires_at, rows)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def enable(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self.enabled = True
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def fetch(self, conn, sql: str, params=None, tables: Iterable[str] = ()) -> List[Dict]:
+        """Rows of the query as dicts (copies), from the cache while its tables are unchanged"""
+        if not self.enabled:
+            return _execute(conn, sql, params)
+
+        tables = tuple(tables)
+        key = (sql, _freeze(params))
+        # Taken before running the query, so a write that lands meanwhile makes the entry stale
+        snapshot = self.versions.snapshot(tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == snapshot and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return [row._asdict() for row in entry[2]]
+            self.misses += 1
+
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            records = fetch_records(cursor)
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (snapshot, expires_at, records)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return [row._asdict() for row in records]
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'maxsize': self.maxsize, 'enabled': self.enabled}
+
+
+def _execute(conn, sql, params):
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return fetch_dicts(cursor)
+
+
+def writes(*tables: str):
+    """
+    Mark a CRUD write method; the tables' versions are bumped once it returns or raises,
+    and again when the enclosing transaction ends (results read before the COMMIT or a
+    rollback may hold uncommitted rows)
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            finally:
+                table_versions.bump(*tables)
+                conn = getattr(args[0], 'conn', None) if args else None
+                if conn is not None and transaction_depth(conn):
+                    after_transaction(conn, lambda: table_versions.bump(*tables))
+        return wrapper
+    return decorator
+
+
+def bump_from_event(event: Dict):
+    """Apply one change event (DATABASE/change_listener.py) to the table versions"""
+    if event.get('op') == 'RESET':
+        table_versions.bump_all()
+    elif event.get('table'):
+        table_versions.bump(event['table'])
+
+
+def register_version_bumps(listener):
+    """Subscribe the query cache to a ChangeListener, so writes by other processes invalidate it"""
+    listener.subscribe(bump_from_event)
+
+
+# Process-wide; off unless the application enables it (the desk client does at startup)
+table_versions = TableVersions()
+query_cache = QueryCache(table_versions)
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+
+class BorrowingRules(NamedTuple):
+    """Per user type limits; unpacks like the old (max, days, fee) row"""
+    max_borrowings: int
+    max_borrowing_days: int
+    late_fee_per_day: float
+
+
+class UserTypeInfo(NamedTuple):
+    type_id: int
+    type_name: str
+    max_borrowings: int
+    max_borrowing_days: int
+    late_fee_per_day: float
+
+    @property
+    def rules(self) -> BorrowingRules:
+        return BorrowingRules(self.max_borrowings, self.max_borrowing_days, self.late_fee_per_day)
+
+
+class MaterialTypeInfo(NamedTuple):
+    type_id: int
+    type_name: str
+
+
+# Hash of both tables; compared to decide whether a cached copy is stale
+_VERSION_SQL = """
+    SELECT (SELECT md5(COALESCE(string_agg(t::text, ',' ORDER BY t.type_id), '')) FROM user_types t)
+        || (SELECT md5(COALESCE(string_agg(t::text, ',' ORDER BY t.type_id), '')) FROM material_types t)
+"""
+
+
+class ReferenceData:
+    """
+    Process-wide cache of user_types and material_types
+    使用示例：
+    reference_data.load(conn)                         # once at startup
+    rules = reference_data.borrowing_rules(conn, 1)   # no query on the hot path
+
+    The tables change rarely: after `max_age` seconds the next lookup compares a
+    hash of both tables and reloads only if it differs. invalidate() forces a
+    reload, e.g. after editing the types. An id found in neither the cache nor
+    a fresh reload is remembered as missing until the tables are next reloaded.
+    """
+
+    def __init__(self, max_age: Optional[float] = 300.0):
+        self.max_age = max_age
+        self._user_types: Dict[int, UserTypeInfo] = {}
+        self._material_types: Dict[int, MaterialTypeInfo] = {}
+        self._version = None
+        self._checked_at = None   # monotonic time of the last load or version check
+        self._missing = set()     # (table, type_id) not found after a reload
+        self._lock = threading.RLock()
+
+    def load(self, conn):
+        """(Re)load both tables"""
+        with self._lock:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT type_id, type_name, max_borrowings, max_borrowing_days, late_fee_per_day
+                    FROM user_types
+                """)
+                user_types = {
+                    row[0]: UserTypeInfo(row[0], row[1], row[2], row[3], float(row[4] or 0))
+                    for row in cursor.fetchall()
+                }
+                cursor.execute("SELECT type_id, type_name FROM material_types")
+                material_types = {row[0]: MaterialTypeInfo(row[0], row[1]) for row in cursor.fetchall()}
+                cursor.execute(_VERSION_SQL)
+                version = cursor.fetchone()[0]
+
+            self._user_types = user_types
+            self._material_types = material_types
+            self._version = version
+            self._missing = set()
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Drop the cached tables; the next lookup reloads them"""
+        with self._lock:
+            self._checked_at = None
+
+    def user_type(self, conn, type_id: int) -> Optional[UserTypeInfo]:
+        return self._lookup(conn, '_user_types', type_id)
+
+    def material_type(self, conn, type_id: int) -> Optional[MaterialTypeInfo]:
+        return self._lookup(conn, '_material_types', type_id)
+
+    def borrowing_rules(self, conn, user_type_id: int) -> Optional[BorrowingRules]:
+        info = self.user_type(conn, user_type_id)
+        return info.rules if info else None
+
+    def _lookup(self, conn, table, type_id):
+        with self._lock:
+            fresh = self._refresh(conn)
+            found = getattr(self, table).get(type_id)
+            if found is None and not fresh and (table, type_id) not in self._missing:
+                # A type added since the last load
+                self.load(conn)
+                found = getattr(self, table).get(type_id)
+            if found is None:
+                # A dangling id must not reload both tables on every call
+                self._missing.add((table, type_id))
+            return found
+
+    def _refresh(self, conn) -> bool:
+        """Load or re-validate as needed; True if the tables were just read"""
+        if self._checked_at is None:
+            self.load(conn)
+            return True
+        if self.max_age is None or time.monotonic() - self._checked_at < self.max_age:
+            return False
+
+        with conn.cursor() as cursor:
+            cursor.execute(_VERSION_SQL)
+            version = cursor.fetchone()[0]
+        if version != self._version:
+            self.load(conn)
+            return True
+        self._checked_at = time.monotonic()
+        return False
+
+
+reference_data = ReferenceData()
@@ -1,11 +1,16 @@
 from datetime import datetime
 from typing import Tuple, Union, List, Dict
+from DATABASE.transaction import transaction
+from CRUD.entity_cache import material_cache
+from CRUD.query_cache import writes
+from CRUD.rows import fetch_dicts
 
 
 class ReservationCRUD:
     def __init__(self, db_connection):
         self.conn = db_connection
 
+    @writes('reservations', 'materials')
     def create(self, user_id: int, material_id: int) -> Tuple[bool, Union[int, str]]:
         """Create a new reservation
         Args:
@@ -18,24 +23,24 @@ class ReservationCRUD:
         sql = """INSERT INTO reservations(user_id, material_id, reservation_date, status)
                  VALUES (%s, %s, %s, %s) RETURNING reservation_id"""
         try:
-            with self.conn.cursor() as cursor:
-                # Check material availability first
-                cursor.execute("SELECT status FROM materials WHERE material_id=%s", (material_id,))
-                if cursor.fetchone()[0] != 1:  # 1=Available
-                    return (False, "Material not available for reservation")
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    # Check material availability first
+                    cursor.execute("SELECT status FROM materials WHERE material_id=%s", (material_id,))
+                    if cursor.fetchone()[0] != 1:  # 1=Available
+                        return (False, "Material not available for reservation")
 
-                cursor.execute(sql, (user_id, material_id, datetime.now(), 1))  # 1=Active
-                res_id = cursor.fetchone()[0]
+                    cursor.execute(sql, (user_id, material_id, datetime.now(), 1))  # 1=Active
+                    res_id = cursor.fetchone()[0]
 
-                # Update material status to Reserved (3)
-                cursor.execute("UPDATE materials SET status=3 WHERE material_id=%s", (material_id,))
-
-                self.conn.commit()
-                return (True, res_id)
+                    # Update material status to Reserved (3)
+                    cursor.execute("UPDATE materials SET status=3 WHERE material_id=%s", (material_id,))
+                    material_cache.invalidate(material_id, self.conn)
+                    return (True, res_id)
         except Exception as e:
-            self.conn.rollback()
             return (False, str(e))
 
+    @writes('reservations', 'materials')
     def cancel(self, reservation_id: int) -> Tuple[bool, str]:
         """Cancel a reservation
         Args:
@@ -45,30 +50,29 @@ class ReservationCRUD:
             (success, message)
         """
         try:
-            with self.conn.cursor() as cursor:
-                # Get associated material ID
-                cursor.execute(
-                    "SELECT material_id FROM reservations WHERE reservation_id=%s",
-                    (reservation_id,)
-                )
-                material_id = cursor.fetchone()[0]
-
-                # Delete reservation
-                cursor.execute(
-                    "DELETE FROM reservations WHERE reservation_id=%s",
-                    (reservation_id,)
-                )
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    # Get associated material ID
+                    cursor.execute(
+                        "SELECT material_id FROM reservations WHERE reservation_id=%s",
+                        (reservation_id,)
+                    )
+                    material_id = cursor.fetchone()[0]
 
-                # Revert material status to Available (1)
-                cursor.execute(
-                    "UPDATE materials SET status=1 WHERE material_id=%s",
-                    (material_id,)
-                )
+                    # Delete reservation
+                    cursor.execute(
+                        "DELETE FROM reservations WHERE reservation_id=%s",
+                        (reservation_id,)
+                    )
 
-                self.conn.commit()
-                return (True, "Reservation cancelled successfully")
+                    # Revert material status to Available (1)
+                    cursor.execute(
+                        "UPDATE materials SET status=1 WHERE material_id=%s",
+                        (material_id,)
+                    )
+                    material_cache.invalidate(material_id, self.conn)
+                    return (True, "Reservation cancelled successfully")
         except Exception as e:
-            self.conn.rollback()
             return (False, f"Failed to cancel reservation: {str(e)}")
 
     def get_active_by_user(self, user_id: int) -> List[Dict]:
@@ -87,5 +91,4 @@ class ReservationCRUD:
                  ORDER BY r.reservation_date"""
         with self.conn.cursor() as cursor:
             cursor.execute(sql, (user_id,))
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
\ No newline at end of file
+            return fetch_dicts(cursor)
\ No newline at end of file
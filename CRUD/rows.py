@@ -0,0 +1,152 @@
+import functools
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Mapping as MappingType, Optional, Sequence, Tuple
+
+
+class Record(Mapping):
+    """
+    Immutable row of a query result: the tuple of values plus a per-shape class
+    holding the column names
+    使用示例：
+    records = fetch_records(cursor)
+    records[0]['material_name'], records[0].get('author'), dict(records[0])
+
+    A read-only mapping from column name to value (lookup, get, keys, items,
+    `in`, iteration over the column names, equality with dicts) that costs a
+    tuple per row instead of a hash table. It is not a tuple: values() gives
+    the values in column order, csv.DictWriter writes it like a dict, and
+    json.dumps needs default=dict. Use merge() or _replace() to add or change fields.
+    """
+
+    __slots__ = ('_values',)
+    _fields: Tuple[str, ...] = ()
+    _index: Dict[str, int] = {}
+
+    def __init__(self, values: Sequence):
+        self._values = tuple(values)
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._index[key]]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        return default if position is None else self._values[position]
+
+    def values(self) -> Tuple:
+        return self._values
+
+    def items(self):
+        return list(zip(self._fields, self._values))
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self._fields == other._fields and self._values == other._values
+        if isinstance(other, Mapping):
+            return self._asdict() == dict(other.items())
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._values)
+
+    def __reduce__(self):
+        # Per-shape classes are not importable by name; rebuild them from the columns
+        return _rebuild, (self._fields, self._values)
+
+    def __repr__(self):
+        return "Record(" + ", ".join(f"{key}={value!r}" for key, value in self.items()) + ")"
+
+    def _asdict(self) -> Dict:
+        return dict(zip(self._fields, self._values))
+
+    def _replace(self, **fields) -> 'Record':
+        """Copy with some fields changed; unknown names are appended as new columns"""
+        added = tuple(name for name in fields if name not in self._index)
+        values = list(self._values)
+        values.extend(fields[name] for name in added)
+        for name, value in fields.items():
+            position = self._index.get(name)
+            if position is not None:
+                values[position] = value
+        cls = record_class(self._fields + added) if added else type(self)
+        return cls(values)
+
+
+@functools.lru_cache(maxsize=256)
+def record_class(fields: Tuple[str, ...]) -> type:
+    """The Record subclass for one column signature, created once and reused"""
+    return type(Record)('Record', (Record,), {
+        '__slots__': (),
+        '_fields': fields,
+        '_index': {name: position for position, name in enumerate(fields)},
+    })
+
+
+def _rebuild(fields: Tuple[str, ...], values: Tuple) -> Record:
+    return record_class(fields)(values)
+
+
+def columns(cursor) -> Tuple[str, ...]:
+    """Column names of the cursor's current result"""
+    return tuple(desc[0] for desc in cursor.description)
+
+
+def fetch_records(cursor, rows: Optional[Iterable[Sequence]] = None) -> List[Record]:
+    """All remaining rows (or the given ones) as compact, read-only records"""
+    cls = record_class(columns(cursor))
+    return [cls(row) for row in (cursor.fetchall() if rows is None else rows)]
+
+
+def fetch_dicts(cursor, rows: Optional[Iterable[Sequence]] = None) -> List[Dict]:
+    """All remaining rows (or the given ones) as mutable dicts, for callers that edit them"""
+    names = columns(cursor)
+    return [dict(zip(names, row)) for row in (cursor.fetchall() if rows is None else rows)]
+
+
+def as_dict(cursor, row: Optional[Sequence]) -> Optional[Dict]:
+    """One already fetched row as a dict, None stays None"""
+    return dict(zip(columns(cursor), row)) if row is not None else None
+
+
+def projection(fields: Optional[Iterable[str]], alias: str, allowed: Sequence[str],
+               derived: Optional[MappingType[str, str]] = None) -> str:
+    """
+    SELECT list for the fields a view needs (None: all allowed columns)
+    使用示例：
+    projection(('name', 'type_name'), 'u', USER_FIELDS, {'type_name': 'user_type_id'})
+    -> "u.user_id, u.name, u.user_type_id"
+
+    The first allowed column (the key) always leads. Derived fields are filled in
+    after the query and select the column they are computed from instead.
+    """
+    if fields is None:
+        selected = list(allowed)
+    else:
+        derived = derived or {}
+        selected = [allowed[0]]
+        for field in fields:
+            column = derived.get(field, field)
+            if column not in allowed:
+                raise ValueError(f"Unknown field: {field}")
+            if column not in selected:
+                selected.append(column)
+    return ", ".join(f"{alias}.{column}" for column in selected)
+
+
+def merge(row, **fields):
+    """Set fields on a dict in place, or return an extended copy of a read-only record"""
+    if isinstance(row, Record):
+        return row._replace(**fields)
+    row.update(fields)
+    return row
@@ -0,0 +1,71 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from CRUD.rows import fetch_dicts, fetch_records
+
+
+class _FakeCursor:
+    """Just enough of a DB-API cursor to feed the row builders"""
+
+    def __init__(self, columns, rows):
+        self.description = [(name,) for name in columns]
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+def _material_rows(count):
+    """Material-shaped result rows, as the driver would return them"""
+    return [(i, f"Title {i}", f"Author {i % 5000}", "Publisher", date(2020, 1, 1),
+             1, 1, Decimal("19.90")) for i in range(count)]
+
+
+COLUMNS = ('material_id', 'material_name', 'author', 'publisher',
+           'publication_date', 'type_id', 'status', 'price')
+
+
+def measure(build, cursor):
+    """(seconds, bytes) to build the rows; memory counts only what the result holds"""
+    gc.collect()
+    started = time.perf_counter()
+    result = build(cursor)
+    elapsed = time.perf_counter() - started
+    del result
+
+    # Traced separately: tracemalloc slows allocation down several times
+    gc.collect()
+    tracemalloc.start()
+    result = build(cursor)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, held
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare dict rows with compact records")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="result size (default 1,000,000)")
+    args = parser.parse_args(argv)
+
+    cursor = _FakeCursor(COLUMNS, _material_rows(args.rows))
+    print(f"{args.rows:,} rows x {len(COLUMNS)} columns")
+    results = {}
+    for label, build in (("dict(zip(columns, row))", fetch_dicts), ("Record (rows.py)", fetch_records)):
+        elapsed, held = measure(build, cursor)
+        results[label] = held
+        print(f"{label:25} {elapsed:7.2f} s {held / 2**20:9.1f} MiB  {held / args.rows:6.0f} B/row")
+    dict_bytes, record_bytes = results.values()
+    print(f"records hold {record_bytes / dict_bytes:.0%} of the dict memory")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import itertools
+from typing import Iterator
+
+from CRUD.rows import Record, record_class
+from DATABASE.transaction import read_only_transaction
+
+DEFAULT_BATCH_SIZE = 2000
+
+_cursor_names = itertools.count(1)
+
+
+def iter_rows(conn, sql: str, params=None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Record]:
+    """
+    Yield the rows of a query as records, `batch_size` at a time from a server-side cursor
+    使用示例：
+    writer = csv.DictWriter(out, fieldnames=MATERIAL_FIELDS)
+    for material in iter_rows(conn, "SELECT * FROM materials ORDER BY material_id"):
+        writer.writerow(material)
+
+    Only one batch is held in memory, however large the result. Named cursors
+    live inside a transaction, so the rows are read in a READ ONLY one (or the
+    caller's open transaction, which must not be pipelined); the cursor and
+    that transaction are closed when the loop ends or the generator is discarded.
+    """
+    with read_only_transaction(conn), conn.cursor(name=f"stream_{next(_cursor_names)}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(sql, params)
+        cls = None
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if cls is None:
+                # Only known once the first batch has been fetched from a named cursor
+                cls = record_class(tuple(desc[0] for desc in cursor.description))
+            for row in rows:
+                yield cls(row)
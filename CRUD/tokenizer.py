@@ -0,0 +1,66 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+# CJK ideographs, kana and hangul are written without spaces, so runs of them are
+# indexed as overlapping character bigrams; everything else as alphanumeric words.
+# The search_tokens() SQL function (migration 0005) mirrors this module exactly.
+CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_CJK_RUN = re.compile(f"[{CJK_RANGES}]+")
+_TOKEN = re.compile(f"[{CJK_RANGES}]+|[^\\W_{CJK_RANGES}]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """NFKC-normalize (full-width to half-width) and lower-case"""
+    return unicodedata.normalize('NFKC', text or "").lower()
+
+
+def is_cjk(token: str) -> bool:
+    return bool(token) and _CJK_RUN.fullmatch(token) is not None
+
+
+def words(text: Optional[str]) -> List[str]:
+    """Normalized words: alphanumeric runs and unsplit CJK runs"""
+    return _TOKEN.findall(normalize(text))
+
+
+def tokenize(text: Optional[str], for_query: bool = False) -> List[str]:
+    """
+    Split text into search tokens: Latin/digit words plus CJK character bigrams.
+
+    For indexing, each CJK run also yields its last character as a unigram, so a
+    one-character query can match any position as a prefix ('书' matches '书馆'
+    and the run-final '书' of '图书'). Queries only use bigrams for runs of two
+    or more characters, so every query token is present in a matching document.
+
+    Example:
+        tokenize("Python 图书馆") -> ['python', '图书', '书馆', '馆']
+        tokenize("Python 图书馆", for_query=True) -> ['python', '图书', '书馆']
+    """
+    tokens = []
+    for run in words(text):
+        if not is_cjk(run):
+            tokens.append(run)
+            continue
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        if len(run) == 1 or not for_query:
+            tokens.append(run[-1])
+    return tokens
+
+
+def to_tsquery(text: Optional[str], mode: str = 'and') -> Optional[str]:
+    """
+    Build tsquery text from query tokens, for use as %s::tsquery.
+    Single CJK characters become prefix matches. Returns None if nothing to search.
+    """
+    tokens = list(dict.fromkeys(tokenize(text, for_query=True)))
+    if not tokens:
+        return None
+
+    terms = []
+    for token in tokens:
+        lexeme = "'" + token.replace("\\", "\\\\").replace("'", "''") + "'"
+        if len(token) == 1 and is_cjk(token):
+            lexeme += ":*"
+        terms.append(lexeme)
+    return (" & " if mode == 'and' else " | ").join(terms)
@@ -1,57 +1,202 @@
 from typing import Tuple, Union, List, Dict
 from DATABASE.transaction import transaction  # 显式导入transaction
+from CRUD.tokenizer import to_tsquery
+from CRUD.reference_data import reference_data
+from CRUD.entity_cache import user_cache
+from CRUD.query_cache import query_cache, writes
+from CRUD.streaming import DEFAULT_BATCH_SIZE, iter_rows
+from CRUD.rows import as_dict, fetch_dicts, merge, projection
+from CRUD.prepared import prepared_statements
+
+# Explicit column list, so auxiliary columns such as search_vector stay on the server
+USER_COLUMNS = "u.user_id, u.name, u.contact, u.user_type_id"
+
+# Fields the list methods can project (fields=...); user_id always comes first
+USER_FIELDS = ('user_id', 'name', 'contact', 'user_type_id')
+USER_DERIVED_FIELDS = {'type_name': 'user_type_id', 'max_borrowings': 'user_type_id',
+                       'max_borrowing_days': 'user_type_id'}
+
+# Single-user lookups run on every desk interaction; planned once per connection
+USER_BY_ID = prepared_statements.register(
+    'user_by_id', f"SELECT {USER_COLUMNS} FROM users u WHERE u.user_id = %s", ('integer',))
 
 class UserCRUD:
     def __init__(self, db_connection):
         self.conn = db_connection  # 确保变量名一致（原错误使用了self.com）
+        self._has_search_index = None
 
+    @writes('users')
     def create_user(self, name: str, contact: str, user_type_id: int) -> Tuple[bool, Union[int, str]]:
         """创建用户（已移除冗余圆括号）"""
         sql = """INSERT INTO users(name, contact, user_type_id)
                  VALUES (%s, %s, %s) RETURNING user_id"""
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql, (name, contact, user_type_id))
-                user_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return True, user_id  # 移除冗余圆括号
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute(sql, (name, contact, user_type_id))
+                    user_id = cursor.fetchone()[0]
+                    return True, user_id  # 移除冗余圆括号
         except Exception as e:
-            self.conn.rollback()
             return False, str(e)  # 移除冗余圆括号
 
     def get_user(self, user_id):
-        """Get single user with type info - returns user dict or None"""
-        sql = """SELECT u.*, t.type_name, t.max_borrowings, t.max_borrowing_days
-                 FROM users u
-                 JOIN user_types t ON u.user_type_id = t.type_id
-                 WHERE u.user_id = %s"""
+        """Get single user with type info - returns user dict or None (read through user_cache)"""
+        return user_cache.get_or_load(user_id, lambda: self._fetch_user(user_id))
+
+    def _fetch_user(self, user_id):
         try:
             with self.conn.cursor() as cursor:
-                cursor.execute(sql, (user_id,))
-                columns = [desc[0] for desc in cursor.description]
-                user = cursor.fetchone()
-                return dict(zip(columns, user)) if user else None
+                prepared_statements.execute(cursor, USER_BY_ID, (user_id,))
+                user = as_dict(cursor, cursor.fetchone())
+                return self._add_type_info(user) if user else None
 
 
         except Exception as e:
             print("User query error:", e)
             return None
 
+    def get_users_by_ids(self, user_ids):
+        """Get several users with type info in one query - returns {user_id: user}"""
+        ids = list(set(user_ids))
+        if not ids:
+            return {}
+
+        sql = f"""SELECT {USER_COLUMNS}
+                 FROM users u
+                 WHERE u.user_id = ANY(%s)"""
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql, (ids,))
+                users = (self._add_type_info(user) for user in fetch_dicts(cursor))
+                return {user["user_id"]: user for user in users}
+        except Exception as e:
+            print("Users query error:", e)
+            return {}
+
+    def _add_type_info(self, user):
+        """Fill in the type name and limits from the reference-data cache instead of a join"""
+        if user.get("user_type_id") is None:
+            return user  # Not projected
+        info = reference_data.user_type(self.conn, user["user_type_id"])
+        if info:
+            user = merge(user, type_name=info.type_name, max_borrowings=info.max_borrowings,
+                         max_borrowing_days=info.max_borrowing_days)
+        return user
+
     def get_all_users(self):
         """Get all users with type info - returns list of users"""
-        sql = """SELECT u.*, t.type_name, t.max_borrowings
+        sql = f"""SELECT {USER_COLUMNS}, t.type_name, t.max_borrowings
                  FROM users u
                  JOIN user_types t ON u.user_type_id = t.type_id
                  ORDER BY u.user_id"""
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql)
-                columns = [desc[0] for desc in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return query_cache.fetch(self.conn, sql, tables=('users', 'user_types'))
         except Exception as e:
             print("User list query error:", e)
             return []
 
+    def list_users(self, after_id=None, user_type_id=None, limit=50, fields=None):
+        """
+        One page of users in id order - returns list of users
+        使用示例：
+        page = crud.list_users(limit=100, fields=('name', 'type_name'))
+        next_page = crud.list_users(after_id=page[-1]['user_id'], limit=100)
+
+        Keyset pagination on the primary key, so every page costs the same as the
+        first. `fields` limits the columns to what the view shows (USER_FIELDS plus
+        the type name and limits; default all).
+        """
+        columns = projection(fields, 'u', USER_FIELDS, USER_DERIVED_FIELDS)
+        conditions = []
+        params = []
+        if after_id is not None:
+            conditions.append("u.user_id > %s")
+            params.append(after_id)
+        if user_type_id is not None:
+            conditions.append("u.user_type_id = %s")
+            params.append(user_type_id)
+        params.append(limit)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"""SELECT {columns}
+                 FROM users u
+                 {where}
+                 ORDER BY u.user_id
+                 LIMIT %s"""
+        try:
+            users = query_cache.fetch(self.conn, sql, params, tables=('users',))
+            return [self._add_type_info(user) for user in users]
+        except Exception as e:
+            print("User page query error:", e)
+            return []
+
+    def iter_all_users(self, batch_size=DEFAULT_BATCH_SIZE, fields=None):
+        """Stream all users in id order as read-only records, one batch in memory at a time"""
+        columns = projection(fields, 'u', USER_FIELDS, USER_DERIVED_FIELDS)
+        sql = f"SELECT {columns} FROM users u ORDER BY u.user_id"
+        for user in iter_rows(self.conn, sql, batch_size=batch_size):
+            yield self._add_type_info(user)
+
+    def search(self, query, limit=50):
+        """
+        Ranked user search by name/contact - returns list of users, best match first
+
+        Uses the CJK-aware token index (migration 0005), falling back to
+        trigram-indexed substring matches on the name. A numeric query also
+        matches the user ID. Before migration 0005 only the substring and ID
+        matches are used.
+        """
+        query = (query or "").strip()
+        if not query:
+            return []
+
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        user_id = int(query) if query.isdigit() else None
+        if not self._search_index_available():
+            return self._search_by_name(pattern, user_id, limit)
+
+        sql = """SELECT u.user_id, u.name, u.contact, u.user_type_id, t.type_name, t.max_borrowings,
+                        COALESCE(ts_rank(u.search_vector, q.query), 0) AS rank
+                 FROM users u
+                 JOIN user_types t ON u.user_type_id = t.type_id
+                 CROSS JOIN (SELECT CAST(%s AS tsquery)) AS q(query)
+                 WHERE u.search_vector @@ q.query OR u.name ILIKE %s OR u.user_id = %s
+                 ORDER BY u.user_id = %s DESC, rank DESC, u.user_id
+                 LIMIT %s"""
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql, (to_tsquery(query), pattern, user_id, user_id, limit))
+                return fetch_dicts(cursor)
+        except Exception as e:
+            print("User search error:", e)
+            return []
+
+    def _search_by_name(self, pattern, user_id, limit):
+        """Plain substring search, for databases without the search index"""
+        sql = """SELECT u.user_id, u.name, u.contact, u.user_type_id, t.type_name, t.max_borrowings
+                 FROM users u
+                 JOIN user_types t ON u.user_type_id = t.type_id
+                 WHERE u.name ILIKE %s OR u.user_id = %s
+                 ORDER BY u.user_id = %s DESC, u.user_id
+                 LIMIT %s"""
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql, (pattern, user_id, user_id, limit))
+                return fetch_dicts(cursor)
+        except Exception as e:
+            print("User search error:", e)
+            return []
+
+    def _search_index_available(self) -> bool:
+        """Whether users.search_vector from migration 0005 exists (checked once)"""
+        if self._has_search_index is None:
+            with self.conn.cursor() as cursor:
+                cursor.execute("""SELECT EXISTS (SELECT 1 FROM information_schema.columns
+                                  WHERE table_name = 'users' AND column_name = 'search_vector')""")
+                self._has_search_index = bool(cursor.fetchone()[0])
+        return self._has_search_index
+
+    @writes('users')
     def update_user(self, user_id, name=None, contact=None, user_type_id=None):
         """Update user - returns (success_status, affected_rows/error_message)"""
         updates = []
@@ -74,14 +219,15 @@ class UserCRUD:
         sql = f"UPDATE users SET {', '.join(updates)} WHERE user_id = %s"
 
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql, params)
-                self.conn.commit()
-                return (True, cursor.rowcount)
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    user_cache.invalidate(user_id, self.conn)
+                    return (True, cursor.rowcount)
         except Exception as e:
-            self.conn.rollback()
             return (False, str(e))
 
+    @writes('users', 'loans', 'reservations', 'invoices', 'payments')
     def delete_user(self, user_id: int) -> Tuple[bool, str]:
         """安全删除用户（修正事务和缩进）"""
         try:
@@ -107,23 +253,25 @@ class UserCRUD:
                     cursor.execute("DELETE FROM reservations WHERE user_id = %s", (user_id,))
                     cursor.execute("DELETE FROM loans WHERE user_id = %s", (user_id,))
                     cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+                    user_cache.invalidate(user_id, self.conn)
 
                     return True, "The user is deleted"  # 移除冗余圆括号
         except Exception as e:
             return False, str(e)  # 移除冗余圆括号
 
+    @writes('users')
     def update_user_contact(self, user_id, new_contact):
         """更新用户联系信息"""
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    UPDATE users
-                    SET contact = %s
-                    WHERE user_id = %s
-                """, (new_contact, user_id))
-                self.conn.commit()
-                return True
+            with transaction(self.conn):
+                with self.conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE users
+                        SET contact = %s
+                        WHERE user_id = %s
+                    """, (new_contact, user_id))
+                    user_cache.invalidate(user_id, self.conn)
+                    return True
         except Exception as e:
-            self.conn.rollback()
             print(f"Error updating user contact: {str(e)}")
             return False
@@ -0,0 +1,118 @@
+import json
+import select
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from DATABASE.database import Database
+
+CHANNEL = 'library_changes'
+
+# Sent to every subscriber after (re)connecting: events may have been missed,
+# so caches should drop everything rather than trust individual invalidations
+RESET_EVENT = {'table': None, 'op': 'RESET'}
+
+
+class ChangeListener:
+    """
+    Background LISTEN on the library_changes channel (migrations 0006, 0008)
+    使用示例：
+    listener = ChangeListener()
+    listener.subscribe(lambda event: print(event), tables=['materials'])
+    listener.start()
+
+    Each notification is decoded to a dict such as
+    {'table': 'loans', 'op': 'UPDATE', 'id': 42, 'material_id': 7, 'user_id': 3}
+    and passed to the callbacks subscribed to its table, on the listener thread.
+    A statement that changed several rows arrives as one event with their
+    count instead of their keys: {'table': 'materials', 'op': 'INSERT', 'rows': 500}
+    """
+
+    def __init__(self, connect: Optional[Callable] = None, channel: str = CHANNEL,
+                 poll_interval: float = 1.0, retry_interval: float = 5.0):
+        """
+        Args:
+            connect: Zero-argument callable opening a dedicated psycopg2 connection
+                     (default: a new one from database.ini); the polling loop uses
+                     psycopg2's notifies API whichever driver the desk client runs
+            poll_interval: Seconds between checks of the stop flag while idle
+            retry_interval: Seconds to wait before reconnecting after an error
+        """
+        self._connect = connect or (lambda: psycopg2.connect(**Database()._config()))
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._subscribers: List[Tuple[Optional[frozenset], Callable[[Dict], None]]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback: Callable[[Dict], None], tables: Optional[Iterable[str]] = None):
+        """Call `callback(event)` for changes to `tables` (default: all) and for resets"""
+        with self._lock:
+            self._subscribers.append((frozenset(tables) if tables else None, callback))
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        """Stop calling `callback`, e.g. when the window it updates closes"""
+        with self._lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[1] != callback]
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='change-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def dispatch(self, event: Dict):
+        """Deliver one event to the matching subscribers; a failing callback does not stop the others"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for tables, callback in subscribers:
+            if tables is None or event.get('table') is None or event.get('table') in tables:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Change listener callback error: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                self.dispatch(dict(RESET_EVENT))
+                self._listen(conn)
+            except Exception as e:
+                print(f"Change listener error: {e}")
+                self._stop.wait(self.retry_interval)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    event = json.loads(notify.payload)
+                except ValueError:
+                    print(f"Change listener ignored payload: {notify.payload!r}")
+                    continue
+                self.dispatch(event)
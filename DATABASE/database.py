@@ -1,16 +1,197 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
 import psycopg2
+from psycopg2.pool import PoolError
 from configparser import ConfigParser
 
+from DATABASE.drivers import PSYCOPG2, connector
+from DATABASE.transaction import transaction, transaction_depth
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections"""
+
+    def __init__(self, connect, minconn=1, maxconn=5, timeout=30.0, check_interval=30.0):
+        """
+        Args:
+            connect: Zero-argument callable that opens a new connection
+            minconn: Connections opened up front and kept idle
+            maxconn: Upper bound on open connections
+            timeout: Seconds getconn() waits for a free connection
+            check_interval: Idle seconds after which a connection is pinged on checkout
+        """
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: minconn={minconn}, maxconn={maxconn}")
+
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_interval = check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()          # (connection, last_used) pairs
+        self._size = 0                # open connections, idle + checked out
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, waiting up to `timeout` seconds"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            conn, last_used = self._reserve(deadline, timeout)
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+
+            if self._is_healthy(conn, last_used):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, close=False):
+        """Return a connection; broken or unwanted connections are closed"""
+        if not close and not self._closed and not _is_closed(conn):
+            try:
+                conn.rollback()  # never hand out a connection mid-transaction
+                if conn.autocommit:
+                    conn.autocommit = False  # read sessions switch it on; pooled default is off
+            except Exception:
+                close = True
+        else:
+            close = True
+
+        if close:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def stats(self):
+        with self._cond:
+            return {'size': self._size, 'idle': len(self._idle), 'maxconn': self.maxconn}
+
+    def _reserve(self, deadline, timeout):
+        """Take an idle connection, or a slot for a new one (returned as None)"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.maxconn:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"No connection available within {timeout}s "
+                                    f"(maxconn={self.maxconn})")
+                self._cond.wait(remaining)
+
+    def _is_healthy(self, conn, last_used):
+        if _is_closed(conn):
+            return False
+        if time.monotonic() - last_used < self.check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+
+def _is_closed(conn):
+    return bool(getattr(conn, 'closed', False))
+
 
 class Database:
-    def __init__(self):
+    # Pools are shared by every Database instance with the same settings, so
+    # several windows of the desk client draw from one bounded set of sockets
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, pooled=False, minconn=None, maxconn=None, driver=None):
+        """
+        Args:
+            driver: 'psycopg2' (default) or 'psycopg' for psycopg 3 with pipeline
+                    mode and binary results; default from the optional [driver] section
+        """
         self.conn = None
+        self.pooled = pooled
+        self._driver = driver
+        self._minconn = minconn
+        self._maxconn = maxconn
+        self._local = threading.local()
+        self._pool = None
+        self._conn_pool = None   # pool self.conn was checked out from
+
+    def connect(self, autocommit=False):
+        """
+        Establish database connection
+
+        Args:
+            autocommit: Run each statement in its own transaction, so reads never
+                        leave the connection idle in transaction; writes then need
+                        an explicit transaction() scope
+        """
+        if self.pooled:
+            try:
+                self._conn_pool = self.pool
+                self.conn = self._conn_pool.getconn()
+                self.conn.autocommit = autocommit
+                return self.conn
+            except (Exception, psycopg2.DatabaseError) as error:
+                print(f"Connection failed: {error}")
+                return None
 
-    def connect(self):
-        """Establish database connection"""
         try:
-            params = self._config()
-            self.conn = psycopg2.connect(**params)
+            self.conn = self._connector()()
+            self.conn.autocommit = autocommit
 
             # Test connection
             with self.conn.cursor() as cur:
@@ -22,6 +203,125 @@ class Database:
             print(f"Connection failed: {error}")
             return None
 
+    @property
+    def pool(self):
+        """Shared connection pool for this configuration (created on first use)"""
+        # After close_pools() the remembered pool is closed; look up (or create) the new one
+        if self._pool is not None and not self._pool.closed:
+            return self._pool
+
+        params = self._config()
+        settings = self._pool_settings()
+        driver = self._driver_settings()
+        key = (tuple(sorted(params.items())), settings['minconn'], settings['maxconn'],
+               driver['driver'], driver['binary'])
+
+        with Database._pools_lock:
+            pool = Database._pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(connector(driver['driver'], params, driver['binary']), **settings)
+                Database._pools[key] = pool
+            self._pool = pool
+            return pool
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection for one operation
+        使用示例：
+        with db.connection() as conn:
+            UserCRUD(conn).get_user(1)
+
+        Nested calls on the same thread reuse the connection already checked out.
+        """
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+
+        pool = self.pool
+        conn = pool.getconn()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            pool.putconn(conn)  # rolls back, or discards a broken connection
+
+    @contextmanager
+    def read_session(self):
+        """
+        Connection for reads that never leaves a transaction open
+        使用示例：
+        with db.read_session() as conn:
+            MaterialCRUD(conn).list_materials()
+
+        Statements run in autocommit mode, each on a fresh snapshot, so a
+        long-lived client does not hold back vacuum between operations. Reads
+        that need one snapshot can use read_only_transaction(conn). Inside an
+        open write session the reads join its transaction.
+        """
+        with self._session() as conn:
+            if transaction_depth(conn):
+                yield conn
+                return
+            previous = conn.autocommit
+            conn.autocommit = True
+            try:
+                yield conn
+            finally:
+                conn.autocommit = previous
+
+    @contextmanager
+    def write_session(self):
+        """
+        Connection inside one unit of work: a single COMMIT at the end, rollback on error
+        使用示例：
+        with db.write_session() as conn:
+            LoanCRUD(conn).create_loan(user_id, material_id, user_type_id)
+        """
+        with self._session() as conn:
+            with transaction(conn):
+                yield conn
+
+    def _session(self):
+        """Pooled connection for the session, or this instance's own connection"""
+        if self.pooled:
+            return self.connection()
+        if self.conn is None or _is_closed(self.conn):
+            if self.connect() is None:
+                raise psycopg2.OperationalError("Database connection failed")
+        return nullcontext(self.conn)
+
+    def _connector(self):
+        settings = self._driver_settings()
+        return connector(settings['driver'], self._config(), settings['binary'])
+
+    def _driver_settings(self):
+        """Driver from the constructor or the optional [driver] section (name, binary)"""
+        try:
+            section = self._config(section='driver')
+        except ValueError:
+            section = {}
+
+        return {
+            'driver': self._driver or section.get('name', PSYCOPG2),
+            'binary': section.get('binary', 'true').strip().lower() in ('1', 'true', 'yes', 'on'),
+        }
+
+    def _pool_settings(self):
+        """Pool bounds from the optional [pool] section, overridden by constructor args"""
+        try:
+            section = self._config(section='pool')
+        except ValueError:
+            section = {}
+
+        return {
+            'minconn': self._minconn if self._minconn is not None else int(section.get('minconn', 1)),
+            'maxconn': self._maxconn if self._maxconn is not None else int(section.get('maxconn', 10)),
+            'timeout': float(section.get('timeout', 30)),
+        }
+
     def _config(self, filename='database.ini', section='postgresql'):
         """Read database configuration with improved error handling"""
         import os
@@ -51,7 +351,22 @@ class Database:
         return {param[0]: param[1] for param in parser.items(section)}
 
     def disconnect(self):
-        """Close database connection"""
-        if self.conn is not None:
-            self.conn.close()
-            print("Database connection closed")
\ No newline at end of file
+        """Close database connection (pooled connections go back to the pool)"""
+        if self.conn is None:
+            return
+        if self.pooled:
+            # Back to the pool it came from; a pool closed meanwhile closes it
+            self._conn_pool.putconn(self.conn)
+            self.conn = self._conn_pool = None
+            return
+        self.conn.close()
+        print("Database connection closed")
+
+    @classmethod
+    def close_pools(cls):
+        """Close every shared pool, e.g. on application exit"""
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.closeall()
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+import psycopg2
+
+try:
+    import psycopg
+except ImportError:   # psycopg 3 is optional; psycopg2 stays the default driver
+    psycopg = None
+
+PSYCOPG2 = 'psycopg2'
+PSYCOPG = 'psycopg'
+DRIVERS = (PSYCOPG2, PSYCOPG)
+
+# Errors raised by the server through either driver
+DATABASE_ERRORS = (psycopg2.DatabaseError,) + ((psycopg.DatabaseError,) if psycopg else ())
+
+
+if psycopg is not None:
+    class BinaryConnection(psycopg.Connection):
+        """psycopg 3 connection whose cursors receive results in binary format"""
+
+        def cursor(self, *args, binary=True, **kwargs):
+            return super().cursor(*args, binary=binary, **kwargs)
+
+
+def connector(driver: str, params: Dict[str, str], binary: bool = True) -> Callable[[], object]:
+    """
+    Zero-argument callable opening a connection with the given driver
+    使用示例：
+    connect = connector('psycopg', db._config())
+    conn = connect()
+
+    Both drivers accept the same [postgresql] settings and %s placeholders.
+    With psycopg 3, `binary` requests binary results (no text parsing of
+    numbers, dates and timestamps on either side).
+    """
+    if driver == PSYCOPG2:
+        return lambda: psycopg2.connect(**params)
+    if driver == PSYCOPG:
+        if psycopg is None:
+            raise ImportError("The psycopg driver needs psycopg 3 (pip install psycopg)")
+        factory = BinaryConnection if binary else psycopg.Connection
+        return lambda: factory.connect(**params)
+    raise ValueError(f"Unknown database driver: {driver} (expected one of {', '.join(DRIVERS)})")
+
+
+def is_psycopg3(conn) -> bool:
+    return psycopg is not None and isinstance(conn, psycopg.Connection)
+
+
+@contextmanager
+def pipeline(conn):
+    """
+    Send the statements of the block without waiting for each reply (psycopg 3)
+    使用示例：
+    with pipeline(conn):
+        cursor.execute("UPDATE loans ...")
+        cursor.execute("UPDATE materials ...")   # 两条语句一次往返
+
+    Results are still read in order: fetching one waits only for the
+    statements queued before it. Server-side (named) cursors cannot run in a
+    pipeline. On psycopg2, or a libpq without pipeline support, the block
+    runs statement by statement as before.
+    """
+    if is_psycopg3(conn) and psycopg.Pipeline.is_supported():
+        with conn.pipeline():
+            yield conn
+    else:
+        yield conn
+
+
+def in_pipeline(conn) -> bool:
+    """Whether the connection is inside a pipeline() block"""
+    return is_psycopg3(conn) and conn.pgconn.pipeline_status != psycopg.pq.PipelineStatus.OFF
+
+
+@contextmanager
+def pipeline_boundary(conn):
+    """
+    Inside a pipeline, wait at the end of the block for the replies to its statements
+    使用示例：
+    with pipeline_boundary(conn):
+        cursor.execute("UPDATE loans ...")   # 出错时在块结束处抛出
+
+    A failed statement of a pipeline is otherwise only reported when a later
+    result is read, at the latest at COMMIT, and leaves the pipeline aborted
+    until then. Closing a nested pipeline block syncs it: the error is raised
+    at the end of this block and the next statement runs normally. Outside a
+    pipeline the block runs unchanged.
+    """
+    if in_pipeline(conn):
+        with conn.pipeline():
+            yield conn
+    else:
+        yield conn
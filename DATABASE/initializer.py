@@ -1,10 +1,20 @@
 import psycopg2
+import argparse
 import csv
+import hashlib
+import io
+import json
 import os
+import time
 import configparser
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_DIR = os.path.join(BASE_DIR, '..', 'CSV_FILES')
 
 # 读取 database.ini 配置
-def read_db_config(filename="database.ini", section="postgresql"):
+def read_db_config(filename=os.path.join(BASE_DIR, "database.ini"), section="postgresql"):
     parser = configparser.ConfigParser()
     parser.read(filename)
 
@@ -95,6 +105,441 @@ def import_users(cursor):
                 except Exception as e:
                     print(f"插入数据时发生错误: {e}")
 
+# ---------------------------------------------------------------------------
+# 批量导入模式：COPY ... FROM STDIN 分块流式写入
+# ---------------------------------------------------------------------------
+
+def _text(value):
+    value = value.strip()
+    if not value:
+        raise ValueError("required value is empty")
+    return value
+
+
+def _optional_text(value):
+    return value.strip() or None
+
+
+def _int(value):
+    return int(value.strip())
+
+
+def _decimal(value):
+    try:
+        return Decimal(value.strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid number: {value!r}")
+
+
+def _optional_decimal(value):
+    return _decimal(value) if value.strip() else None
+
+
+def _optional_date(value):
+    value = value.strip()
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+# 每张表：CSV 文件名、目标表、按 CSV 表头顺序排列的 (列名, 校验函数)
+TABLE_SPECS = {
+    'user_types': ('UserTypes.csv', [
+        ('type_id', _int), ('type_name', _text), ('max_borrowings', _int),
+        ('max_borrowing_days', _int), ('late_fee_per_day', _decimal),
+    ]),
+    'material_types': ('MaterialTypes.csv', [
+        ('type_id', _int), ('type_name', _text),
+    ]),
+    'materials': ('Materials.csv', [
+        ('material_name', _text), ('author', _optional_text), ('publisher', _optional_text),
+        ('publication_date', _optional_date), ('type_id', _int), ('status', _int),
+        ('price', _optional_decimal),
+    ]),
+    'users': ('Users.csv', [
+        ('name', _text), ('contact', _optional_text), ('user_type_id', _int),
+    ]),
+}
+
+
+def validate_row(row, columns):
+    """Convert one CSV row with the column validators; raises ValueError on bad data"""
+    if len(row) != len(columns):
+        raise ValueError(f"expected {len(columns)} fields, got {len(row)}")
+    return [convert(value) for value, (_, convert) in zip(row, columns)]
+
+
+def _read_checkpoints(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _write_checkpoint(path, table, offset):
+    checkpoints = _read_checkpoints(path)
+    checkpoints[table] = offset
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(checkpoints, file)
+
+
+def _prune_quarantine(path, keep_through):
+    """Drop quarantined rows past the given data-row offset, so a resumed run does not record them twice"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        kept = [row for row in csv.reader(file) if row and row[0].isdigit() and int(row[0]) <= keep_through]
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        csv.writer(file).writerows(kept)
+
+
+def bulk_load(conn, table, batch_size=5000, resume_from=0, quarantine_dir=None, checkpoint_path=None):
+    """
+    Stream one CSV into its table through COPY, committing every `batch_size` rows.
+
+    Rows that fail validation go to <quarantine_dir>/<table>.rejected.csv together
+    with the reason. After each committed chunk the number of data rows consumed is
+    stored in the checkpoint file, so a failed run can resume from that offset; rows
+    quarantined after that offset are dropped first, as the resumed run reads them again.
+
+    Returns:
+        (loaded_rows, rejected_rows, seconds)
+    """
+    csv_name, columns = TABLE_SPECS[table]
+    column_names = [name for name, _ in columns]
+    copy_sql = f"COPY {table} ({', '.join(column_names)}) FROM STDIN WITH (FORMAT csv)"
+    quarantine_dir = quarantine_dir or os.path.join(CSV_DIR, 'rejected')
+    os.makedirs(quarantine_dir, exist_ok=True)
+    quarantine_path = os.path.join(quarantine_dir, f"{table}.rejected.csv")
+    _prune_quarantine(quarantine_path, resume_from)
+
+    loaded = rejected = 0
+    offset = resume_from
+    started = time.perf_counter()
+
+    with open(os.path.join(CSV_DIR, csv_name), 'r', encoding='utf-8', newline='') as source, \
+            open(quarantine_path, 'a', encoding='utf-8', newline='') as bad:
+        reader = csv.reader(source)
+        quarantine = csv.writer(bad)
+
+        header = [name.strip() for name in next(reader)]
+        if header != column_names:
+            raise ValueError(f"{csv_name} header {header} does not match {column_names}")
+
+        for _ in range(resume_from):
+            if next(reader, None) is None:
+                break
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+
+        def flush():
+            nonlocal pending
+            buffer.seek(0)
+            with conn.cursor() as cursor:
+                cursor.copy_expert(copy_sql, buffer)
+            conn.commit()
+            if checkpoint_path:
+                _write_checkpoint(checkpoint_path, table, offset)
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+        for row in reader:
+            offset += 1
+            try:
+                writer.writerow(validate_row(row, columns))
+            except ValueError as e:
+                quarantine.writerow([offset] + row + [str(e)])
+                rejected += 1
+                continue
+            pending += 1
+            loaded += 1
+            if pending >= batch_size:
+                flush()
+
+        if pending:
+            flush()
+        elif checkpoint_path:
+            _write_checkpoint(checkpoint_path, table, offset)
+
+    return loaded, rejected, time.perf_counter() - started
+
+
+def run_bulk(tables, batch_size, resume_from=None, resume=False, quarantine_dir=None):
+    """Bulk-load the given tables in dependency order and report throughput"""
+    quarantine_dir = quarantine_dir or os.path.join(CSV_DIR, 'rejected')
+    checkpoint_path = os.path.join(quarantine_dir, 'checkpoints.json')
+    os.makedirs(quarantine_dir, exist_ok=True)
+    checkpoints = _read_checkpoints(checkpoint_path) if resume else {}
+
+    conn = connect_db()
+    try:
+        for table in tables:
+            start = resume_from if resume_from is not None else checkpoints.get(table, 0)
+            loaded, rejected, seconds = bulk_load(
+                conn, table, batch_size, start, quarantine_dir, checkpoint_path)
+            rate = loaded / seconds if seconds > 0 else float(loaded)
+            print(f"{table}: {loaded} 行导入, {rejected} 行隔离, "
+                  f"{seconds:.2f}s ({rate:.0f} rows/sec), 起始偏移 {start}")
+    except Exception as e:
+        conn.rollback()
+        print(f"批量导入失败: {e}（可使用 --resume 从上次提交的位置继续）")
+        raise
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 增量同步模式：按自然键比对内容指纹，只写入变化的行
+# ---------------------------------------------------------------------------
+
+# 每张表：自然键列、只在插入时写入、同步时不覆盖的列，以及主键列
+# （materials.status 由借阅流程维护，夜间目录数据不能覆盖它）
+# 有主键列的表允许同一自然键出现多次（同一书目的多本馆藏）：第 N 次出现对应
+# 该键下主键第 N 小的行。自然键全部为空的行无法与数据库中的行对应，会被隔离。
+SYNC_SPECS = {
+    'user_types': (['type_id'], [], None),
+    'material_types': (['type_id'], [], None),
+    'materials': (['material_name', 'author', 'publisher'], ['status'], 'material_id'),
+    'users': (['contact'], [], None),
+}
+
+# 仍被引用的行不删除（保留其指纹，下次同步再尝试），以免一行失败导致整张表同步回滚
+SYNC_REFERENCES = {
+    'user_types': [('users', 'user_type_id', 'type_id')],
+    'material_types': [('materials', 'type_id', 'type_id')],
+    'materials': [('loans', 'material_id', 'material_id'), ('reservations', 'material_id', 'material_id')],
+    'users': [('loans', 'user_id', 'user_id'), ('reservations', 'user_id', 'user_id'),
+              ('invoices', 'user_id', 'user_id')],
+}
+
+COPY_COLUMN = 'copy_no'
+
+
+def _as_text(value):
+    return None if value is None else str(value)
+
+
+def _fingerprint(values):
+    return hashlib.sha1(json.dumps([_as_text(v) for v in values]).encode('utf-8')).hexdigest()
+
+
+def _copy_rows(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _key_match(left, right, key_columns):
+    return " AND ".join(f"{left}.{c} IS NOT DISTINCT FROM {right}.{c}" for c in key_columns)
+
+
+def _match_columns(table):
+    """Columns that identify one row of the table: the natural key, plus the copy number where keys repeat"""
+    key_columns, _, id_column = SYNC_SPECS[table]
+    return key_columns + [COPY_COLUMN] if id_column else key_columns
+
+
+def _target(table):
+    """The table as matched by sync, numbering the rows that share a natural key by primary key"""
+    key_columns, _, id_column = SYNC_SPECS[table]
+    if not id_column:
+        return table
+    return (f"(SELECT *, row_number() OVER (PARTITION BY {', '.join(key_columns)} "
+            f"ORDER BY {id_column}) AS {COPY_COLUMN} FROM {table})")
+
+
+def _row_match(table, alias):
+    """(extra FROM item, condition) matching rows of `table t` to the keys in `alias`"""
+    key_columns, _, id_column = SYNC_SPECS[table]
+    if not id_column:
+        return "", _key_match('t', alias, key_columns)
+    return (f", {_target(table)} n",
+            f"t.{id_column} = n.{id_column} AND {_key_match('n', alias, _match_columns(table))}")
+
+
+def _key_parts(key, key_columns):
+    """Stored key split into (natural key values, copy number values)"""
+    parts = json.loads(key)
+    return parts[:len(key_columns)], parts[len(key_columns):]
+
+
+def read_feed(table, quarantine_dir):
+    """Validate a CSV feed into {natural_key: (row_hash, values)}"""
+    csv_name, columns = TABLE_SPECS[table]
+    column_names = [name for name, _ in columns]
+    key_columns, _, id_column = SYNC_SPECS[table]
+    key_positions = [column_names.index(c) for c in key_columns]
+    feed = {}
+    copies = {}
+
+    os.makedirs(quarantine_dir, exist_ok=True)
+    with open(os.path.join(CSV_DIR, csv_name), 'r', encoding='utf-8', newline='') as source, \
+            open(os.path.join(quarantine_dir, f"{table}.rejected.csv"), 'a', encoding='utf-8', newline='') as bad:
+        reader = csv.reader(source)
+        quarantine = csv.writer(bad)
+        header = [name.strip() for name in next(reader)]
+        if header != column_names:
+            raise ValueError(f"{csv_name} header {header} does not match {column_names}")
+
+        for line, row in enumerate(reader, start=1):
+            try:
+                values = validate_row(row, columns)
+            except ValueError as e:
+                quarantine.writerow([line] + row + [str(e)])
+                continue
+            natural_key = [_as_text(values[i]) for i in key_positions]
+            if all(value is None for value in natural_key):
+                quarantine.writerow([line] + row + [f"missing natural key ({', '.join(key_columns)})"])
+                continue
+            if id_column:
+                # Another copy of the same title: numbered in feed order
+                copies[tuple(natural_key)] = copies.get(tuple(natural_key), 0) + 1
+                natural_key.append(copies[tuple(natural_key)])
+            key = json.dumps(natural_key)
+            if key in feed:
+                quarantine.writerow([line] + row + ["duplicate natural key"])
+                continue
+            feed[key] = (_fingerprint(values), values)
+    return feed
+
+
+def sync_table(conn, table, delete_missing=True, quarantine_dir=None):
+    """
+    Apply only the rows of a CSV feed that changed since the last sync.
+
+    Changed and new rows are staged with COPY into a temp table and merged with
+    INSERT ... ON CONFLICT (or UPDATE/INSERT on the natural key for tables without
+    a matching unique constraint). Keys that disappeared from the feed are deleted,
+    unless other tables still reference the row. Rows already present without a
+    fingerprint (e.g. from the insert mode) are matched by natural key and adopted
+    instead of duplicated.
+
+    Returns:
+        (changed_rows, deleted_rows, unchanged_rows)
+    """
+    _, columns = TABLE_SPECS[table]
+    column_names = [name for name, _ in columns]
+    key_columns, insert_only, id_column = SYNC_SPECS[table]
+    match_columns = _match_columns(table)
+    update_columns = [c for c in column_names if c not in key_columns and c not in insert_only]
+    feed = read_feed(table, quarantine_dir or os.path.join(CSV_DIR, 'rejected'))
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT natural_key, row_hash FROM csv_sync_fingerprints WHERE table_name = %s",
+                       (table,))
+        stored = dict(cursor.fetchall())
+
+    changed = [(key, row_hash, values) for key, (row_hash, values) in feed.items()
+               if stored.get(key) != row_hash]
+    deleted = [key for key in stored if key not in feed] if delete_missing else []
+    if not changed and not deleted:
+        return 0, 0, len(feed)
+
+    cols = ", ".join(column_names)
+    removed = 0
+    try:
+        with conn.cursor() as cursor:
+            if changed:
+                cursor.execute(f"CREATE TEMP TABLE sync_stage ON COMMIT DROP AS "
+                               f"SELECT {cols} FROM {table} WITH NO DATA")
+                cursor.execute("ALTER TABLE sync_stage ADD COLUMN natural_key text, ADD COLUMN row_hash text")
+                stage_columns = column_names + ['natural_key', 'row_hash']
+                if id_column:
+                    cursor.execute(f"ALTER TABLE sync_stage ADD COLUMN {COPY_COLUMN} integer")
+                    stage_columns.append(COPY_COLUMN)
+                _copy_rows(cursor, 'sync_stage', stage_columns,
+                           [values + [key, row_hash] + _key_parts(key, key_columns)[1]
+                            for key, row_hash, values in changed])
+
+                set_clause = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+                if key_columns == ['type_id']:
+                    cursor.execute(f"""
+                        INSERT INTO {table} ({cols}) SELECT {cols} FROM sync_stage
+                        ON CONFLICT (type_id) DO UPDATE SET {set_clause}
+                    """)
+                else:
+                    if update_columns:
+                        numbered, row_match = _row_match(table, 's')
+                        cursor.execute(f"""
+                            UPDATE {table} t
+                            SET {", ".join(f"{c} = s.{c}" for c in update_columns)}
+                            FROM sync_stage s{numbered}
+                            WHERE {row_match}
+                        """)
+                    cursor.execute(f"""
+                        INSERT INTO {table} ({cols})
+                        SELECT {cols} FROM sync_stage s
+                        WHERE NOT EXISTS (SELECT 1 FROM {_target(table)} t
+                                          WHERE {_key_match('t', 's', match_columns)})
+                    """)
+
+                cursor.execute("""
+                    INSERT INTO csv_sync_fingerprints(table_name, natural_key, row_hash)
+                    SELECT %s, natural_key, row_hash FROM sync_stage
+                    ON CONFLICT (table_name, natural_key)
+                    DO UPDATE SET row_hash = EXCLUDED.row_hash, synced_at = CURRENT_TIMESTAMP
+                """, (table,))
+
+            if deleted:
+                keys = ", ".join(key_columns)
+                cursor.execute(f"CREATE TEMP TABLE sync_deleted ON COMMIT DROP AS "
+                               f"SELECT {keys} FROM {table} WITH NO DATA")
+                cursor.execute("ALTER TABLE sync_deleted ADD COLUMN natural_key text")
+                if id_column:
+                    cursor.execute(f"ALTER TABLE sync_deleted ADD COLUMN {COPY_COLUMN} integer")
+                # Fingerprints recorded with an older key shape name no single row: only they are dropped
+                legacy = [key for key in deleted if len(json.loads(key)) != len(match_columns)]
+                _copy_rows(cursor, 'sync_deleted', key_columns + ['natural_key'] + match_columns[len(key_columns):],
+                           [natural + [key] + copy for key in deleted if key not in legacy
+                            for natural, copy in [_key_parts(key, key_columns)]])
+
+                numbered, row_match = _row_match(table, 'd')
+                unreferenced = "".join(
+                    f" AND NOT EXISTS (SELECT 1 FROM {ref_table} r WHERE r.{ref_column} = t.{column})"
+                    for ref_table, ref_column, column in SYNC_REFERENCES.get(table, []))
+                cursor.execute(f"""
+                    WITH gone AS (
+                        DELETE FROM {table} t USING sync_deleted d{numbered}
+                        WHERE {row_match}{unreferenced}
+                        RETURNING d.natural_key
+                    )
+                    DELETE FROM csv_sync_fingerprints f
+                    WHERE f.table_name = %s
+                      AND (f.natural_key IN (SELECT natural_key FROM gone) OR f.natural_key = ANY(%s))
+                """, (table, legacy))
+                removed = cursor.rowcount - len(legacy)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return len(changed), removed, len(feed) - len(changed)
+
+
+def run_sync(tables, delete_missing=True, quarantine_dir=None):
+    """Sync the given tables in dependency order and report what changed"""
+    conn = connect_db()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('csv_sync_fingerprints')")
+            if cursor.fetchone()[0] is None:
+                raise RuntimeError("csv_sync_fingerprints 表不存在，请先运行 python DATABASE/migrate.py up")
+        conn.rollback()
+
+        for table in tables:
+            started = time.perf_counter()
+            changed, deleted, unchanged = sync_table(conn, table, delete_missing, quarantine_dir)
+            print(f"{table}: {changed} 行新增/更新, {deleted} 行删除, {unchanged} 行未变化, "
+                  f"{time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"增量同步失败: {e}")
+        raise
+    finally:
+        conn.close()
+
+
 def main():
     try:
         conn = connect_db()
@@ -118,4 +563,26 @@ def main():
         conn.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Import the CSV files in CSV_FILES")
+    parser.add_argument('--mode', choices=['insert', 'bulk', 'sync'], default='insert',
+                        help="insert: row-by-row INSERT (default); bulk: streaming COPY; "
+                             "sync: apply only rows changed since the last sync")
+    parser.add_argument('--table', choices=list(TABLE_SPECS), action='append',
+                        help="limit the bulk load or sync to these tables (repeatable)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="rows per COPY chunk")
+    parser.add_argument('--resume-from', type=int, default=None,
+                        help="skip this many data rows of each selected CSV")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from the offsets recorded by the last bulk run")
+    parser.add_argument('--quarantine-dir', default=None, help="where rejected rows are written")
+    parser.add_argument('--keep-missing', action='store_true',
+                        help="sync: keep rows whose key disappeared from the feed")
+    args = parser.parse_args()
+
+    if args.mode == 'sync':
+        run_sync(args.table or list(TABLE_SPECS), not args.keep_missing, args.quarantine_dir)
+    elif args.mode == 'bulk':
+        run_bulk(args.table or list(TABLE_SPECS), args.batch_size,
+                 args.resume_from, args.resume, args.quarantine_dir)
+    else:
+        main()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DATABASE.database import Database
+from DATABASE.transaction import transaction
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+_FILE_PATTERN = re.compile(r'^(\d{4})_(\w+)\.(up|down)\.sql$')
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    up_path: Path
+    down_path: Optional[Path]
+
+
+# (label, query, index the planner must be able to use)
+HOT_QUERIES = [
+    ("active loans by user",
+     "SELECT * FROM loans WHERE user_id = 1 AND actual_return_date IS NULL",
+     "idx_loans_open_by_user"),
+    ("overdue loans",
+     "SELECT * FROM loans WHERE actual_return_date IS NULL AND return_date < CURRENT_DATE "
+     "ORDER BY return_date",
+     "idx_loans_open_by_due"),
+    ("active reservations by user",
+     "SELECT * FROM reservations WHERE user_id = 1 AND status = 1 ORDER BY reservation_date",
+     "idx_reservations_active_by_user"),
+    ("total paid per invoice",
+     "SELECT COALESCE(SUM(amount), 0) FROM payments WHERE invoice_id = 1",
+     "idx_payments_invoice"),
+    ("unpaid invoices by user",
+     "SELECT * FROM invoices WHERE user_id = 1 AND status = 1 ORDER BY invoice_date DESC",
+     "idx_invoices_unpaid_by_user"),
+    ("loan history page by user",
+     "SELECT * FROM loans WHERE user_id = 1 AND (loan_date, loan_id) < (CURRENT_DATE, 100) "
+     "ORDER BY loan_date DESC, loan_id DESC LIMIT 50",
+     "idx_loans_user_history"),
+    ("available materials page",
+     "SELECT * FROM materials WHERE status = 1 AND material_id > 100 ORDER BY material_id LIMIT 50",
+     "idx_materials_status_id"),
+]
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Find NNNN_name.up.sql / NNNN_name.down.sql pairs, ordered by version"""
+    found = {}
+    for path in directory.glob('*.sql'):
+        match = _FILE_PATTERN.match(path.name)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        entry = found.setdefault(version, {'name': name})
+        entry[direction] = path
+
+    migrations = []
+    for version in sorted(found):
+        entry = found[version]
+        if 'up' not in entry:
+            raise ValueError(f"Migration {version:04d} has no up script")
+        migrations.append(Migration(version, entry['name'], entry['up'], entry.get('down')))
+    return migrations
+
+
+def ensure_version_table(conn):
+    with transaction(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version integer PRIMARY KEY,
+                    name character varying(255) NOT NULL,
+                    applied_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL
+                )
+            """)
+
+
+def applied_versions(conn) -> List[int]:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT version FROM schema_migrations ORDER BY version")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def upgrade(conn, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to `target` (default: latest), one transaction each"""
+    ensure_version_table(conn)
+    done = set(applied_versions(conn))
+    applied = []
+
+    for migration in discover():
+        if target is not None and migration.version > target:
+            break
+        if migration.version in done:
+            continue
+        with transaction(conn):
+            with conn.cursor() as cursor:
+                cursor.execute(migration.up_path.read_text(encoding='utf-8'))
+                cursor.execute(
+                    "INSERT INTO schema_migrations(version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name)
+                )
+        print(f"Applied {migration.version:04d}_{migration.name}")
+        applied.append(migration)
+    return applied
+
+
+def downgrade(conn, target: int) -> List[Migration]:
+    """Revert applied migrations newer than `target`, newest first"""
+    ensure_version_table(conn)
+    done = set(applied_versions(conn))
+    reverted = []
+
+    for migration in reversed(discover()):
+        if migration.version <= target or migration.version not in done:
+            continue
+        if migration.down_path is None:
+            raise ValueError(f"Migration {migration.version:04d} cannot be reverted (no down script)")
+        with transaction(conn):
+            with conn.cursor() as cursor:
+                cursor.execute(migration.down_path.read_text(encoding='utf-8'))
+                cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (migration.version,))
+        print(f"Reverted {migration.version:04d}_{migration.name}")
+        reverted.append(migration)
+    return reverted
+
+
+def _plan_indexes(plan) -> List[str]:
+    """Collect every 'Index Name' in an EXPLAIN (FORMAT JSON) plan tree"""
+    names = []
+    if 'Index Name' in plan:
+        names.append(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        names.extend(_plan_indexes(child))
+    return names
+
+
+def check_hot_query_plans(conn) -> List[Tuple[str, str, bool]]:
+    """
+    EXPLAIN each hot query and report whether its index is used.
+    Sequential scans are disabled for the check so small development
+    databases still show whether the index is usable for the predicate.
+    """
+    results = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for label, query, index_name in HOT_QUERIES:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                used = index_name in _plan_indexes(plan[0]['Plan'])
+                results.append((label, index_name, used))
+    finally:
+        conn.rollback()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Library schema migrations")
+    commands = parser.add_subparsers(dest='command', required=True)
+    up = commands.add_parser('up', help="apply pending migrations")
+    up.add_argument('--to', type=int, default=None, help="stop at this version")
+    down = commands.add_parser('down', help="revert migrations")
+    down.add_argument('--to', type=int, required=True, help="revert everything newer than this version")
+    commands.add_parser('status', help="list migrations and whether they are applied")
+    commands.add_parser('check', help="verify the hot queries use their indexes")
+    args = parser.parse_args(argv)
+
+    db = Database()
+    conn = db.connect()
+    if not conn:
+        return 1
+
+    try:
+        if args.command == 'up':
+            upgrade(conn, args.to)
+        elif args.command == 'down':
+            downgrade(conn, args.to)
+        elif args.command == 'status':
+            ensure_version_table(conn)
+            done = set(applied_versions(conn))
+            for migration in discover():
+                mark = "applied" if migration.version in done else "pending"
+                print(f"{migration.version:04d}_{migration.name}: {mark}")
+        elif args.command == 'check':
+            ok = True
+            for label, index_name, used in check_hot_query_plans(conn):
+                print(f"{'OK  ' if used else 'MISS'} {label}: {index_name}")
+                ok = ok and used
+            return 0 if ok else 1
+        return 0
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
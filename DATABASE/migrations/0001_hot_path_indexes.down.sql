@@ -0,0 +1,5 @@
+DROP INDEX IF EXISTS idx_invoices_unpaid_by_user;
+DROP INDEX IF EXISTS idx_payments_invoice;
+DROP INDEX IF EXISTS idx_reservations_active_by_user;
+DROP INDEX IF EXISTS idx_loans_open_by_due;
+DROP INDEX IF EXISTS idx_loans_open_by_user;
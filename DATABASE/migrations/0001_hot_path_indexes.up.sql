@@ -0,0 +1,26 @@
+-- Secondary indexes for the hot lookup predicates of the CRUD layer.
+-- The base dump only ships primary and foreign keys.
+
+-- LoanCRUD.get_active_loans_by_user, UserCRUD.delete_user
+CREATE INDEX IF NOT EXISTS idx_loans_open_by_user
+    ON loans (user_id)
+    WHERE actual_return_date IS NULL;
+
+-- LoanCRUD.get_overdue_loans, LoanService.get_overdue_loans_by_user
+CREATE INDEX IF NOT EXISTS idx_loans_open_by_due
+    ON loans (return_date, user_id)
+    WHERE actual_return_date IS NULL;
+
+-- ReservationCRUD.get_active_by_user (status 1 = active)
+CREATE INDEX IF NOT EXISTS idx_reservations_active_by_user
+    ON reservations (user_id, reservation_date)
+    WHERE status = 1;
+
+-- PaymentCRUD.get_total_paid, PaymentCRUD.get_by_invoice
+CREATE INDEX IF NOT EXISTS idx_payments_invoice
+    ON payments (invoice_id, payment_date);
+
+-- InvoiceCRUD.get_unpaid_by_user (status 1 = unpaid)
+CREATE INDEX IF NOT EXISTS idx_invoices_unpaid_by_user
+    ON invoices (user_id, invoice_date DESC)
+    WHERE status = 1;
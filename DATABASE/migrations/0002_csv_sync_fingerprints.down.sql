@@ -0,0 +1 @@
+DROP TABLE IF EXISTS csv_sync_fingerprints;
@@ -0,0 +1,9 @@
+-- Content fingerprints of the last CSV feed applied by initializer.py --mode sync,
+-- keyed by each table's natural key (JSON array of the key column values).
+CREATE TABLE IF NOT EXISTS csv_sync_fingerprints (
+    table_name character varying(63) NOT NULL,
+    natural_key text NOT NULL,
+    row_hash character(40) NOT NULL,
+    synced_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (table_name, natural_key)
+);
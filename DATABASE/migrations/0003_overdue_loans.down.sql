@@ -0,0 +1,9 @@
+DROP MATERIALIZED VIEW IF EXISTS overdue_loans_mv;
+DROP FUNCTION IF EXISTS overdue_roll_forward();
+DROP TRIGGER IF EXISTS trg_overdue_loans_material_name ON materials;
+DROP TRIGGER IF EXISTS trg_overdue_loans_user_name ON users;
+DROP FUNCTION IF EXISTS overdue_loans_rename();
+DROP TRIGGER IF EXISTS trg_overdue_loans_sync ON loans;
+DROP FUNCTION IF EXISTS overdue_loans_sync();
+DROP TABLE IF EXISTS overdue_loans;
+DROP TABLE IF EXISTS overdue_state;
@@ -0,0 +1,122 @@
+-- Incrementally maintained set of overdue loans.
+-- Invariant: overdue_loans holds every open loan whose return_date is before
+-- overdue_state.as_of. Triggers keep it current on borrow/return/pay, and the
+-- daily job (DATABASE/overdue_job.py) rolls as_of forward to today.
+
+CREATE TABLE IF NOT EXISTS overdue_state (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    as_of date NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS overdue_loans (
+    loan_id integer PRIMARY KEY REFERENCES loans(loan_id) ON DELETE CASCADE,
+    user_id integer NOT NULL,
+    material_id integer NOT NULL,
+    loan_date date NOT NULL,
+    return_date date NOT NULL,
+    name character varying(100) NOT NULL,
+    material_name character varying(255) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_overdue_loans_user ON overdue_loans (user_id, return_date);
+
+INSERT INTO overdue_state (id, as_of) VALUES (true, CURRENT_DATE)
+ON CONFLICT (id) DO NOTHING;
+
+INSERT INTO overdue_loans (loan_id, user_id, material_id, loan_date, return_date, name, material_name)
+SELECT l.loan_id, l.user_id, l.material_id, l.loan_date, l.return_date, u.name, m.material_name
+FROM loans l
+JOIN users u ON l.user_id = u.user_id
+JOIN materials m ON l.material_id = m.material_id
+WHERE l.actual_return_date IS NULL
+  AND l.return_date < (SELECT as_of FROM overdue_state)
+ON CONFLICT (loan_id) DO NOTHING;
+
+-- Borrow (INSERT), return and pay (UPDATE of actual_return_date), due date changes
+CREATE OR REPLACE FUNCTION overdue_loans_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        DELETE FROM overdue_loans WHERE loan_id = OLD.loan_id;
+    END IF;
+
+    IF NEW.actual_return_date IS NULL
+       AND NEW.return_date < (SELECT as_of FROM overdue_state) THEN
+        INSERT INTO overdue_loans (loan_id, user_id, material_id, loan_date, return_date, name, material_name)
+        SELECT NEW.loan_id, NEW.user_id, NEW.material_id, NEW.loan_date, NEW.return_date,
+               u.name, m.material_name
+        FROM users u, materials m
+        WHERE u.user_id = NEW.user_id AND m.material_id = NEW.material_id
+        ON CONFLICT (loan_id) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_overdue_loans_sync ON loans;
+CREATE TRIGGER trg_overdue_loans_sync
+    AFTER INSERT OR UPDATE OF user_id, material_id, loan_date, return_date, actual_return_date ON loans
+    FOR EACH ROW EXECUTE FUNCTION overdue_loans_sync();
+
+-- Keep the denormalised names in step with renames
+CREATE OR REPLACE FUNCTION overdue_loans_rename() RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'users' THEN
+        UPDATE overdue_loans SET name = NEW.name WHERE user_id = NEW.user_id;
+    ELSE
+        UPDATE overdue_loans SET material_name = NEW.material_name WHERE material_id = NEW.material_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_overdue_loans_user_name ON users;
+CREATE TRIGGER trg_overdue_loans_user_name
+    AFTER UPDATE OF name ON users
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION overdue_loans_rename();
+
+DROP TRIGGER IF EXISTS trg_overdue_loans_material_name ON materials;
+CREATE TRIGGER trg_overdue_loans_material_name
+    AFTER UPDATE OF material_name ON materials
+    FOR EACH ROW WHEN (OLD.material_name IS DISTINCT FROM NEW.material_name)
+    EXECUTE FUNCTION overdue_loans_rename();
+
+-- Daily job: add the loans that fell due since the last run, then advance as_of.
+-- Only touches open loans due in [as_of, today), via idx_loans_open_by_due.
+CREATE OR REPLACE FUNCTION overdue_roll_forward() RETURNS integer AS $$
+DECLARE
+    previous date;
+    added integer;
+BEGIN
+    SELECT as_of INTO previous FROM overdue_state FOR UPDATE;
+    IF previous >= CURRENT_DATE THEN
+        RETURN 0;
+    END IF;
+
+    INSERT INTO overdue_loans (loan_id, user_id, material_id, loan_date, return_date, name, material_name)
+    SELECT l.loan_id, l.user_id, l.material_id, l.loan_date, l.return_date, u.name, m.material_name
+    FROM loans l
+    JOIN users u ON l.user_id = u.user_id
+    JOIN materials m ON l.material_id = m.material_id
+    WHERE l.actual_return_date IS NULL
+      AND l.return_date >= previous
+      AND l.return_date < CURRENT_DATE
+    ON CONFLICT (loan_id) DO NOTHING;
+    GET DIAGNOSTICS added = ROW_COUNT;
+
+    UPDATE overdue_state SET as_of = CURRENT_DATE;
+    RETURN added;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Full recomputation used by the fallback path (overdue_job.py --refresh),
+-- refreshed CONCURRENTLY so readers are never blocked.
+CREATE MATERIALIZED VIEW IF NOT EXISTS overdue_loans_mv AS
+SELECT l.loan_id, l.user_id, l.material_id, l.loan_date, l.return_date, u.name, m.material_name
+FROM loans l
+JOIN users u ON l.user_id = u.user_id
+JOIN materials m ON l.material_id = m.material_id
+WHERE l.actual_return_date IS NULL
+  AND l.return_date < CURRENT_DATE;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_overdue_loans_mv_loan ON overdue_loans_mv (loan_id);
@@ -0,0 +1,6 @@
+DROP INDEX IF EXISTS idx_materials_author_trgm;
+DROP INDEX IF EXISTS idx_materials_name_trgm;
+DROP INDEX IF EXISTS idx_materials_search;
+DROP TRIGGER IF EXISTS trg_materials_search_vector ON materials;
+DROP FUNCTION IF EXISTS materials_search_vector();
+ALTER TABLE materials DROP COLUMN IF EXISTS search_vector;
@@ -0,0 +1,27 @@
+-- Full-text search over the catalog: a weighted tsvector column kept current by
+-- trigger with a GIN index, plus trigram indexes for substring matches.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE materials ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION materials_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.material_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.author, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.publisher, '')), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_materials_search_vector ON materials;
+CREATE TRIGGER trg_materials_search_vector
+    BEFORE INSERT OR UPDATE OF material_name, author, publisher ON materials
+    FOR EACH ROW EXECUTE FUNCTION materials_search_vector();
+
+-- Backfill existing rows through the trigger
+UPDATE materials SET material_name = material_name;
+
+CREATE INDEX IF NOT EXISTS idx_materials_search ON materials USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS idx_materials_name_trgm ON materials USING gin (material_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_materials_author_trgm ON materials USING gin (author gin_trgm_ops);
@@ -0,0 +1,24 @@
+DROP INDEX IF EXISTS idx_users_name_trgm;
+DROP INDEX IF EXISTS idx_users_search;
+DROP TRIGGER IF EXISTS trg_users_search_vector ON users;
+DROP FUNCTION IF EXISTS users_search_vector();
+ALTER TABLE users DROP COLUMN IF EXISTS search_vector;
+
+-- Restore the 0004 word-based vectors
+CREATE OR REPLACE FUNCTION materials_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.material_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.author, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.publisher, '')), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+UPDATE materials
+SET search_vector =
+    setweight(to_tsvector('simple', coalesce(material_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(author, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(publisher, '')), 'C');
+
+DROP FUNCTION IF EXISTS search_tokens(text);
@@ -0,0 +1,75 @@
+-- CJK-aware search tokens. to_tsvector('simple') treats an unsegmented Chinese
+-- title as one lexeme, so the search vectors are rebuilt from search_tokens(),
+-- which mirrors CRUD/tokenizer.py: alphanumeric words plus overlapping bigrams
+-- of CJK runs, each run also contributing its last character (so one-character
+-- queries can use prefix matching).
+CREATE OR REPLACE FUNCTION search_tokens(input text) RETURNS text[] AS $$
+DECLARE
+    cjk CONSTANT text := '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff';
+    tokens text[] := '{}';
+    word text;
+    i integer;
+BEGIN
+    FOR word IN
+        SELECT part
+        FROM regexp_split_to_table(
+                 regexp_replace(lower(normalize(coalesce(input, ''), NFKC)),
+                                '([' || cjk || ']+)', ' \1 ', 'g'),
+                 '[^[:alnum:]' || cjk || ']+') AS part
+        WHERE part <> ''
+    LOOP
+        IF word ~ ('^[' || cjk || ']+$') THEN
+            FOR i IN 1 .. length(word) - 1 LOOP
+                tokens := tokens || substr(word, i, 2);
+            END LOOP;
+            tokens := tokens || substr(word, length(word), 1);
+        ELSE
+            tokens := tokens || word;
+        END IF;
+    END LOOP;
+    RETURN tokens;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION materials_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(array_to_tsvector(search_tokens(NEW.material_name)), 'A') ||
+        setweight(array_to_tsvector(search_tokens(NEW.author)), 'B') ||
+        setweight(array_to_tsvector(search_tokens(NEW.publisher)), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill directly rather than through the trigger, so the overdue_loans
+-- rename trigger on material_name is not fired for every row
+UPDATE materials
+SET search_vector =
+    setweight(array_to_tsvector(search_tokens(material_name)), 'A') ||
+    setweight(array_to_tsvector(search_tokens(author)), 'B') ||
+    setweight(array_to_tsvector(search_tokens(publisher)), 'C');
+
+-- Same treatment for borrower names and contacts at the desk
+ALTER TABLE users ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION users_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(array_to_tsvector(search_tokens(NEW.name)), 'A') ||
+        setweight(array_to_tsvector(search_tokens(NEW.contact)), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_search_vector ON users;
+CREATE TRIGGER trg_users_search_vector
+    BEFORE INSERT OR UPDATE OF name, contact ON users
+    FOR EACH ROW EXECUTE FUNCTION users_search_vector();
+
+UPDATE users
+SET search_vector =
+    setweight(array_to_tsvector(search_tokens(name)), 'A') ||
+    setweight(array_to_tsvector(search_tokens(contact)), 'B');
+
+CREATE INDEX IF NOT EXISTS idx_users_search ON users USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING gin (name gin_trgm_ops);
@@ -0,0 +1,7 @@
+DROP TRIGGER IF EXISTS trg_material_types_notify ON material_types;
+DROP TRIGGER IF EXISTS trg_user_types_notify ON user_types;
+DROP TRIGGER IF EXISTS trg_users_notify ON users;
+DROP TRIGGER IF EXISTS trg_reservations_notify ON reservations;
+DROP TRIGGER IF EXISTS trg_loans_notify ON loans;
+DROP TRIGGER IF EXISTS trg_materials_notify ON materials;
+DROP FUNCTION IF EXISTS notify_library_change();
@@ -0,0 +1,55 @@
+-- Change events for cross-process cache invalidation. Every row change on the
+-- cached tables sends a compact JSON payload on the library_changes channel,
+-- delivered to listeners (DATABASE/change_listener.py) when the writer commits:
+--   {"table": "loans", "op": "UPDATE", "id": 42, "material_id": 7, "user_id": 3}
+-- TG_ARGV[0] names the primary key column; null fields are omitted.
+CREATE OR REPLACE FUNCTION notify_library_change() RETURNS trigger AS $$
+DECLARE
+    rec jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := to_jsonb(OLD);
+    ELSE
+        rec := to_jsonb(NEW);
+    END IF;
+
+    PERFORM pg_notify('library_changes', jsonb_strip_nulls(jsonb_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', rec -> TG_ARGV[0],
+        'material_id', rec -> 'material_id',
+        'user_id', rec -> 'user_id'
+    ))::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_materials_notify ON materials;
+CREATE TRIGGER trg_materials_notify
+    AFTER INSERT OR UPDATE OR DELETE ON materials
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('material_id');
+
+DROP TRIGGER IF EXISTS trg_loans_notify ON loans;
+CREATE TRIGGER trg_loans_notify
+    AFTER INSERT OR UPDATE OR DELETE ON loans
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('loan_id');
+
+DROP TRIGGER IF EXISTS trg_reservations_notify ON reservations;
+CREATE TRIGGER trg_reservations_notify
+    AFTER INSERT OR UPDATE OR DELETE ON reservations
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('reservation_id');
+
+DROP TRIGGER IF EXISTS trg_users_notify ON users;
+CREATE TRIGGER trg_users_notify
+    AFTER INSERT OR UPDATE OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('user_id');
+
+DROP TRIGGER IF EXISTS trg_user_types_notify ON user_types;
+CREATE TRIGGER trg_user_types_notify
+    AFTER INSERT OR UPDATE OR DELETE ON user_types
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('type_id');
+
+DROP TRIGGER IF EXISTS trg_material_types_notify ON material_types;
+CREATE TRIGGER trg_material_types_notify
+    AFTER INSERT OR UPDATE OR DELETE ON material_types
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('type_id');
@@ -0,0 +1,3 @@
+DROP INDEX IF EXISTS idx_materials_type_id;
+DROP INDEX IF EXISTS idx_materials_status_id;
+DROP INDEX IF EXISTS idx_loans_user_history;
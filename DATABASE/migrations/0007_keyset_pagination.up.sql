@@ -0,0 +1,15 @@
+-- Indexes for the keyset-paginated listings of the CRUD layer.
+-- Each page seeks past the last key of the previous one, so the ORDER BY
+-- columns must lead with the filter and end with the page key.
+
+-- LoanCRUD.get_loan_history: WHERE user_id = ? AND (loan_date, loan_id) < (?, ?)
+CREATE INDEX IF NOT EXISTS idx_loans_user_history
+    ON loans (user_id, loan_date DESC, loan_id DESC);
+
+-- MaterialCRUD.list_materials(status=...): WHERE status = ? AND material_id > ?
+CREATE INDEX IF NOT EXISTS idx_materials_status_id
+    ON materials (status, material_id);
+
+-- MaterialCRUD.list_materials(type_id=...): WHERE type_id = ? AND material_id > ?
+CREATE INDEX IF NOT EXISTS idx_materials_type_id
+    ON materials (type_id, material_id);
@@ -0,0 +1,50 @@
+-- Back to the 0006 row triggers (notify_library_change is still defined by 0006)
+DROP TRIGGER IF EXISTS trg_materials_notify_insert ON materials;
+DROP TRIGGER IF EXISTS trg_materials_notify_update ON materials;
+DROP TRIGGER IF EXISTS trg_materials_notify_delete ON materials;
+DROP TRIGGER IF EXISTS trg_materials_notify ON materials;
+CREATE TRIGGER trg_materials_notify
+    AFTER INSERT OR UPDATE OR DELETE ON materials
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('material_id');
+
+DROP TRIGGER IF EXISTS trg_loans_notify_insert ON loans;
+DROP TRIGGER IF EXISTS trg_loans_notify_update ON loans;
+DROP TRIGGER IF EXISTS trg_loans_notify_delete ON loans;
+DROP TRIGGER IF EXISTS trg_loans_notify ON loans;
+CREATE TRIGGER trg_loans_notify
+    AFTER INSERT OR UPDATE OR DELETE ON loans
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('loan_id');
+
+DROP TRIGGER IF EXISTS trg_reservations_notify_insert ON reservations;
+DROP TRIGGER IF EXISTS trg_reservations_notify_update ON reservations;
+DROP TRIGGER IF EXISTS trg_reservations_notify_delete ON reservations;
+DROP TRIGGER IF EXISTS trg_reservations_notify ON reservations;
+CREATE TRIGGER trg_reservations_notify
+    AFTER INSERT OR UPDATE OR DELETE ON reservations
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('reservation_id');
+
+DROP TRIGGER IF EXISTS trg_users_notify_insert ON users;
+DROP TRIGGER IF EXISTS trg_users_notify_update ON users;
+DROP TRIGGER IF EXISTS trg_users_notify_delete ON users;
+DROP TRIGGER IF EXISTS trg_users_notify ON users;
+CREATE TRIGGER trg_users_notify
+    AFTER INSERT OR UPDATE OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('user_id');
+
+DROP TRIGGER IF EXISTS trg_user_types_notify_insert ON user_types;
+DROP TRIGGER IF EXISTS trg_user_types_notify_update ON user_types;
+DROP TRIGGER IF EXISTS trg_user_types_notify_delete ON user_types;
+DROP TRIGGER IF EXISTS trg_user_types_notify ON user_types;
+CREATE TRIGGER trg_user_types_notify
+    AFTER INSERT OR UPDATE OR DELETE ON user_types
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('type_id');
+
+DROP TRIGGER IF EXISTS trg_material_types_notify_insert ON material_types;
+DROP TRIGGER IF EXISTS trg_material_types_notify_update ON material_types;
+DROP TRIGGER IF EXISTS trg_material_types_notify_delete ON material_types;
+DROP TRIGGER IF EXISTS trg_material_types_notify ON material_types;
+CREATE TRIGGER trg_material_types_notify
+    AFTER INSERT OR UPDATE OR DELETE ON material_types
+    FOR EACH ROW EXECUTE FUNCTION notify_library_change('type_id');
+
+DROP FUNCTION IF EXISTS notify_library_statement();
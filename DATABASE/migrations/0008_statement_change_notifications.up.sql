@@ -0,0 +1,125 @@
+-- One change event per statement instead of per row (replaces the 0006 row
+-- triggers). A bulk load or sync pass that touches thousands of rows now sends
+-- one notification per statement rather than one per row. A statement that
+-- changed a single row still sends the row's keys, as before:
+--   {"table": "loans", "op": "UPDATE", "id": 42, "material_id": 7, "user_id": 3}
+-- one that changed several sends only their count, and listeners drop
+-- everything they cached from that table:
+--   {"table": "materials", "op": "INSERT", "rows": 2}
+-- PostgreSQL allows transition tables on single-event triggers only, hence
+-- three triggers per table; each names its transition table changed_rows.
+CREATE OR REPLACE FUNCTION notify_library_statement() RETURNS trigger AS $$
+DECLARE
+    changed bigint;
+    rec jsonb;
+BEGIN
+    -- Two rows are enough to tell one from several; do not scan the whole set
+    SELECT count(*) INTO changed FROM (SELECT 1 FROM changed_rows LIMIT 2) AS sample;
+    IF changed = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    IF changed = 1 THEN
+        SELECT to_jsonb(r) INTO rec FROM changed_rows AS r;
+        PERFORM pg_notify('library_changes', jsonb_strip_nulls(jsonb_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', rec -> TG_ARGV[0],
+            'material_id', rec -> 'material_id',
+            'user_id', rec -> 'user_id'
+        ))::text);
+    ELSE
+        SELECT count(*) INTO changed FROM changed_rows;
+        PERFORM pg_notify('library_changes', jsonb_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'rows', changed
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_materials_notify ON materials;
+DROP TRIGGER IF EXISTS trg_materials_notify_insert ON materials;
+CREATE TRIGGER trg_materials_notify_insert
+    AFTER INSERT ON materials REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('material_id');
+DROP TRIGGER IF EXISTS trg_materials_notify_update ON materials;
+CREATE TRIGGER trg_materials_notify_update
+    AFTER UPDATE ON materials REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('material_id');
+DROP TRIGGER IF EXISTS trg_materials_notify_delete ON materials;
+CREATE TRIGGER trg_materials_notify_delete
+    AFTER DELETE ON materials REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('material_id');
+
+DROP TRIGGER IF EXISTS trg_loans_notify ON loans;
+DROP TRIGGER IF EXISTS trg_loans_notify_insert ON loans;
+CREATE TRIGGER trg_loans_notify_insert
+    AFTER INSERT ON loans REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('loan_id');
+DROP TRIGGER IF EXISTS trg_loans_notify_update ON loans;
+CREATE TRIGGER trg_loans_notify_update
+    AFTER UPDATE ON loans REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('loan_id');
+DROP TRIGGER IF EXISTS trg_loans_notify_delete ON loans;
+CREATE TRIGGER trg_loans_notify_delete
+    AFTER DELETE ON loans REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('loan_id');
+
+DROP TRIGGER IF EXISTS trg_reservations_notify ON reservations;
+DROP TRIGGER IF EXISTS trg_reservations_notify_insert ON reservations;
+CREATE TRIGGER trg_reservations_notify_insert
+    AFTER INSERT ON reservations REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('reservation_id');
+DROP TRIGGER IF EXISTS trg_reservations_notify_update ON reservations;
+CREATE TRIGGER trg_reservations_notify_update
+    AFTER UPDATE ON reservations REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('reservation_id');
+DROP TRIGGER IF EXISTS trg_reservations_notify_delete ON reservations;
+CREATE TRIGGER trg_reservations_notify_delete
+    AFTER DELETE ON reservations REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('reservation_id');
+
+DROP TRIGGER IF EXISTS trg_users_notify ON users;
+DROP TRIGGER IF EXISTS trg_users_notify_insert ON users;
+CREATE TRIGGER trg_users_notify_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('user_id');
+DROP TRIGGER IF EXISTS trg_users_notify_update ON users;
+CREATE TRIGGER trg_users_notify_update
+    AFTER UPDATE ON users REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('user_id');
+DROP TRIGGER IF EXISTS trg_users_notify_delete ON users;
+CREATE TRIGGER trg_users_notify_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('user_id');
+
+DROP TRIGGER IF EXISTS trg_user_types_notify ON user_types;
+DROP TRIGGER IF EXISTS trg_user_types_notify_insert ON user_types;
+CREATE TRIGGER trg_user_types_notify_insert
+    AFTER INSERT ON user_types REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('type_id');
+DROP TRIGGER IF EXISTS trg_user_types_notify_update ON user_types;
+CREATE TRIGGER trg_user_types_notify_update
+    AFTER UPDATE ON user_types REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('type_id');
+DROP TRIGGER IF EXISTS trg_user_types_notify_delete ON user_types;
+CREATE TRIGGER trg_user_types_notify_delete
+    AFTER DELETE ON user_types REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('type_id');
+
+DROP TRIGGER IF EXISTS trg_material_types_notify ON material_types;
+DROP TRIGGER IF EXISTS trg_material_types_notify_insert ON material_types;
+CREATE TRIGGER trg_material_types_notify_insert
+    AFTER INSERT ON material_types REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('type_id');
+DROP TRIGGER IF EXISTS trg_material_types_notify_update ON material_types;
+CREATE TRIGGER trg_material_types_notify_update
+    AFTER UPDATE ON material_types REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('type_id');
+DROP TRIGGER IF EXISTS trg_material_types_notify_delete ON material_types;
+CREATE TRIGGER trg_material_types_notify_delete
+    AFTER DELETE ON material_types REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_library_statement('type_id');
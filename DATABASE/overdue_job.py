@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DATABASE.database import Database
+from DATABASE.transaction import transaction
+
+
+def roll_forward(conn) -> int:
+    """Add loans that fell due since the last run to overdue_loans; returns rows added"""
+    with transaction(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT overdue_roll_forward()")
+            return cursor.fetchone()[0]
+
+
+def refresh(conn) -> int:
+    """
+    Fallback: recompute the overdue set from the base tables.
+    Refreshes overdue_loans_mv CONCURRENTLY and reconciles overdue_loans with it,
+    for use after the triggers were disabled or the table is suspected to drift.
+    Returns the number of overdue loans.
+    """
+    with transaction(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY overdue_loans_mv")
+            cursor.execute("""
+                DELETE FROM overdue_loans o
+                WHERE NOT EXISTS (SELECT 1 FROM overdue_loans_mv v WHERE v.loan_id = o.loan_id)
+            """)
+            cursor.execute("""
+                INSERT INTO overdue_loans (loan_id, user_id, material_id, loan_date, return_date, name, material_name)
+                SELECT loan_id, user_id, material_id, loan_date, return_date, name, material_name
+                FROM overdue_loans_mv
+                ON CONFLICT (loan_id) DO UPDATE
+                SET return_date = EXCLUDED.return_date,
+                    name = EXCLUDED.name,
+                    material_name = EXCLUDED.material_name
+            """)
+            cursor.execute("UPDATE overdue_state SET as_of = CURRENT_DATE")
+            cursor.execute("SELECT COUNT(*) FROM overdue_loans")
+            return cursor.fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily maintenance of the overdue loan set")
+    parser.add_argument('--refresh', action='store_true',
+                        help="rebuild from the base tables via REFRESH MATERIALIZED VIEW CONCURRENTLY")
+    args = parser.parse_args(argv)
+
+    db = Database()
+    conn = db.connect()
+    if not conn:
+        return 1
+    try:
+        if args.refresh:
+            print(f"Overdue set rebuilt: {refresh(conn)} overdue loans")
+        else:
+            print(f"Overdue set rolled forward: {roll_forward(conn)} loans became overdue")
+        return 0
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
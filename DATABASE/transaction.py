@@ -1,20 +1,135 @@
-from contextlib import contextmanager
-from psycopg2 import DatabaseError
+from contextlib import contextmanager, nullcontext
+
+from DATABASE.drivers import DATABASE_ERRORS, pipeline as _pipeline, pipeline_boundary
+
+# Open transaction() scopes per connection (keyed by id, removed when the outermost scope exits)
+_depths = {}
+# Callbacks waiting for the outermost scope on a connection to end
+_after = {}
+
+
+def transaction_depth(conn) -> int:
+    """Number of transaction() scopes currently open on the connection (0: none)"""
+    return _depths.get(id(conn), 0)
+
+
+def after_transaction(conn, callback):
+    """
+    Run `callback()` once the outermost transaction() scope on the connection has ended
+    使用示例：
+    after_transaction(self.conn, lambda: material_cache.invalidate(material_id))
+
+    Runs after the COMMIT or the rollback alike, so a cache refilled inside the
+    transaction with data that was never committed is cleared either way.
+    Outside a transaction() scope the callback runs immediately.
+    """
+    if not transaction_depth(conn):
+        callback()
+        return
+    _after.setdefault(id(conn), []).append(callback)
+
 
 @contextmanager
-def transaction(conn):
+def transaction(conn, pipeline=False):
     """
-    事务管理上下文管理器
+    事务管理上下文管理器（可嵌套）
     使用示例：
     with transaction(conn):
         cursor.execute(...)
+        loan_crud.create_loan(...)   # 内部的 transaction() 成为 SAVEPOINT
+
+    Only the outermost scope commits, so a business operation made of several
+    CRUD calls ends in a single COMMIT. A nested scope runs inside a SAVEPOINT:
+    if it fails, only its own work is rolled back and the error propagates
+    unchanged to the enclosing scope. On an autocommit connection the outermost
+    scope switches autocommit off, so its statements share one explicit
+    transaction, and switches it back on afterwards.
+
+    With pipeline=True (outermost scope, psycopg 3) the statements and the
+    COMMIT are sent without waiting for each reply; only reading a result
+    waits, so an operation costs about one round trip per result it reads.
+    Nested scopes still sync at their end, so a failed write is raised inside
+    the CRUD call that made it and its savepoint can be rolled back.
+    """
+    depth = transaction_depth(conn)
+    _depths[id(conn)] = depth + 1
+    try:
+        if depth:
+            with _savepoint(conn, depth):
+                yield conn
+            return
+
+        autocommit = getattr(conn, 'autocommit', False) is True
+        if autocommit:
+            conn.autocommit = False  # The next statement opens the transaction
+        try:
+            # The pipeline closes before any rollback, which must not be queued behind a failure
+            with _pipeline(conn) if pipeline else nullcontext():
+                yield conn  # 注意这里yield conn以便在with块内使用
+                conn.commit()
+        except DATABASE_ERRORS as e:
+            conn.rollback()
+            raise RuntimeError(f"Database transaction failed: {str(e)}")
+        except Exception as e:
+            conn.rollback()
+            raise RuntimeError(f"Operation failed: {str(e)}")
+        except BaseException:
+            # GeneratorExit from an abandoned iter_rows() stream, KeyboardInterrupt...:
+            # the transaction must still end before autocommit is switched back on
+            conn.rollback()
+            raise
+        finally:
+            if autocommit:
+                conn.autocommit = True
+    finally:
+        if depth:
+            _depths[id(conn)] = depth
+        else:
+            _depths.pop(id(conn), None)
+            _run_after(_after.pop(id(conn), ()))
+
+
+def _run_after(callbacks):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"After-transaction callback error: {e}")
+
+
+@contextmanager
+def read_only_transaction(conn):
     """
+    只读事务，结束时总是关闭
+    使用示例：
+    with read_only_transaction(conn):
+        cursor.execute(...)   # 多条查询共享同一快照
+
+    For reads that need one snapshot or a server-side cursor on an autocommit
+    connection. Inside an open transaction() the reads simply join it.
+    """
+    if transaction_depth(conn):
+        yield conn
+        return
+    with transaction(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION READ ONLY")
+        yield conn
+
+
+@contextmanager
+def _savepoint(conn, depth):
+    name = f"uow_{depth}"
+    with conn.cursor() as cursor:
+        cursor.execute(f"SAVEPOINT {name}")
     try:
-        yield conn  # 注意这里yield conn以便在with块内使用
-        conn.commit()
-    except DatabaseError as e:
-        conn.rollback()
-        raise RuntimeError(f"Database transaction failed: {str(e)}")
-    except Exception as e:
-        conn.rollback()
-        raise RuntimeError(f"Operation failed: {str(e)}")
\ No newline at end of file
+        # Pipelined: errors of the scope's writes surface here, and the pipeline
+        # is no longer aborted when ROLLBACK TO is sent
+        with pipeline_boundary(conn):
+            yield
+    except BaseException:
+        with conn.cursor() as cursor:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        raise
+    with conn.cursor() as cursor:
+        cursor.execute(f"RELEASE SAVEPOINT {name}")
@@ -4,36 +4,108 @@ from CRUD.users_crud import UserCRUD
 from CRUD.materials_crud import MaterialCRUD
 from CRUD.loans_crud import LoanCRUD
 from CRUD.constants import MaterialStatus
+from CRUD.reference_data import reference_data
+from CRUD.entity_cache import material_cache, user_cache, register_invalidators
+from CRUD.query_cache import query_cache, register_version_bumps
+from CRUD.prepared import prepared_statements
+from DATABASE.change_listener import ChangeListener
 from datetime import datetime
 
 from GUI.loan import OverdueGUI
 from SERVICES.loan_service import LoanService
 from SERVICES.reservation_service import ReservationService
+from SERVICES.catalog_index import CatalogIndex
+from SERVICES.fuzzy_search import FuzzySearchService
+from SERVICES.prefix_trie import PrefixTrie
 
+LIVE_SEARCH_DELAY_MS = 250  # Typing pause before the live lookup runs
+LIVE_SEARCH_LIMIT = 50      # Rows shown while typing
+LIST_PAGE_SIZE = 100        # Rows per "Load More" page of the user and material lists
 
+# Columns the list views render; everything else is loaded when a row is selected
+USER_LIST_FIELDS = ('user_id', 'name', 'type_name')
+MATERIAL_LIST_FIELDS = ('material_id', 'material_name', 'author', 'status')
+# The catalog index also needs what it matches (publisher) and filters on (type)
+CATALOG_INDEX_FIELDS = MATERIAL_LIST_FIELDS + ('publisher', 'type_id')
+
+# One listener per process: the main window is rebuilt when returning from the
+# overdue window, and each rebuild must not open another LISTEN connection
+_change_listener = None
+
+
+def shared_change_listener() -> ChangeListener:
+    """The process-wide ChangeListener with the caches subscribed, started if stopped"""
+    global _change_listener
+    if _change_listener is None:
+        _change_listener = ChangeListener()
+        register_invalidators(_change_listener)
+        register_version_bumps(_change_listener)
+    _change_listener.start()
+    return _change_listener
 
 
 class LibraryBorrowSystem:
     def __init__(self):
         # Initialize database connection
-        self.db = Database()
-        self.conn = self.db.connect()
+        self.db = Database(pooled=True)
+        # Reads run in autocommit mode so the idle desk never holds a transaction open;
+        # every write goes through transaction(), which opens an explicit one
+        self.conn = self.db.connect(autocommit=True)
 
         if not self.conn:
             error("Error", "Database connection failed")
             return
 
+        # Type names and borrowing rules are read once and shared process-wide
+        reference_data.load(self.conn)
+
+        # One desk interaction re-reads the same user and material several times
+        user_cache.enable(maxsize=1024, ttl=30)
+        material_cache.enable(maxsize=4096, ttl=30)
+        # Refreshes re-run the same list queries; served from memory until a table changes
+        query_cache.enable()
+        # Single-row lookups and the borrow/return statements are planned once per connection
+        prepared_statements.enable()
+
+        # Writes from other desks arrive as change events (migration 0006) and
+        # invalidate the caches; the TTL only bounds staleness if events are lost
+        self.change_listener = shared_change_listener()
+
         # Initialize CRUD operations
         self.user_crud = UserCRUD(self.conn)
         self.material_crud = MaterialCRUD(self.conn)
         self.loan_crud = LoanCRUD(self.conn)
         self.reservation_service = ReservationService(self.conn)  # Ensure this line exists
+        self.catalog_index = CatalogIndex()  # Built on the first material search
+        self.catalog_loaded = False
+        self.fuzzy_search = FuzzySearchService(self.conn)  # Typo-tolerant fallback, built on first use
+
+        # The lists show keyset-paginated pages; the search structures cover every
+        # row and are streamed in on the first search instead of at startup
+        self.user_rows = {}         # user_id -> list row of the loaded pages, in list order
+        self.material_rows = {}     # material_id -> list row of the loaded pages, in list order
+        self.user_more = False      # Whether another page follows the loaded ones
+        self.material_more = False
+
+        # Search-as-you-type: prefix tries over all rows, plus a generation counter
+        # per box so lookups scheduled before the latest keystroke are dropped
+        self.user_trie = PrefixTrie()
+        self.material_trie = PrefixTrie()  # Built together with the catalog index
+        self.user_search_rows = {}  # user_id -> list row of every user, once the trie is built
+        self.user_trie_loaded = False
+        self.live_search = {'user': 0, 'material': 0}
+        self.live_search_pending = {'user': False, 'material': False}
 
         # Create main window
         self.app = App(title="Library Borrowing System",
                        width=1000,
                        height=700,
                        layout="grid")
+        self.app.when_closed = self.close
+
+        # Changes made at other desks also reach this window's search indexes
+        self.change_listener.subscribe(self.on_change_event,
+                                       tables=('materials', 'loans', 'reservations', 'users'))
 
         # Create UI components
         self.create_widgets()
@@ -82,7 +154,8 @@ class LibraryBorrowSystem:
         # User search
         search_user_box = Box(user_list_box, width="fill")
         Text(search_user_box, text="Search:", align="left")
-        self.user_search_input = TextBox(search_user_box, width=30, align="left")
+        self.user_search_input = TextBox(search_user_box, width=30, align="left",
+                                         command=lambda: self.schedule_live_search('user'))
         PushButton(search_user_box, text="Search", align="left",
                    command=self.search_user)
         PushButton(search_user_box, text="Refresh", align="left",
@@ -106,6 +179,8 @@ class LibraryBorrowSystem:
                    command=self.show_user_details, enabled=True)
         self.edit_user_button = PushButton(user_btn_box, text="Edit", grid=[2, 0],
                                            command=self.edit_user_details, enabled=False)
+        self.more_users_button = PushButton(user_btn_box, text="Load More", grid=[3, 0],
+                                            command=self.load_more_users, enabled=False)
 
         # Material selection area
         material_box = Box(self.app, grid=[1, 1], width=450, height=350, border=True)
@@ -151,11 +226,12 @@ class LibraryBorrowSystem:
         # Material search
         search_material_box = Box(material_list_box, width="fill")
         Text(search_material_box, text="Search:", align="left")
-        self.material_search_input = TextBox(search_material_box, width=30, align="left")
+        self.material_search_input = TextBox(search_material_box, width=30, align="left",
+                                             command=lambda: self.schedule_live_search('material'))
         PushButton(search_material_box, text="Search", align="left",
                    command=self.search_material)
         PushButton(search_material_box, text="Refresh", align="left",
-                   command=self.refresh_material_list)
+                   command=lambda: self.refresh_material_list(rebuild_index=True))
 
         # Material list
         self.material_list = ListBox(
@@ -175,6 +251,8 @@ class LibraryBorrowSystem:
                    command=self.show_material_details, enabled=True)
         self.edit_material_button = PushButton(material_btn_box, text="Edit", grid=[2, 0],
                                                command=self.edit_material_details, enabled=False)
+        self.more_materials_button = PushButton(material_btn_box, text="Load More", grid=[3, 0],
+                                                command=self.load_more_materials, enabled=False)
 
         # Borrowing information area
         info_box = Box(self.app, grid=[0, 2, 2, 1], width=700, height=300, border=True)
@@ -202,7 +280,14 @@ class LibraryBorrowSystem:
                                          command=self.show_overdue_information,
                                          enabled=True)
         PushButton(button_box, text="Clear Selection", grid=[6, 0], command=self.clear_selection, width=button_width, height=button_height)
-        PushButton(button_box, text="Exit", grid=[4, 1], command=self.app.destroy, width=button_width, height=button_height)
+        PushButton(button_box, text="Exit", grid=[4, 1], command=self.close, width=button_width, height=button_height)
+
+    def close(self):
+        """Exit: stop the change listener and hand the connection back before closing"""
+        self.change_listener.unsubscribe(self.on_change_event)
+        self.change_listener.stop(timeout=self.change_listener.poll_interval + 1)
+        self.db.disconnect()
+        self.app.destroy()
 
     def show_add_user_form(self):
         """Show the add user form"""
@@ -232,24 +317,125 @@ class LibraryBorrowSystem:
         self.new_material_author.value = ""
         self.new_material_type.value = "Book"
 
+    @staticmethod
+    def user_row(user):
+        return f"{user['user_id']:03d} | {user['name']:20} | {user.get('type_name')}"
+
+    @staticmethod
+    def material_row(material):
+        status = MaterialStatus(material['status']).name.replace('_', ' ').title()
+        return f"{material['material_id']} | {material['material_name']:30} | {material['author']} | {status}"
+
     def refresh_user_list(self):
-        """Refresh user list"""
+        """Reload the user list, keeping as many rows as were loaded (at least one page)"""
+        limit = max(LIST_PAGE_SIZE, len(self.user_rows))
         self.user_list.clear()
-        users = self.user_crud.get_all_users()
-
+        self.user_rows = {}
+        self.user_trie_loaded = False  # Users may have been added or removed
+        self.load_more_users(limit)
+
+    def load_more_users(self, limit=LIST_PAGE_SIZE):
+        """Append the next page of users, seeking past the last loaded id"""
+        after_id = next(reversed(self.user_rows), None)
+        users = self.user_crud.list_users(after_id=after_id, limit=limit, fields=USER_LIST_FIELDS)
         for user in users:
-            display = f"{user['user_id']:03d} | {user['name']:20} | {user['type_name']}"
+            display = self.user_row(user)
+            self.user_rows[user['user_id']] = display
             self.user_list.append(display)
+        self.user_more = len(users) == limit
+        self.more_users_button.enabled = self.user_more
 
-    def refresh_material_list(self):
-        """Refresh materials list"""
+    def refresh_material_list(self, rebuild_index=False):
+        """Reload the material list, keeping as many rows as were loaded (at least one page)"""
+        limit = max(LIST_PAGE_SIZE, len(self.material_rows))
         self.material_list.clear()
-        materials = self.material_crud.get_all_materials()
-
+        self.material_rows = {}
+        if rebuild_index:
+            self.catalog_loaded = False
+        self.load_more_materials(limit)
+
+    def load_more_materials(self, limit=LIST_PAGE_SIZE):
+        """Append the next page of materials, seeking past the last loaded id"""
+        after_id = next(reversed(self.material_rows), None)
+        materials = self.material_crud.list_materials(after_id=after_id, limit=limit,
+                                                      fields=MATERIAL_LIST_FIELDS)
         for material in materials:
-            status = MaterialStatus(material['status']).name.replace('_', ' ').title()
-            display = f"{material['material_id']} | {material['material_name']:30} | {material['author']} | {status}"
+            display = self.material_row(material)
+            self.material_rows[material['material_id']] = display
             self.material_list.append(display)
+        self.material_more = len(materials) == limit
+        self.more_materials_button.enabled = self.material_more
+
+    def ensure_user_trie(self):
+        """Stream every user into the prefix trie, once per refresh"""
+        if self.user_trie_loaded:
+            return
+        self.user_trie.build(())
+        self.user_search_rows = {}
+        for user in self.user_crud.iter_all_users(fields=USER_LIST_FIELDS):
+            self.user_search_rows[user['user_id']] = self.user_row(user)
+            self.user_trie.insert(user['user_id'], f"{user['user_id']} {user['name']}")
+        self.user_trie_loaded = True
+
+    def ensure_catalog_index(self):
+        """Stream every material into the catalog index and prefix trie, on the first search"""
+        if self.catalog_loaded:
+            return
+        self.catalog_index.build(())
+        self.material_trie.build(())
+        for material in self.material_crud.iter_all_materials(fields=CATALOG_INDEX_FIELDS):
+            self.catalog_index.add(material)
+            self.material_trie.insert(
+                material['material_id'],
+                f"{material['material_id']} {material['material_name']} {material['author']}")
+        self.catalog_loaded = True
+
+    def schedule_live_search(self, box):
+        """Debounce keystrokes: (re)start the timer so only the last one triggers a lookup"""
+        self.live_search[box] += 1
+        callback = self.live_search_users if box == 'user' else self.live_search_materials
+        if self.live_search_pending[box]:
+            self.app.cancel(callback)
+        self.live_search_pending[box] = True
+        self.app.after(LIVE_SEARCH_DELAY_MS, callback, args=[self.live_search[box]])
+
+    def live_search_users(self, generation):
+        """Narrow the user list from the prefix trie (no database round trip)"""
+        self.live_search_pending['user'] = False
+        if generation != self.live_search['user']:
+            return  # A later keystroke superseded this lookup
+
+        keyword = self.user_search_input.value.strip()
+        if keyword:
+            self.ensure_user_trie()
+            rows = [self.user_search_rows[user_id]
+                    for user_id in self.user_trie.search(keyword, LIVE_SEARCH_LIMIT)]
+        else:
+            rows = list(self.user_rows.values())
+
+        self.user_list.clear()
+        for display in rows:
+            self.user_list.append(display)
+        self.more_users_button.enabled = self.user_more and not keyword
+
+    def live_search_materials(self, generation):
+        """Narrow the material list from the prefix trie (statuses come from the catalog index)"""
+        self.live_search_pending['material'] = False
+        if generation != self.live_search['material']:
+            return  # A later keystroke superseded this lookup
+
+        keyword = self.material_search_input.value.strip()
+        self.material_list.clear()
+        if keyword:
+            self.ensure_catalog_index()
+            for material_id in self.material_trie.search(keyword, LIVE_SEARCH_LIMIT):
+                material = self.catalog_index.get(material_id)
+                if material:
+                    self.material_list.append(self.material_row(material))
+        else:
+            for display in self.material_rows.values():
+                self.material_list.append(display)
+        self.more_materials_button.enabled = self.material_more and not keyword
 
     def search_user(self):
         """Search users"""
@@ -258,15 +444,17 @@ class LibraryBorrowSystem:
             self.refresh_user_list()
             return
 
-        users = self.user_crud.get_all_users()
-        found = [u for u in users if keyword.lower() in u['name'].lower() or
-                 keyword == str(u['user_id'])]
+        found = self.user_crud.search(keyword, limit=200)
+        if not found:
+            found = self.fuzzy_search.suggest_users(keyword)
+            if found:
+                info("Info", "No exact match - showing the closest names")
 
         self.user_list.clear()
+        self.more_users_button.enabled = False
         if found:
             for user in found:
-                display = f"{user['user_id']:03d} | {user['name']:20} | {user['type_name']}"
-                self.user_list.append(display)
+                self.user_list.append(self.user_row(user))
         else:
             info("Info", "No matching users found")
 
@@ -277,17 +465,22 @@ class LibraryBorrowSystem:
             self.refresh_material_list()
             return
 
-        materials = self.material_crud.get_all_materials()
-        found = [m for m in materials if keyword.lower() in m['material_name'].lower() or
-                 keyword == str(m['material_id']) or
-                 keyword.lower() in m['author'].lower()]
+        self.ensure_catalog_index()
+        found = self.catalog_index.search(keyword, limit=200)
+        if keyword.isdigit():
+            material = self.catalog_index.get(int(keyword))
+            if material and all(m['material_id'] != material['material_id'] for m in found):
+                found.insert(0, material)
+        if not found:
+            found = self.fuzzy_search.suggest_materials(keyword)
+            if found:
+                info("Info", "No exact match - showing the closest titles and authors")
 
         self.material_list.clear()
+        self.more_materials_button.enabled = False
         if found:
             for material in found:
-                status = MaterialStatus(material['status']).name.replace('_', ' ').title()
-                display = f"{material['material_id']} | {material['material_name']:30} | {material['author']} | {status}"
-                self.material_list.append(display)
+                self.material_list.append(self.material_row(material))
         else:
             info("Info", "No matching materials found")
 
@@ -303,20 +496,22 @@ class LibraryBorrowSystem:
                 self.selected_user = user
                 self.selected_user_text.value = f"Current User: {user['name']} (ID: {user['user_id']}, Type: {user['type_name']})"
 
-                # Get current loans
+                # Get current loans (materials fetched in one query)
                 active_loans = self.loan_crud.get_active_loans_by_user(user_id)
+                loan_materials = self.material_crud.get_materials_by_ids(
+                    loan['material_id'] for loan in active_loans)
                 current_materials = []
                 for loan in active_loans:
-                    material = self.material_crud.get_material(loan['material_id'])
+                    material = loan_materials.get(loan['material_id'])
                     if material:
                         current_materials.append(
                             f"{material['material_name']} (Material ID: {material['material_id']})")
 
-                # Get current reservations
+                # Get current reservations (the service attaches material details)
                 reservations = self.reservation_service.get_user_reservations(user_id)
                 reserved_materials = []
                 for reservation in reservations:
-                    material = self.material_crud.get_material(reservation['material_id'])
+                    material = reservation.get('material_details')
                     if material:
                         reserved_materials.append(
                             f"{material['material_name']} (Material ID: {material['material_id']})")
@@ -390,14 +585,13 @@ class LibraryBorrowSystem:
         type_id = type_map.get(user_type, 1)
 
         try:
-            success = self.user_crud.create_user(name, email, type_id)
+            success, user_id = self.user_crud.create_user(name, email, type_id)
             if success:
-                self.conn.commit()
                 info("Success", f"User {name} added successfully!")
+                self.fuzzy_search.add_user(user_id, name)
                 self.hide_add_user_form()
                 self.refresh_user_list()
             else:
-                self.conn.rollback()
                 error("Error", "Failed to add user")
         except Exception as e:
             self.conn.rollback()
@@ -452,12 +646,11 @@ class LibraryBorrowSystem:
                 status=MaterialStatus.AVAILABLE.value
             )
             if success:
-                self.conn.commit()
                 info("Success", f"Material {name} added successfully! ID: {material_id}")
+                self.reindex_material(material_id)
                 self.hide_add_material_form()
                 self.refresh_material_list()
             else:
-                self.conn.rollback()
                 error("Error", "Failed to add material")
         except Exception as e:
             self.conn.rollback()
@@ -481,15 +674,14 @@ class LibraryBorrowSystem:
         # Confirm deletion
         if yesno("Confirm", f"Are you sure you want to delete user {user_name} (ID: {user_id})?"):
             try:
-                success = self.user_crud.delete_user(user_id)
+                success, message = self.user_crud.delete_user(user_id)
                 if success:
-                    self.conn.commit()
                     info("Success", f"User {user_name} deleted successfully")
+                    self.fuzzy_search.remove_user(user_id)
                     self.clear_selection()
                     self.refresh_user_list()
                 else:
-                    self.conn.rollback()
-                    error("Error", "Failed to delete user")
+                    error("Error", f"Failed to delete user: {message}")
             except Exception as e:
                 self.conn.rollback()
                 error("Error", f"Database error: {str(e)}")
@@ -511,12 +703,13 @@ class LibraryBorrowSystem:
             try:
                 success = self.material_crud.delete_material(material_id)
                 if success:
-                    self.conn.commit()
                     info("Success", f"Material {material_name} deleted")
+                    self.catalog_index.remove(material_id)
+                    self.fuzzy_search.remove_material(material_id)
+                    self.material_trie.remove(material_id)
                     self.clear_selection()
                     self.refresh_material_list()
                 else:
-                    self.conn.rollback()
                     error("Error", "Delete failed")
             except Exception as e:
                 self.conn.rollback()
@@ -537,11 +730,10 @@ class LibraryBorrowSystem:
             success, result = self.loan_crud.create_loan(user_id, material_id, user_type_id)
 
             if success:
-                self.conn.commit()
                 info("Success", f"Material borrowed successfully! Loan ID: {result}")
+                self.catalog_index.update_status(material_id, MaterialStatus.BORROWED.value)
                 self.refresh_material_list()  # Refresh to show the material is now borrowed
             else:
-                self.conn.rollback()
                 error("Error", f"Borrow failed: {result}")
         except Exception as e:
             self.conn.rollback()
@@ -649,12 +841,11 @@ class LibraryBorrowSystem:
         try:
             success = self.material_crud.update_material_price(material_id, new_price)
             if success:
-                self.conn.commit()
                 info("Success", "Material price updated successfully")
+                self.reindex_material(material_id)
                 self.clear_selection()
                 self.refresh_material_list()
             else:
-                self.conn.rollback()
                 error("Error", "Failed to update material price")
         except Exception as e:
             self.conn.rollback()
@@ -672,12 +863,10 @@ class LibraryBorrowSystem:
         try:
             success = self.user_crud.update_user_contact(user_id, new_contact)
             if success:
-                self.conn.commit()
                 info("Success", "User contact updated successfully")
                 self.clear_selection()
                 self.refresh_user_list()
             else:
-                self.conn.rollback()
                 error("Error", "Failed to update user contact")
         except Exception as e:
             self.conn.rollback()
@@ -731,6 +920,7 @@ class LibraryBorrowSystem:
                 success, message = self.reservation_service.cancel_reservation(reservation_to_cancel['reservation_id'])
                 if success:
                     info("Success", message)
+                    self.catalog_index.update_status(material_id, MaterialStatus.AVAILABLE.value)
                     self.refresh_material_list()
                     self.on_user_select(f"{self.selected_user['user_id']} | {self.selected_user['name']}")
                 else:
@@ -752,6 +942,7 @@ class LibraryBorrowSystem:
             success, message = self.reservation_service.make_reservation(user_id, material_id)
             if success:
                 info("Success", message)
+                self.catalog_index.update_status(material_id, MaterialStatus.RESERVED.value)
                 self.refresh_material_list()
                 self.on_user_select(f"{self.selected_user['user_id']} | {self.selected_user['name']}")
             else:
@@ -794,6 +985,7 @@ class LibraryBorrowSystem:
 
                 if success:
                     info("Success", message)
+                    self.catalog_index.update_status(material_id, MaterialStatus.AVAILABLE.value)
                     self.refresh_material_list()
                     self.on_user_select(f"{self.selected_user['user_id']} | {self.selected_user['name']}")
                 else:
@@ -801,6 +993,54 @@ class LibraryBorrowSystem:
             except Exception as e:
                 error("Error", f"Return failed: {str(e)}")
 
+    def on_change_event(self, event):
+        """Listener thread: hand the change event over to the Tk thread"""
+        self.app.after(0, self.apply_change_event, args=[event])
+
+    def apply_change_event(self, event):
+        """Bring the search indexes up to date with a change made at another desk"""
+        table = event.get('table')
+        key = event.get('id') if table in ('users', 'materials') else event.get('material_id')
+        if event.get('op') == 'RESET' or key is None:
+            # Events were missed, or one statement changed several rows: rebuild on the next search
+            users = table in (None, 'users')
+            materials = table != 'users'
+            if users:
+                self.user_trie_loaded = False
+            if materials:
+                self.catalog_loaded = False
+            self.fuzzy_search.invalidate(users=users, materials=materials)
+        elif table == 'users':
+            self.reindex_user(key)
+        elif self.catalog_loaded:
+            self.reindex_material(key)  # Borrowed, returned, reserved or edited elsewhere
+
+    def reindex_user(self, user_id):
+        """Re-read one user into the prefix trie and fuzzy index after it was changed elsewhere"""
+        user = self.user_crud.get_user(user_id)
+        if user:
+            self.fuzzy_search.add_user(user_id, user['name'])
+            if self.user_trie_loaded:
+                self.user_search_rows[user_id] = self.user_row(user)
+                self.user_trie.insert(user_id, f"{user_id} {user['name']}")
+        else:
+            self.fuzzy_search.remove_user(user_id)
+            self.user_trie.remove(user_id)
+            self.user_search_rows.pop(user_id, None)
+
+    def reindex_material(self, material_id):
+        """Re-read one material into the catalog and fuzzy indexes after it was added or edited"""
+        material = self.material_crud.get_material(material_id)
+        if material:
+            self.catalog_index.add(material)
+            self.fuzzy_search.add_material(material)
+            self.material_trie.insert(
+                material_id, f"{material_id} {material['material_name']} {material['author']}")
+        else:
+            self.catalog_index.remove(material_id)
+            self.fuzzy_search.remove_material(material_id)
+            self.material_trie.remove(material_id)
+
     def check_borrow_button(self):
         """Check borrow, reserve and return button states"""
         user_selected = hasattr(self, 'selected_user')
@@ -856,6 +1096,7 @@ class LibraryBorrowSystem:
     def return_from_overdue(self, overdue_app):
         """Return from overdue interface"""
         overdue_app.app.destroy()
+        overdue_app.db.disconnect()
         self.app.show()
 
 if __name__ == "__main__":
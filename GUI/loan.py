@@ -11,8 +11,9 @@ from CRUD.constants import MaterialStatus
 class OverdueGUI:
     def __init__(self):
         # Initialize the database connection
-        self.db = Database()
-        self.conn = self.db.connect()
+        self.db = Database(pooled=True)
+        # Autocommit reads; the services' writes run in explicit transactions
+        self.conn = self.db.connect(autocommit=True)
         self.loan_service = LoanService(self.conn)
         self.payment_service = PaymentService(self.conn)
         self.user_crud = UserCRUD(self.conn)
@@ -75,20 +76,11 @@ class OverdueGUI:
         self.load_overdue_users()
 
     def load_overdue_users(self):
-        # Get all overdue loan records
-        overdue_loans = self.loan_service.get_overdue_loans()
-        user_ids = set()
-        for loan in overdue_loans:
-            user_ids.add(loan['user_id'])
-
-        # Get information about overdue users
-        for user_id in user_ids:
-            user = self.user_crud.get_user(user_id)
-            if user:
-                # Get the number of overdue materials for this user
-                overdue_count = len(self.loan_service.get_overdue_loans_by_user(user_id))
-                self.overdue_user_listbox.append(
-                    f"{user['name']} (ID: {user['user_id']}) - Number of overdue materials: {overdue_count}")
+        # One grouped query returns every overdue user with count, oldest due date and fee
+        for row in self.loan_service.get_overdue_summary():
+            self.overdue_user_listbox.append(
+                f"{row['name']} (ID: {row['user_id']}) - Number of overdue materials: {row['overdue_count']}"
+                f" | Oldest due: {row['oldest_due_date']} | Accrued fee: {float(row['accrued_fee']):.2f}")
 
     def on_user_select(self, selected_user):
         # Parse the user ID
@@ -251,9 +243,9 @@ class OverdueGUI:
         """Return to the main interface"""
         # Destroy the current OverdueGUI window
         self.app.destroy()
+        self.db.disconnect()
         from GUI.Gui import LibraryBorrowSystem
-        main_app = LibraryBorrowSystem()
-        main_app.app.display()
+        LibraryBorrowSystem()  # Shows itself; reuses the process-wide change listener
 
 if __name__ == "__main__":
     OverdueGUI()
\ No newline at end of file
@@ -5,6 +5,8 @@ from .loan_service import LoanService
 from .reservation_service import ReservationService
 from .invoice_service import InvoiceService
 from .payment_service import PaymentService
+from .catalog_index import CatalogIndex
+from .fuzzy_search import FuzzySearchService
 
 __all__ = [
     'UserService',
@@ -12,5 +14,7 @@ __all__ = [
     'LoanService',
     'ReservationService',
     'InvoiceService',
-    'PaymentService'
+    'PaymentService',
+    'CatalogIndex',
+    'FuzzySearchService'
 ]
\ No newline at end of file
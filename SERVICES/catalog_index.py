@@ -0,0 +1,157 @@
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from CRUD.rows import Record, merge
+from CRUD.tokenizer import is_cjk, tokenize
+
+INDEXED_FIELDS = ('material_name', 'author', 'publisher')
+
+
+class CatalogIndex:
+    """In-memory inverted index over the catalog with BM25 ranking"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}   # token -> {material_id: term frequency}
+        self._terms: Dict[int, Counter] = {}             # material_id -> term frequencies
+        self._docs: Dict[int, Dict] = {}                 # material_id -> material record
+        self._cjk_prefixes: Dict[str, Set[str]] = {}     # CJK character -> tokens starting with it
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_crud(cls, material_crud) -> 'CatalogIndex':
+        """Build an index from MaterialCRUD.get_all_materials()"""
+        index = cls()
+        index.build(material_crud.get_all_materials())
+        return index
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self, materials: Iterable[Dict]):
+        """Replace the index contents with the given materials"""
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._docs.clear()
+            self._cjk_prefixes.clear()
+            self._total_length = 0
+            for material in materials:
+                self._add(material)
+
+    def add(self, material: Dict):
+        """Index a new material, or re-index an existing one after an edit"""
+        with self._lock:
+            self._remove(material['material_id'])
+            self._add(material)
+
+    def remove(self, material_id: int):
+        with self._lock:
+            self._remove(material_id)
+
+    def update_status(self, material_id: int, status: int):
+        """Borrow/return/reserve events only change the status, not the postings"""
+        with self._lock:
+            doc = self._docs.get(material_id)
+            if doc is not None:
+                self._docs[material_id] = merge(doc, status=status)
+
+    def get(self, material_id: int) -> Optional[Dict]:
+        doc = self._docs.get(material_id)
+        return dict(doc) if doc is not None else None
+
+    def search(self, query: str, mode: str = 'and', limit: int = 50,
+               status: Optional[int] = None, type_id: Optional[int] = None) -> List[Dict]:
+        """
+        Rank materials against the query terms with BM25
+
+        Args:
+            query: Free text; tokenized like the indexed fields (CJK as bigrams,
+                a single CJK character matches every token starting with it)
+            mode: 'and' requires every term, 'or' any term
+            limit: Maximum number of results
+            status, type_id: Optional exact filters
+
+        Returns:
+            Copies of the matching material records, best match first
+        """
+        if mode not in ('and', 'or'):
+            raise ValueError(f"Invalid search mode: {mode}")
+        terms = list(dict.fromkeys(tokenize(query, for_query=True)))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = [self._posting(term) for term in terms]
+            if mode == 'and':
+                if not all(postings):
+                    return []
+                smallest = min(postings, key=len)
+                candidates = [doc_id for doc_id in smallest if all(doc_id in p for p in postings)]
+            else:
+                candidates = set().union(*postings)
+
+            docs = self._docs
+            candidates = [doc_id for doc_id in candidates
+                          if (status is None or docs[doc_id].get('status') == status)
+                          and (type_id is None or docs[doc_id].get('type_id') == type_id)]
+
+            scored = [(self._score(doc_id, terms, postings), doc_id) for doc_id in candidates]
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            return [dict(docs[doc_id]) for _, doc_id in scored[:limit]]
+
+    def _posting(self, term) -> Dict[int, int]:
+        if len(term) != 1 or not is_cjk(term):
+            return self._postings.get(term, {})
+        merged = Counter()
+        for token in self._cjk_prefixes.get(term, ()):
+            merged.update(self._postings[token])
+        return merged
+
+    def _score(self, doc_id, terms, postings) -> float:
+        count = len(self._docs)
+        average = self._total_length / count if count else 0.0
+        length = sum(self._terms[doc_id].values())
+        score = 0.0
+        for term, posting in zip(terms, postings):
+            frequency = posting.get(doc_id)
+            if not frequency:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * length / average) if average else self.k1
+            score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return score
+
+    def _add(self, material):
+        material_id = material['material_id']
+        terms = Counter()
+        for field in INDEXED_FIELDS:
+            terms.update(tokenize(material.get(field)))
+
+        # Streamed records are immutable and compact, so they are kept as they are
+        self._docs[material_id] = material if isinstance(material, Record) else dict(material)
+        self._terms[material_id] = terms
+        self._total_length += sum(terms.values())
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[material_id] = frequency
+            if is_cjk(term):
+                self._cjk_prefixes.setdefault(term[0], set()).add(term)
+
+    def _remove(self, material_id):
+        terms = self._terms.pop(material_id, None)
+        if terms is None:
+            return
+        self._docs.pop(material_id, None)
+        self._total_length -= sum(terms.values())
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(material_id, None)
+                if not posting:
+                    del self._postings[term]
+                    if is_cjk(term):
+                        self._cjk_prefixes[term[0]].discard(term)
@@ -0,0 +1,241 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from CRUD.materials_crud import MaterialCRUD
+from CRUD.tokenizer import words
+from CRUD.users_crud import UserCRUD
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (adjacent transpositions count as one edit).
+    Stops early and returns max_distance + 1 once the limit is exceeded.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    # Only the differing middle matters
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return min(max(len(a), len(b)), max_distance + 1)
+
+    # Cells further than max_distance from the diagonal can never be within the limit
+    limit = max_distance + 1
+    before, previous = None, [min(j, limit) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [limit] * (len(b) + 1)
+        current[0] = min(i, limit)
+        lowest = current[0]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = min(value, limit)
+            lowest = min(lowest, current[j])
+        if lowest > max_distance:
+            return limit
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    """The word and every variant with up to `distance` characters deleted"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyIndex:
+    """
+    SymSpell-style deletion index: every indexed word is stored under its
+    deletion variants, so a lookup only generates the deletions of the query
+    and verifies the few candidates sharing one, instead of comparing against
+    every row.
+    """
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._variants: Dict[str, Set[str]] = {}    # deletion variant -> indexed words
+        self._postings: Dict[str, Set[int]] = {}    # word -> keys
+        self._keys: Dict[int, Tuple[str, ...]] = {}  # key -> words
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def build(self, items: Iterable[Tuple[int, str]]):
+        """Replace the index contents with (key, text) pairs"""
+        with self._lock:
+            self._variants.clear()
+            self._postings.clear()
+            self._keys.clear()
+            for key, text in items:
+                self._add(key, text)
+
+    def add(self, key: int, text: Optional[str]):
+        """Index a new entry, or re-index an existing one after an edit"""
+        with self._lock:
+            self._remove(key)
+            self._add(key, text)
+
+    def remove(self, key: int):
+        with self._lock:
+            self._remove(key)
+
+    def allowed_distance(self, word: str) -> int:
+        """Edits tolerated for a query word: none for 1 character, one up to 4, then max_distance"""
+        if len(word) <= 1:
+            return 0
+        return min(1 if len(word) <= 4 else self.max_distance, self.max_distance)
+
+    def lookup(self, query: str, k: int = 10) -> List[Tuple[int, int]]:
+        """
+        Keys whose text contains every query word within its allowed distance
+
+        Returns:
+            Up to k (key, total edit distance) pairs, closest first
+        """
+        query_words = list(dict.fromkeys(words(query)))
+        if not query_words:
+            return []
+
+        with self._lock:
+            totals = None
+            for word in query_words:
+                best = {}
+                for candidate, distance in self._matches(word).items():
+                    for key in self._postings[candidate]:
+                        if distance < best.get(key, distance + 1):
+                            best[key] = distance
+                if totals is None:
+                    totals = best
+                else:
+                    totals = {key: totals[key] + distance for key, distance in best.items() if key in totals}
+                if not totals:
+                    return []
+
+        ranked = sorted(totals.items(), key=lambda item: (item[1], item[0]))
+        return ranked[:k]
+
+    def _matches(self, word: str) -> Dict[str, int]:
+        allowed = self.allowed_distance(word)
+        candidates = set()
+        for variant in _deletes(word[:self.prefix_length], allowed):
+            candidates |= self._variants.get(variant, set())
+
+        matches = {}
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, allowed)
+            if distance <= allowed:
+                matches[candidate] = distance
+        return matches
+
+    def _add(self, key, text):
+        entry = tuple(dict.fromkeys(words(text)))
+        if not entry:
+            return
+        self._keys[key] = entry
+        for word in entry:
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = set()
+                for variant in _deletes(word[:self.prefix_length], self.max_distance):
+                    self._variants.setdefault(variant, set()).add(word)
+            posting.add(key)
+
+    def _remove(self, key):
+        for word in self._keys.pop(key, ()):
+            posting = self._postings[word]
+            posting.discard(key)
+            if posting:
+                continue
+            del self._postings[word]
+            for variant in _deletes(word[:self.prefix_length], self.max_distance):
+                indexed = self._variants.get(variant)
+                if indexed is not None:
+                    indexed.discard(word)
+                    if not indexed:
+                        del self._variants[variant]
+
+
+class FuzzySearchService:
+    """Typo-tolerant suggestions for users by name and materials by title or author"""
+
+    def __init__(self, db_connection, max_distance: int = 2):
+        self.user_crud = UserCRUD(db_connection)
+        self.material_crud = MaterialCRUD(db_connection)
+        self.user_names = FuzzyIndex(max_distance)
+        self.material_names = FuzzyIndex(max_distance)
+        self.authors = FuzzyIndex(max_distance)
+        self._users_loaded = False
+        self._materials_loaded = False
+
+    def load_users(self, users: Iterable[Dict] = None):
+        """(Re)build the user index, from the given records or the database"""
+        users = self.user_crud.get_all_users() if users is None else users
+        self.user_names.build((user['user_id'], user['name']) for user in users)
+        self._users_loaded = True
+
+    def load_materials(self, materials: Iterable[Dict] = None):
+        """(Re)build the title and author indexes, from the given records or the database"""
+        materials = list(self.material_crud.get_all_materials() if materials is None else materials)
+        self.material_names.build((m['material_id'], m['material_name']) for m in materials)
+        self.authors.build((m['material_id'], m['author']) for m in materials)
+        self._materials_loaded = True
+
+    def invalidate(self, users: bool = True, materials: bool = True):
+        """Rebuild the user and/or material indexes from the database on the next suggestion"""
+        if users:
+            self._users_loaded = False
+        if materials:
+            self._materials_loaded = False
+
+    def add_user(self, user_id: int, name: str):
+        if self._users_loaded:
+            self.user_names.add(user_id, name)
+
+    def remove_user(self, user_id: int):
+        self.user_names.remove(user_id)
+
+    def add_material(self, material: Dict):
+        if self._materials_loaded:
+            self.material_names.add(material['material_id'], material.get('material_name'))
+            self.authors.add(material['material_id'], material.get('author'))
+
+    def remove_material(self, material_id: int):
+        self.material_names.remove(material_id)
+        self.authors.remove(material_id)
+
+    def suggest_users(self, query: str, k: int = 10) -> List[Dict]:
+        """Closest users by name, fetched in one query"""
+        if not self._users_loaded:
+            self.load_users()
+        ids = [user_id for user_id, _ in self.user_names.lookup(query, k)]
+        users = self.user_crud.get_users_by_ids(ids)
+        return [users[user_id] for user_id in ids if user_id in users]
+
+    def suggest_materials(self, query: str, k: int = 10) -> List[Dict]:
+        """Closest materials by title or author, fetched in one query"""
+        if not self._materials_loaded:
+            self.load_materials()
+        best = {}
+        for index in (self.material_names, self.authors):
+            for material_id, distance in index.lookup(query, k):
+                best[material_id] = min(distance, best.get(material_id, distance))
+        ids = sorted(best, key=lambda material_id: (best[material_id], material_id))[:k]
+        materials = self.material_crud.get_materials_by_ids(ids)
+        return [materials[material_id] for material_id in ids if material_id in materials]
@@ -26,21 +26,12 @@ class InvoiceService:
         return self.invoice_crud.create(user_id, total_late_fee, "Overdue loan late fee")
 
     def get_user_invoices(self, user_id: int, include_paid: bool = False) -> List[Dict]:
-        """Get the user's invoice list"""
-        invoices = (self.invoice_crud.get_by_user(user_id) if include_paid
-                    else self.invoice_crud.get_unpaid_by_user(user_id))
+        """Get the user's invoice list with payment totals (one query)"""
+        return self.invoice_crud.get_by_user(user_id, include_paid=include_paid)
 
-        for inv in invoices:
-            payments = self.payment_crud.get_by_invoice(inv['invoice_id'])
-            total_paid = sum(p['amount'] for p in payments)
-
-            inv.update({
-                'paid_amount': total_paid,
-                'outstanding_amount': max(0, inv['amount'] - total_paid),
-                'payment_status': "Paid" if total_paid >= inv['amount'] else "Unpaid"
-            })
-
-        return invoices
+    def get_invoices_for_users(self, user_ids: List[int], include_paid: bool = False) -> Dict[int, List[Dict]]:
+        """Get invoice lists with payment totals for several users (accounts desk)"""
+        return self.invoice_crud.get_by_users(user_ids, include_paid=include_paid)
 
     def mark_invoice_as_paid(self, invoice_id: int) -> Tuple[bool, str]:
         """Mark the invoice as paid (including the transaction)"""
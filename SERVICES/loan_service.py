@@ -6,6 +6,43 @@ from CRUD.invoices_crud import InvoiceCRUD
 from CRUD.materials_crud import MaterialCRUD
 from CRUD.users_crud import UserCRUD
 from CRUD.constants import MaterialStatus
+from CRUD.rows import fetch_dicts
+
+
+# Overdue queries before migration 0003, joining the open loans directly
+OVERDUE_BY_USER_SQL = """
+        SELECT 
+            l.loan_id, 
+            l.material_id, 
+            m.material_name, 
+            u.name as user_name,
+            l.return_date,
+            (CURRENT_DATE - l.return_date) AS overdue_days,
+            m.status as material_status   --  Directly get the status from the query
+        FROM loans l
+        JOIN materials m ON l.material_id = m.material_id
+        JOIN users u ON l.user_id = u.user_id
+        WHERE l.user_id = %s
+          AND l.actual_return_date IS NULL
+          AND l.return_date < CURRENT_DATE
+        ORDER BY l.return_date
+    """
+
+OVERDUE_SUMMARY_SQL = """
+        SELECT 
+            u.user_id,
+            u.name,
+            COUNT(*) AS overdue_count,
+            MIN(l.return_date) AS oldest_due_date,
+            SUM((CURRENT_DATE - l.return_date) * t.late_fee_per_day) AS accrued_fee
+        FROM loans l
+        JOIN users u ON l.user_id = u.user_id
+        JOIN user_types t ON u.user_type_id = t.type_id
+        WHERE l.actual_return_date IS NULL
+          AND l.return_date < CURRENT_DATE
+        GROUP BY u.user_id, u.name
+        ORDER BY oldest_due_date, u.user_id
+    """
 
 
 class LoanService:
@@ -19,7 +56,7 @@ class LoanService:
     def borrow_material(self, user_id: int, material_id: int) -> Tuple[bool, str]:
         """Borrow a material (including the complete transaction)"""
         try:
-            with transaction(self.conn):
+            with transaction(self.conn, pipeline=True):
                 user = self.user_crud.get_user(user_id)
                 if not user:
                     return False, "The user does not exist"
@@ -43,7 +80,7 @@ class LoanService:
     def return_material(self, loan_id: int) -> Tuple[bool, str]:
         """Return a material (including the complete transaction)"""
         try:
-            with transaction(self.conn):
+            with transaction(self.conn, pipeline=True):
                 success, late_fee, message = self.loan_crud.return_material(loan_id)
                 if not success:
                     return False, message
@@ -66,34 +103,62 @@ class LoanService:
 
     def get_overdue_loans_by_user(self, user_id: int) -> List[Dict]:
         """Get the overdue loan records of a specified user (improved version)"""
-        sql = """
-            SELECT 
-                l.loan_id, 
-                l.material_id, 
-                m.material_name, 
-                u.name as user_name,
-                l.return_date,
-                (CURRENT_DATE - l.return_date) AS overdue_days,
-                m.status as material_status   --  Directly get the status from the query
-            FROM loans l
-            JOIN materials m ON l.material_id = m.material_id
-            JOIN users u ON l.user_id = u.user_id
-            WHERE l.user_id = %s
-              AND l.actual_return_date IS NULL
-              AND l.return_date < CURRENT_DATE
-            ORDER BY l.return_date
-        """
         try:
+            if self.loan_crud._overdue_table_available():
+                # The user's rows of the precomputed overdue set (migration 0003)
+                overdue, params = self.loan_crud._overdue_set(user_id)
+                sql = f"""
+                    SELECT
+                        o.loan_id,
+                        o.material_id,
+                        o.material_name,
+                        o.name AS user_name,
+                        o.return_date,
+                        (CURRENT_DATE - o.return_date) AS overdue_days,
+                        m.status AS material_status
+                    FROM ({overdue}) o
+                    JOIN materials m ON o.material_id = m.material_id
+                    ORDER BY o.return_date
+                """
+            else:
+                sql, params = OVERDUE_BY_USER_SQL, (user_id,)
             with self.conn.cursor() as cursor:
-                cursor.execute(sql, (user_id,))
-                columns = [desc[0] for desc in cursor.description]
-                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                cursor.execute(sql, params)
+                results = fetch_dicts(cursor)
                 print(f"Debug information: Found {len(results)} overdue records")  # For debugging
                 return results
         except Exception as e:
             print(f"Error querying overdue records: {str(e)}")
             return []
 
+    def get_overdue_summary(self) -> List[Dict]:
+        """Get one row per overdue user: name, overdue count, oldest due date and accrued fee"""
+        try:
+            if self.loan_crud._overdue_table_available():
+                # Grouped over the precomputed overdue set; user_types only supplies the fee rate
+                overdue, params = self.loan_crud._overdue_set()
+                sql = f"""
+                    SELECT
+                        u.user_id,
+                        o.name,
+                        COUNT(*) AS overdue_count,
+                        MIN(o.return_date) AS oldest_due_date,
+                        SUM((CURRENT_DATE - o.return_date) * t.late_fee_per_day) AS accrued_fee
+                    FROM ({overdue}) o
+                    JOIN users u ON o.user_id = u.user_id
+                    JOIN user_types t ON u.user_type_id = t.type_id
+                    GROUP BY u.user_id, o.name
+                    ORDER BY oldest_due_date, u.user_id
+                """
+            else:
+                sql, params = OVERDUE_SUMMARY_SQL, None
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return fetch_dicts(cursor)
+        except Exception as e:
+            print(f"Error querying overdue summary: {str(e)}")
+            return []
+
     def get_overdue_loans(self) -> List[Dict]:
         """Get all overdue loans"""
         return self.loan_crud.get_overdue_loans()
@@ -121,7 +186,10 @@ class LoanService:
 
             return_date = dt_class.datetime.now().date()
             late_days = max(0, (return_date - due_date).days)
-            late_fee = late_days * 0.50  # $1 per day late fee
+            rules = self.loan_crud._get_borrowing_rules(loan['user_type_id'])
+            if not rules:
+                return False, 0, "Unable to get overdue rate rules"
+            late_fee = round(late_days * rules.late_fee_per_day, 2)
 
             # 3. Update loan record
             success, message = self.loan_crud.update_loan(loan_id, {
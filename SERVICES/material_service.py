@@ -4,8 +4,11 @@ from CRUD.materials_crud import MaterialCRUD
 
 
 class MaterialService:
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, catalog_index=None):
         self.crud = MaterialCRUD(db_connection)
+        # Optional in-memory CatalogIndex; its owner keeps statuses current (the desk
+        # window re-indexes materials on change events from other desks)
+        self.catalog_index = catalog_index
 
     def add_new_material(self, name: str, author: str, publisher: str, type_id: int) -> Tuple[bool, Union[int, str]]:
         """Add a new material"""
@@ -20,19 +23,18 @@ class MaterialService:
             material['status_text'] = MaterialStatus(material['status']).name
         return material
 
-    def search_materials(self, keyword: str = None, material_type: int = None) -> List[Dict]:
-        """Search for materials"""
-        materials = self.crud.get_available_materials()
-
-        # Apply filtering conditions
-        if keyword:
-            keyword = keyword.lower()
-            materials = [m for m in materials
-                         if keyword in m['material_name'].lower()
-                         or keyword in m['author'].lower()]
-
-        if material_type is not None:
-            materials = [m for m in materials if m['type_id'] == material_type]
+    def search_materials(self, keyword: str = None, material_type: int = None, limit: int = 50) -> List[Dict]:
+        """Search for available materials (ranked database search when a keyword is given)"""
+        if keyword and keyword.strip() and self.catalog_index is not None:
+            materials = self.catalog_index.search(keyword, limit=limit, status=MaterialStatus.AVAILABLE.value,
+                                                  type_id=material_type)
+        elif keyword and keyword.strip():
+            materials = self.crud.search(keyword, type_id=material_type,
+                                         status=MaterialStatus.AVAILABLE.value, limit=limit)
+        else:
+            materials = self.crud.get_available_materials()
+            if material_type is not None:
+                materials = [m for m in materials if m['type_id'] == material_type]
 
         # Add status text
         for m in materials:
@@ -20,7 +20,7 @@ class PaymentService:
     def record_payment(self, invoice_id: int, amount: float, method: str = "cash") -> Tuple[bool, str]:
         """Record a payment (including the complete transaction)"""
         try:
-            with transaction(self.conn):
+            with transaction(self.conn, pipeline=True):
                 # Add detailed debugging information
                 print(f"Starting to record the payment, Invoice ID: {invoice_id}, Amount: {amount}, Method: {method}")
 
@@ -56,7 +56,8 @@ class PaymentService:
 
     def pay_overdue_fee(self, loan_id: int) -> Tuple[bool, str]:
         try:
-            with transaction(self.conn):
+            # About ten statements; with psycopg 3 only the reads wait for a reply
+            with transaction(self.conn, pipeline=True):
                 # 1. Get the loan record
                 loan = self.loan_crud._get_loan_info(loan_id)
                 if not loan:
@@ -73,10 +74,12 @@ class PaymentService:
                     user_id = user_id_result[0]
 
                 # 2. Calculate the overdue fee
-                success, late_fee, message = self.calculate_overdue_fee(loan_id)
+                success, late_fee, message = self.calculate_overdue_fee(loan_id, loan)
                 if not success or late_fee <= 0:
                     return False, "No overdue fee needs to be paid"
 
+                # From here on a failed step raises, so the transaction rolls back the invoice
+                # and payment already written instead of committing them half done
                 # 3. Generate the invoice
                 invoice_success, invoice_id = self.invoice_crud.create(
                     user_id=user_id,
@@ -84,38 +87,43 @@ class PaymentService:
                     reason=f"Overdue return of material: {loan.get('material_name', '')}"
                 )
                 if not invoice_success:
-                    return False, "Failed to generate the invoice"
+                    raise Exception("Failed to generate the invoice")
 
                 # 4. Confirm the invoice exists
                 invoice = self.invoice_crud.get_invoice(invoice_id)
                 if not invoice:
-                    return False, "The invoice cannot be queried after generation"
+                    raise Exception("The invoice cannot be queried after generation")
 
                 # 5. Record the payment
                 payment_success, payment_message = self.record_payment(invoice_id, late_fee, "overdue")
                 if not payment_success:
-                    return False, payment_message
+                    raise Exception(payment_message)
 
                 # 6. Update the loan status
-                self.loan_crud.update_loan(loan_id, {
+                loan_success, loan_message = self.loan_crud.update_loan(loan_id, {
                     'actual_return_date': dt_class.datetime.now(),
                     'late_fee': late_fee
                 })
+                if not loan_success:
+                    raise Exception(loan_message)
 
                 # 7. Update the material status
-                self.material_crud.update_material(loan['material_id'], {
+                material_success, material_message = self.material_crud.update_material(loan['material_id'], {
                    'status': MaterialStatus.AVAILABLE.value
                 })
+                if not material_success:
+                    raise Exception(material_message)
 
                 return True, "Payment successful"
         except Exception as e:
             return False, f"Payment failed: {str(e)}"
 
-    def calculate_overdue_fee(self, loan_id: int) -> Tuple[bool, float, str]:
-        """Calculate the overdue fee"""
+    def calculate_overdue_fee(self, loan_id: int, loan_info: Optional[Dict] = None) -> Tuple[bool, float, str]:
+        """Calculate the overdue fee (loan_info: the already fetched loan record, to skip the query)"""
         try:
             # Get the loan record and user type
-            loan_info = self.loan_crud._get_loan_info(loan_id)
+            if loan_info is None:
+                loan_info = self.loan_crud._get_loan_info(loan_id)
             print(f"Loan info: {loan_info}")  # Add log output
             if not loan_info:
                 return False, 0.0, "Loan record does not exist"
@@ -0,0 +1,117 @@
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from CRUD.tokenizer import is_cjk, words
+
+
+class _Node:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.keys = set()
+
+
+class PrefixTrie:
+    """
+    Prefix index for search-as-you-type over names, titles and ids.
+    Every word of an entry is inserted (CJK runs also from each character on,
+    since titles are not space separated), and a lookup walks the subtree of
+    the typed prefix breadth first, so the shortest completions come first and
+    the walk stops as soon as `limit` entries are found.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._entries: Dict[int, Tuple[str, ...]] = {}  # key -> inserted words
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def build(self, items):
+        """Replace the trie contents with (key, text) pairs"""
+        with self._lock:
+            self._root = _Node()
+            self._entries.clear()
+            for key, text in items:
+                self._insert(key, text)
+
+    def insert(self, key: int, text: Optional[str]):
+        """Add an entry, or replace the text of an existing one"""
+        with self._lock:
+            self._remove(key)
+            self._insert(key, text)
+
+    def remove(self, key: int):
+        with self._lock:
+            self._remove(key)
+
+    def search(self, query: str, limit: int = 50) -> List[int]:
+        """
+        Keys with a word starting with every query word, shortest completions first
+
+        Example:
+            trie.search("jo d") -> keys of 'John Doe', 'Joan Dale', ...
+        """
+        prefixes = sorted(set(words(query)), key=len, reverse=True)
+        if not prefixes:
+            return []
+
+        with self._lock:
+            # Walk the most selective prefix; check the others per candidate
+            found = []
+            for key in self._walk(prefixes[0]):
+                entry = self._entries[key]
+                if all(any(word.startswith(prefix) for word in entry) for prefix in prefixes[1:]):
+                    found.append(key)
+                    if len(found) >= limit:
+                        break
+            return found
+
+    def _walk(self, prefix) -> Iterator[int]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return
+
+        seen = set()
+        queue = deque([node])
+        while queue:
+            node = queue.popleft()
+            for key in sorted(node.keys - seen):
+                seen.add(key)
+                yield key
+            queue.extend(node.children[char] for char in sorted(node.children))
+
+    def _insert(self, key, text):
+        entry = []
+        for word in words(text):
+            entry.append(word)
+            if is_cjk(word):
+                entry.extend(word[i:] for i in range(1, len(word)))
+        entry = tuple(dict.fromkeys(entry))
+        if not entry:
+            return
+
+        self._entries[key] = entry
+        for word in entry:
+            node = self._root
+            for char in word:
+                node = node.children.setdefault(char, _Node())
+            node.keys.add(key)
+
+    def _remove(self, key):
+        for word in self._entries.pop(key, ()):
+            path = [self._root]
+            for char in word:
+                path.append(path[-1].children[char])
+            path[-1].keys.discard(key)
+            # Prune nodes that no longer lead anywhere
+            for depth in range(len(word), 0, -1):
+                node = path[depth]
+                if node.keys or node.children:
+                    break
+                del path[depth - 1].children[word[depth - 1]]
@@ -44,8 +44,9 @@ class ReservationService:
     def get_user_reservations(self, user_id: int) -> List[Dict]:
         """获取用户预约列表"""
         reservations = self.reservation_crud.get_active_by_user(user_id)
+        materials = self.material_crud.get_materials_by_ids(res['material_id'] for res in reservations)
         for res in reservations:
-            material = self.material_crud.get_material(res['material_id'])
+            material = materials.get(res['material_id'])
             if material:
                 res['material_details'] = material
         return reservations
\ No newline at end of file
@@ -0,0 +1,153 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from CRUD.entity_cache import EntityCache, register_invalidators
+from CRUD.materials_crud import MaterialCRUD
+from DATABASE.change_listener import ChangeListener, RESET_EVENT
+from DATABASE.transaction import transaction
+
+
+class TestEntityCache(unittest.TestCase):
+    def test_disabled_cache_always_loads(self):
+        cache = EntityCache()
+        loader = MagicMock(return_value={'user_id': 1})
+
+        cache.get_or_load(1, loader)
+        cache.get_or_load(1, loader)
+
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(cache.stats['size'], 0)
+
+    def test_lru_eviction_and_stats(self):
+        """测试 LRU 淘汰与命中统计"""
+        cache = EntityCache(maxsize=2, enabled=True)
+        for key in (1, 2, 1, 3):  # 3 淘汰最久未用的 2
+            cache.get_or_load(key, lambda key=key: {'id': key})
+
+        loader = MagicMock(return_value={'id': 2})
+        cache.get_or_load(2, loader)
+
+        loader.assert_called_once()
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['misses'], 4)
+        self.assertEqual(cache.stats['evictions'], 2)
+
+    def test_ttl_expiry(self):
+        cache = EntityCache(ttl=10, enabled=True)
+        with patch('CRUD.entity_cache.time.monotonic', return_value=100.0):
+            cache.get_or_load(1, lambda: {'id': 1})
+        loader = MagicMock(return_value={'id': 1})
+        with patch('CRUD.entity_cache.time.monotonic', return_value=111.0):
+            cache.get_or_load(1, loader)
+        loader.assert_called_once()
+
+    def test_returns_copies(self):
+        cache = EntityCache(enabled=True)
+        cache.get_or_load(1, lambda: {'status': 1})
+        cache.get_or_load(1, lambda: None)['status'] = 2
+        self.assertEqual(cache.get_or_load(1, lambda: None)['status'], 1)
+
+    def test_invalidation_during_load_is_not_overwritten(self):
+        cache = EntityCache(enabled=True)
+
+        def loader():
+            cache.invalidate(1)  # 并发写入发生在读取过程中
+            return {'status': 1}
+
+        cache.get_or_load(1, loader)
+        self.assertEqual(cache.stats['size'], 0)
+
+    def test_material_writes_invalidate(self):
+        """测试写操作使资料缓存失效"""
+        mock_db = MagicMock()
+        mock_cursor = MagicMock()
+        mock_db.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (7, 1)
+        mock_cursor.description = [('material_id',), ('status',)]
+
+        with patch('CRUD.materials_crud.material_cache', EntityCache(enabled=True)), \
+                patch('CRUD.materials_crud.reference_data'):
+            crud = MaterialCRUD(mock_db)
+            crud.get_material(7)
+            crud.get_material(7)
+            self.assertEqual(mock_cursor.execute.call_count, 1)
+
+            crud.update_material_price(7, 12.5)
+            crud.get_material(7)
+            self.assertEqual(mock_cursor.execute.call_count, 3)
+
+    def test_uncommitted_read_is_dropped_when_transaction_ends(self):
+        """测试事务内读到的未提交数据在回滚后不会留在缓存中"""
+        mock_db = MagicMock()
+        mock_cursor = MagicMock()
+        mock_db.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (7, 2)
+        mock_cursor.description = [('material_id',), ('status',)]
+
+        cache = EntityCache(enabled=True)
+        with patch('CRUD.materials_crud.material_cache', cache), \
+                patch('CRUD.materials_crud.reference_data'):
+            crud = MaterialCRUD(mock_db)
+            with self.assertRaises(RuntimeError):
+                with transaction(mock_db):
+                    crud.update_material(7, {'status': 2})
+                    crud.get_material(7)          # 未提交的行进入缓存
+                    self.assertEqual(cache.stats['size'], 1)
+                    raise ValueError("later step failed")
+            mock_db.rollback.assert_called_once()
+            self.assertEqual(cache.stats['size'], 0)
+
+    def test_change_events_invalidate(self):
+        """测试其他进程的变更通知使缓存失效"""
+        users, materials = EntityCache(enabled=True), EntityCache(enabled=True)
+        for key in (1, 2):
+            users.get_or_load(key, lambda: {'user_id': key})
+            materials.get_or_load(key, lambda: {'material_id': key})
+
+        listener = ChangeListener(connect=MagicMock())
+        seen = []
+        listener.subscribe(seen.append, tables=['users'])
+        with patch('CRUD.entity_cache.user_cache', users), \
+                patch('CRUD.entity_cache.material_cache', materials), \
+                patch('CRUD.entity_cache.reference_data') as reference_data:
+            register_invalidators(listener)
+
+            listener.dispatch({'table': 'loans', 'op': 'INSERT', 'id': 9, 'material_id': 2, 'user_id': 1})
+            listener.dispatch({'table': 'users', 'op': 'UPDATE', 'id': 1})
+            self.assertEqual((users.stats['size'], materials.stats['size']), (1, 1))
+
+            listener.dispatch(dict(RESET_EVENT))
+            self.assertEqual((users.stats['size'], materials.stats['size']), (0, 0))
+            reference_data.invalidate.assert_called_once()
+
+        self.assertEqual([event['op'] for event in seen], ['UPDATE', 'RESET'])
+
+    def test_unsubscribed_callback_gets_no_events(self):
+        listener = ChangeListener(connect=MagicMock())
+        seen = []
+        listener.subscribe(seen.append)
+        listener.unsubscribe(seen.append)
+        listener.dispatch({'table': 'users', 'op': 'UPDATE', 'id': 1})
+        self.assertEqual(seen, [])
+
+    def test_multi_row_change_events_clear_the_table(self):
+        """测试多行语句的变更通知（无主键）清空对应缓存"""
+        users, materials = EntityCache(enabled=True), EntityCache(enabled=True)
+        for key in (1, 2):
+            users.get_or_load(key, lambda: {'user_id': key})
+            materials.get_or_load(key, lambda: {'material_id': key})
+
+        listener = ChangeListener(connect=MagicMock())
+        with patch('CRUD.entity_cache.user_cache', users), \
+                patch('CRUD.entity_cache.material_cache', materials), \
+                patch('CRUD.entity_cache.reference_data'):
+            register_invalidators(listener)
+
+            listener.dispatch({'table': 'loans', 'op': 'UPDATE', 'rows': 40})
+            self.assertEqual((users.stats['size'], materials.stats['size']), (2, 0))
+
+            listener.dispatch({'table': 'users', 'op': 'INSERT', 'rows': 500})
+            self.assertEqual(users.stats['size'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from DATABASE import initializer
+from DATABASE.initializer import TABLE_SPECS, bulk_load, read_feed, sync_table, validate_row
+
+
+class InitializerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        patcher = patch.object(initializer, 'CSV_DIR', self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.quarantine_dir = os.path.join(self.dir, 'rejected')
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value.__enter__.return_value = self.mock_cursor
+
+    def write_csv(self, name, rows):
+        with open(os.path.join(self.dir, name), 'w', encoding='utf-8', newline='') as file:
+            csv.writer(file).writerows(rows)
+
+    def quarantined(self, table):
+        with open(os.path.join(self.quarantine_dir, f"{table}.rejected.csv"), encoding='utf-8', newline='') as file:
+            return [row[0] for row in csv.reader(file)]
+
+
+class TestBulkLoad(InitializerTestCase):
+    def test_validate_row(self):
+        """测试CSV行校验与类型转换"""
+        _, columns = TABLE_SPECS['users']
+        self.assertEqual(validate_row([' Ann ', '', '1'], columns), ['Ann', None, 1])
+        with self.assertRaises(ValueError):
+            validate_row(['', 'a@b.c', '1'], columns)
+        with self.assertRaises(ValueError):
+            validate_row(['Ann', '1'], columns)
+
+    def test_bulk_load_copies_valid_rows_and_quarantines_bad_ones(self):
+        self.write_csv('Users.csv', [['name', 'contact', 'user_type_id'],
+                                     ['Ann', 'a@x', '1'], ['', 'b@x', '1'], ['Cy', '', 'x']])
+        loaded, rejected, _ = bulk_load(self.mock_conn, 'users', quarantine_dir=self.quarantine_dir)
+        self.assertEqual((loaded, rejected), (1, 2))
+        self.mock_cursor.copy_expert.assert_called_once()
+        self.assertEqual(self.quarantined('users'), ['2', '3'])
+
+    def test_resume_does_not_quarantine_rows_twice(self):
+        """测试 --resume 重新读取检查点之后的行时，隔离文件中不出现重复"""
+        self.write_csv('Users.csv', [['name', 'contact', 'user_type_id'],
+                                     ['Ann', 'a@x', '1'], ['', 'b@x', '1'], ['Cy', 'c@x', '1'], ['Di', 'd@x', 'x']])
+        checkpoint = os.path.join(self.dir, 'checkpoints.json')
+        self.mock_cursor.copy_expert.side_effect = [None, Exception("connection lost")]
+        with self.assertRaises(Exception):
+            bulk_load(self.mock_conn, 'users', batch_size=1, quarantine_dir=self.quarantine_dir,
+                      checkpoint_path=checkpoint)
+        self.assertEqual(initializer._read_checkpoints(checkpoint), {'users': 1})
+        self.assertEqual(self.quarantined('users'), ['2'])
+
+        self.mock_cursor.copy_expert.side_effect = None
+        loaded, rejected, _ = bulk_load(self.mock_conn, 'users', batch_size=1, resume_from=1,
+                                        quarantine_dir=self.quarantine_dir, checkpoint_path=checkpoint)
+        self.assertEqual((loaded, rejected), (1, 2))
+        self.assertEqual(self.quarantined('users'), ['2', '4'])
+        self.assertEqual(initializer._read_checkpoints(checkpoint), {'users': 4})
+
+    def test_fresh_run_starts_a_new_quarantine_file(self):
+        self.write_csv('Users.csv', [['name', 'contact', 'user_type_id'], ['', 'b@x', '1']])
+        bulk_load(self.mock_conn, 'users', quarantine_dir=self.quarantine_dir)
+        bulk_load(self.mock_conn, 'users', quarantine_dir=self.quarantine_dir)
+        self.assertEqual(self.quarantined('users'), ['1'])
+
+
+class TestSync(InitializerTestCase):
+    def executed(self):
+        return [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+
+    def test_read_feed_quarantines_rows_without_natural_key(self):
+        """测试联系方式为空的用户行被隔离，而不是按空键互相覆盖"""
+        self.write_csv('Users.csv', [['name', 'contact', 'user_type_id'],
+                                     ['Ann', '', '1'], ['Bo', '', '2'], ['Cy', 'c@x', '1'], ['Cy 2', 'c@x', '1']])
+        feed = read_feed('users', self.quarantine_dir)
+        self.assertEqual(list(feed), ['["c@x"]'])
+        self.assertEqual(self.quarantined('users'), ['1', '2', '4'])
+
+    def test_read_feed_numbers_copies_of_one_title(self):
+        self.write_csv('Materials.csv', [
+            ['material_name', 'author', 'publisher', 'publication_date', 'type_id', 'status', 'price'],
+            ['Dune', 'Herbert', '', '', '1', '1', '9.90'],
+            ['Dune', 'Herbert', '', '', '1', '1', '9.90'],
+            ['Emma', '', '', '', '1', '1', ''],
+        ])
+        feed = read_feed('materials', self.quarantine_dir)
+        self.assertEqual(list(feed), ['["Dune", "Herbert", null, 1]', '["Dune", "Herbert", null, 2]',
+                                      '["Emma", null, null, 1]'])
+
+    def test_sync_table_matches_copies_and_keeps_referenced_rows(self):
+        self.write_csv('Materials.csv', [
+            ['material_name', 'author', 'publisher', 'publication_date', 'type_id', 'status', 'price'],
+            ['Dune', 'Herbert', '', '', '1', '1', '9.90'],
+            ['Dune', 'Herbert', '', '', '1', '1', '9.90'],
+        ])
+        self.mock_cursor.fetchall.return_value = [
+            ('["Dune", "Herbert", null, 1]', 'old'),
+            ('["Dune", "Herbert", null, 3]', 'gone'),
+            ('["Emma", null, null]', 'legacy'),
+        ]
+        self.mock_cursor.rowcount = 2   # copy 3 deleted, plus the legacy fingerprint
+
+        changed, deleted, unchanged = sync_table(self.mock_conn, 'materials', quarantine_dir=self.quarantine_dir)
+
+        self.assertEqual((changed, deleted, unchanged), (2, 1, 0))
+        update = next(sql for sql in self.executed() if 'UPDATE materials' in sql)
+        self.assertIn("row_number() OVER (PARTITION BY material_name, author, publisher ORDER BY material_id)",
+                      update)
+        self.assertIn("n.copy_no IS NOT DISTINCT FROM s.copy_no", update)
+        delete = self.executed()[-1]
+        self.assertIn("NOT EXISTS (SELECT 1 FROM loans r WHERE r.material_id = t.material_id)", delete)
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], ('materials', ['["Emma", null, null]']))
+        staged = self.mock_cursor.copy_expert.call_args_list[1][0][1].getvalue()
+        self.assertEqual(staged.strip(), 'Dune,Herbert,,"[""Dune"", ""Herbert"", null, 3]",3')
+        self.mock_conn.commit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -40,6 +40,21 @@ class TestInvoiceCRUD(unittest.TestCase):
         self.assertEqual(len(invoices), 1)
         self.assertEqual(invoices[0]['amount'], 100.0)
 
+    def test_get_by_users_groups_by_user(self):
+        self.mock_cursor.fetchall.return_value = [
+            (1, 10, 100.0, 40.0, 60.0, 'Unpaid'),
+            (2, 10, 20.0, 20.0, 0.0, 'Paid'),
+            (3, 11, 5.0, 0.0, 5.0, 'Unpaid'),
+        ]
+        self.mock_cursor.description = [('invoice_id',), ('user_id',), ('amount',), ('paid_amount',),
+                                         ('outstanding_amount',), ('payment_status',)]
+
+        invoices = self.crud.get_by_users([10, 11])
+
+        self.assertEqual(len(invoices[10]), 2)
+        self.assertEqual(invoices[11][0]['outstanding_amount'], 5.0)
+        self.mock_cursor.execute.assert_called_once()
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timedelta
 from CRUD.loans_crud import LoanCRUD
+from CRUD.reference_data import BorrowingRules
+from DATABASE.transaction import transaction
 
 
 class TestLoanCRUD(unittest.TestCase):
@@ -11,11 +13,15 @@ class TestLoanCRUD(unittest.TestCase):
         self.mock_cursor = MagicMock()
         self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
 
+        # 借阅规则来自参考数据缓存
+        patcher = patch('CRUD.loans_crud.reference_data')
+        self.reference_data = patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_create_loan_with_rules(self):
         """测试带规则的借阅创建"""
-        # 模拟数据库返回规则
+        self.reference_data.borrowing_rules.return_value = BorrowingRules(5, 56, 0.50)
         self.mock_cursor.fetchone.side_effect = [
-            (5, 56, 0.50),  # 规则查询
             (3,),  # 当前借阅量
             (101,)  # 新建借阅ID
         ]
@@ -23,6 +29,7 @@ class TestLoanCRUD(unittest.TestCase):
         success, loan_id = self.crud.create_loan(1, 1, 1)
         self.assertTrue(success)
         self.assertEqual(loan_id, 101)
+        self.reference_data.borrowing_rules.assert_called_once_with(self.mock_db, 1)
 
     def test_return_material_with_dynamic_fee(self):
         """测试动态逾期费计算"""
@@ -36,9 +43,9 @@ class TestLoanCRUD(unittest.TestCase):
         for user_type, fee_rate, overdue_days, expected_fee in test_data:
             with self.subTest(user_type=user_type):
                 # 模拟数据库返回
+                self.reference_data.borrowing_rules.return_value = BorrowingRules(5, 30, fee_rate)
                 self.mock_cursor.fetchone.side_effect = [
                     (1, datetime.now() - timedelta(days=overdue_days), user_type),
-                    (None, None, fee_rate)  # 规则查询
                 ]
 
                 success, fee, _ = self.crud.return_material(1)
@@ -46,5 +53,45 @@ class TestLoanCRUD(unittest.TestCase):
                 self.assertAlmostEqual(fee, expected_fee, places=2)
 
 
+    def test_get_overdue_loans_reads_precomputed_set(self):
+        """测试逾期查询读取预计算的 overdue_loans 表"""
+        self.mock_cursor.fetchone.return_value = (True,)
+        self.mock_cursor.description = [('loan_id',), ('name',)]
+        self.mock_cursor.fetchall.return_value = [(7, "林娟")]
+
+        loans = self.crud.get_overdue_loans()
+
+        self.assertEqual(loans, [{'loan_id': 7, 'name': "林娟"}])
+        self.assertIn("FROM overdue_loans", self.mock_cursor.execute.call_args[0][0])
+
+        # 表是否存在只检查一次
+        self.crud.get_overdue_loans()
+        self.assertEqual(self.mock_cursor.fetchone.call_count, 1)
+
+    def test_failed_read_does_not_end_the_enclosing_transaction(self):
+        """测试读取失败时不会回滚外层事务"""
+        self.mock_cursor.execute.side_effect = Exception("statement timeout")
+        with transaction(self.mock_db):
+            self.assertIsNone(self.crud.get_active_loan_by_user_and_material(1, 2))
+            self.mock_db.rollback.assert_not_called()
+        self.mock_db.commit.assert_called_once()
+
+    def test_loan_history_pages_by_date_and_id(self):
+        """测试借阅历史按(借阅日期, ID)降序键集分页"""
+        self.mock_cursor.description = [('loan_id',), ('loan_date',)]
+        self.mock_cursor.fetchall.return_value = [(7, datetime(2024, 3, 1).date())]
+
+        self.crud.get_loan_history(3, limit=10)
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("ORDER BY l.loan_date DESC, l.loan_id DESC", sql)
+        self.assertEqual(params, [3, 10])
+
+        last = datetime(2024, 3, 1).date()
+        self.crud.get_loan_history(3, before=(last, 7), limit=10)
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("(l.loan_date, l.loan_id) < (%s, %s)", sql)
+        self.assertEqual(params, [3, last, 7, 10])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
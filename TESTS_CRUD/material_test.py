@@ -1,7 +1,8 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from CRUD.materials_crud import MaterialCRUD
 from CRUD.constants import MaterialStatus
+from CRUD.reference_data import MaterialTypeInfo
 
 
 class TestMaterialCRUD(unittest.TestCase):
@@ -11,6 +12,12 @@ class TestMaterialCRUD(unittest.TestCase):
         self.mock_cursor = MagicMock()
         self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
 
+        # 类型信息来自参考数据缓存，不再联表查询
+        patcher = patch('CRUD.materials_crud.reference_data')
+        self.reference_data = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reference_data.material_type.return_value = MaterialTypeInfo(1, "Book")
+
     def test_create_material_success(self):
         self.mock_cursor.fetchone.return_value = (101,)
 
@@ -28,6 +35,92 @@ class TestMaterialCRUD(unittest.TestCase):
 
         self.assertEqual(len(materials), 2)
 
+    def test_get_materials_by_ids(self):
+        self.mock_cursor.fetchall.return_value = [(101, "Book1", 1, 1), (102, "Book2", 2, 1)]
+        self.mock_cursor.description = [('material_id',), ('material_name',), ('status',), ('type_id',)]
+
+        materials = self.crud.get_materials_by_ids([101, 102, 101])
+
+        self.assertEqual(set(materials), {101, 102})
+        self.assertEqual(materials[102]["status_name"], "Borrowed")
+        self.assertEqual(materials[101]["type_name"], "Book")
+        self.mock_cursor.execute.assert_called_once()
+        self.assertCountEqual(self.mock_cursor.execute.call_args[0][1][0], [101, 102])
+
+    def test_search_escapes_like_pattern_and_filters(self):
+        self.mock_cursor.fetchall.return_value = [(101, "100% Python", 1, 0.5)]
+        self.mock_cursor.description = [('material_id',), ('material_name',), ('status',), ('rank',)]
+
+        materials = self.crud.search("100%", type_id=1, status=MaterialStatus.AVAILABLE.value, limit=10)
+
+        self.assertEqual(materials[0]["status_name"], "Available")
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("CAST(%s AS tsquery)", sql)
+        self.assertEqual(params, ["'100'", "%100\\%%", "%100\\%%", 1, 1, "100%", 10, 0])
+
+    def test_search_without_index_falls_back_to_substring_match(self):
+        self.mock_cursor.fetchone.return_value = (False,)
+        self.mock_cursor.fetchall.return_value = [(101, "Dune", 1)]
+        self.mock_cursor.description = [('material_id',), ('material_name',), ('status',)]
+
+        materials = self.crud.search("dun", status=MaterialStatus.AVAILABLE.value)
+
+        self.assertEqual(materials[0]["material_name"], "Dune")
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertNotIn("search_vector", sql)
+        self.assertNotIn("similarity", sql)
+        self.assertEqual(params, ["%dun%", "%dun%", 1, 50, 0])
+
+    def test_search_blank_query(self):
+        self.assertEqual(self.crud.search("   "), [])
+        self.mock_cursor.execute.assert_not_called()
+
+    def test_get_materials_by_ids_empty(self):
+        self.assertEqual(self.crud.get_materials_by_ids([]), {})
+        self.mock_cursor.execute.assert_not_called()
+
+    def test_list_materials_seeks_past_last_id(self):
+        """测试键集分页：从上一页最后一个ID之后开始，不使用OFFSET"""
+        self.mock_cursor.description = [('material_id',), ('type_id',)]
+        self.mock_cursor.fetchall.return_value = [(21, 1), (22, 1)]
+
+        page = self.crud.list_materials(after_id=20, status=MaterialStatus.AVAILABLE.value, limit=2)
+
+        self.assertEqual([m['material_id'] for m in page], [21, 22])
+        self.assertEqual(page[0]['type_name'], "Book")
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("m.material_id > %s", sql)
+        self.assertNotIn("OFFSET", sql)
+        self.assertEqual(params, [20, MaterialStatus.AVAILABLE.value, 2])
+
+    def test_list_materials_projects_requested_fields(self):
+        """测试只查询视图需要的列；类型名称由type_id推导"""
+        self.mock_cursor.description = [('material_id',), ('material_name',), ('type_id',)]
+        self.mock_cursor.fetchall.return_value = [(1, "Dune", 1)]
+
+        page = self.crud.list_materials(fields=('material_name', 'type_name', 'material_id'))
+
+        sql = self.mock_cursor.execute.call_args[0][0]
+        self.assertIn("SELECT m.material_id, m.material_name, m.type_id\n", sql)
+        self.assertEqual(page[0]["type_name"], "Book")
+
+        self.mock_cursor.description = [('material_id',), ('status',)]
+        self.mock_cursor.fetchall.return_value = [(1, 1)]
+        self.reference_data.reset_mock()
+        self.crud.list_materials(after_id=1, fields=('status',))
+        self.reference_data.material_type.assert_not_called()
+
+        with self.assertRaises(ValueError):
+            self.crud.list_materials(fields=('search_vector',))
+
+    def test_list_materials_first_page(self):
+        self.mock_cursor.description = [('material_id',)]
+        self.mock_cursor.fetchall.return_value = []
+        self.crud.list_materials(limit=100)
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertNotIn("WHERE", sql)
+        self.assertEqual(params, [100])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
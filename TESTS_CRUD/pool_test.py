@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from psycopg2.pool import PoolError
+from DATABASE.database import ConnectionPool, Database
+
+
+def fake_connection():
+    conn = MagicMock()
+    conn.closed = False
+    conn.autocommit = False
+    return conn
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.opened = []
+
+        def connect():
+            conn = fake_connection()
+            self.opened.append(conn)
+            return conn
+
+        self.pool = ConnectionPool(connect, minconn=1, maxconn=2, timeout=0.05, check_interval=0)
+
+    def test_exhausted_pool_times_out(self):
+        """测试连接耗尽时在超时后抛出 PoolError"""
+        first, second = self.pool.getconn(), self.pool.getconn()
+        self.assertEqual(self.pool.stats['size'], 2)
+        started = time.monotonic()
+        with self.assertRaises(PoolError):
+            self.pool.getconn()
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.pool.putconn(first)
+        self.pool.putconn(second)
+
+    def test_waiting_checkout_gets_returned_connection(self):
+        first, second = self.pool.getconn(), self.pool.getconn()
+        threading.Timer(0.01, self.pool.putconn, args=(first,)).start()
+        self.assertIs(self.pool.getconn(timeout=1), first)
+        first.rollback.assert_called()
+
+    def test_unhealthy_idle_connection_is_discarded(self):
+        idle = self.opened[0]
+        idle.cursor.return_value.__enter__.return_value.execute.side_effect = Exception("gone")
+        conn = self.pool.getconn()
+        self.assertIsNot(conn, idle)
+        idle.close.assert_called_once()
+        self.assertEqual(self.pool.stats['size'], 1)
+
+    def test_putconn_after_closeall_closes_connection(self):
+        conn = self.pool.getconn()
+        self.pool.closeall()
+        self.pool.putconn(conn)
+        conn.close.assert_called_once()
+        self.assertEqual(self.pool.stats, {'size': 0, 'idle': 0, 'maxconn': 2})
+        with self.assertRaises(PoolError):
+            self.pool.getconn()
+
+    def test_broken_connection_is_not_returned_to_pool(self):
+        conn = self.pool.getconn()
+        conn.rollback.side_effect = Exception("connection lost")
+        self.pool.putconn(conn)
+        conn.close.assert_called_once()
+        self.assertEqual(self.pool.stats['idle'], 0)
+
+
+class TestDatabaseConnection(unittest.TestCase):
+    def test_error_in_block_is_not_hidden_by_broken_connection(self):
+        pool = MagicMock()
+        conn = fake_connection()
+        conn.rollback.side_effect = Exception("connection lost")
+        pool.getconn.return_value = conn
+        db = Database(pooled=True)
+        with patch.object(Database, 'pool', pool):
+            with self.assertRaises(ValueError):
+                with db.connection():
+                    raise ValueError("original")
+        pool.putconn.assert_called_once_with(conn)
+
+    def test_instances_get_a_new_pool_after_close_pools(self):
+        """测试 close_pools() 之后已有实例会取得新的连接池"""
+        opened = []
+
+        def connector(*args):
+            def connect():
+                opened.append(fake_connection())
+                return opened[-1]
+            return connect
+
+        db = Database(pooled=True)
+        with patch.object(Database, '_config', return_value={'host': 'pool-test'}), \
+                patch.object(Database, '_pool_settings', return_value={'minconn': 0, 'maxconn': 2}), \
+                patch.object(Database, '_driver_settings', return_value={'driver': 'psycopg2', 'binary': True}), \
+                patch('DATABASE.database.connector', connector):
+            conn = db.connect()
+            first = db.pool
+            Database.close_pools()
+
+            self.assertTrue(first.closed)
+            self.assertIsNot(db.pool, first)
+            self.assertFalse(db.pool.closed)
+            db.disconnect()                 # 归还给已关闭的旧连接池：直接关闭
+            conn.close.assert_called_once()
+            self.assertEqual(db.pool.stats['idle'], 0)
+
+            self.assertIsNotNone(db.connect())
+            Database.close_pools()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from CRUD.prepared import PreparedStatements
+from CRUD.loans_crud import LoanCRUD
+from CRUD import prepared
+from DATABASE.transaction import transaction
+
+
+class MissingStatement(Exception):
+    pgcode = '26000'
+
+
+class TestPreparedStatements(unittest.TestCase):
+    def setUp(self):
+        self.mock_db = MagicMock()
+        self.mock_db.autocommit = False
+        self.mock_db.info.backend_pid = 4242
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.connection = self.mock_db
+        self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.registry = PreparedStatements(enabled=True)
+        self.registry.register('user_by_id', "SELECT * FROM users WHERE user_id = %s AND name LIKE 'a%%'",
+                               ('integer',))
+
+    def statements(self):
+        return [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+
+    def test_prepared_once_per_session(self):
+        """测试每个会话只PREPARE一次，之后按名称执行"""
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.registry.execute(self.mock_cursor, 'user_by_id', (2,))
+        self.assertEqual(self.statements(), [
+            "PREPARE user_by_id (integer) AS SELECT * FROM users WHERE user_id = $1 AND name LIKE 'a%'",
+            "EXECUTE user_by_id (%s)",
+            "EXECUTE user_by_id (%s)",
+        ])
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], (2,))
+
+    def test_new_backend_prepares_again(self):
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.mock_db.info.backend_pid = 5151   # reconnected
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.assertEqual(self.registry.stats['prepares'], 2)
+
+    def test_lost_statement_falls_back_to_plain_query(self):
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.mock_cursor.execute.side_effect = [MissingStatement(), None]
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+
+        self.mock_db.rollback.assert_called_once()
+        self.assertIn("SELECT * FROM users", self.statements()[-1])
+        self.mock_cursor.execute.side_effect = None
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.assertTrue(self.statements()[-2].startswith("PREPARE user_by_id"))
+
+    def test_lost_statement_inside_transaction_propagates(self):
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.mock_cursor.execute.side_effect = MissingStatement()
+        with self.assertRaises(RuntimeError):
+            with transaction(self.mock_db):
+                self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.mock_db.rollback.assert_called_once()
+
+    def test_counters_are_exact_across_threads(self):
+        """测试多线程共享注册表时计数不丢失"""
+        def run():
+            for _ in range(500):
+                self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.registry.stats['executions'], 4000)
+
+    def test_disabled_runs_plain_sql(self):
+        self.registry.disable()
+        self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.assertEqual(self.statements(), ["SELECT * FROM users WHERE user_id = %s AND name LIKE 'a%%'"])
+
+    def test_psycopg3_uses_driver_prepared_statements(self):
+        with patch.object(prepared, 'is_psycopg3', return_value=True):
+            self.registry.execute(self.mock_cursor, 'user_by_id', (1,))
+        self.mock_cursor.execute.assert_called_once_with(
+            "SELECT * FROM users WHERE user_id = %s AND name LIKE 'a%%'", (1,), prepare=True)
+
+    def test_registration_checks(self):
+        with self.assertRaises(ValueError):
+            self.registry.register('user_by_id', "SELECT 1")
+        with self.assertRaises(ValueError):
+            self.registry.register('two_params', "SELECT %s, %s", ('integer',))
+
+    def test_create_loan_uses_prepared_statements(self):
+        prepared.prepared_statements.enable()
+        self.addCleanup(prepared.prepared_statements.disable)
+        self.addCleanup(prepared.prepared_statements.forget, self.mock_db)
+        crud = LoanCRUD(self.mock_db)
+        crud._get_borrowing_rules = MagicMock(return_value=(5, 14, 0.5))
+        self.mock_cursor.fetchone.side_effect = [(0,), (77,)]
+
+        self.assertEqual(crud.create_loan(1, 2, 1), (True, 77))
+        executed = [sql.split(' (')[0] for sql in self.statements() if sql.startswith('EXECUTE')]
+        self.assertEqual(executed, ["EXECUTE open_loan_count", "EXECUTE loan_insert",
+                                    "EXECUTE material_set_status"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from CRUD.query_cache import QueryCache, TableVersions, bump_from_event
+from CRUD.materials_crud import MaterialCRUD
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.mock_db = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.description = [('material_id',), ('status',)]
+        self.mock_cursor.fetchall.return_value = [(1, 1), (2, 1)]
+        self.versions = TableVersions()
+        self.cache = QueryCache(self.versions, maxsize=2, enabled=True)
+
+    def test_repeated_reads_hit_until_table_changes(self):
+        """测试相同查询命中缓存，直到相关表版本变化"""
+        sql = "SELECT * FROM materials WHERE status = %s"
+        self.cache.fetch(self.mock_db, sql, [1], tables=('materials',))
+        rows = self.cache.fetch(self.mock_db, sql, [1], tables=('materials',))
+        self.assertEqual(rows, [{'material_id': 1, 'status': 1}, {'material_id': 2, 'status': 1}])
+        self.assertEqual(self.mock_cursor.execute.call_count, 1)
+
+        self.versions.bump('users')  # 无关表
+        self.cache.fetch(self.mock_db, sql, [1], tables=('materials',))
+        self.assertEqual(self.mock_cursor.execute.call_count, 1)
+
+        self.versions.bump('materials')
+        self.cache.fetch(self.mock_db, sql, [1], tables=('materials',))
+        self.assertEqual(self.mock_cursor.execute.call_count, 2)
+        self.assertEqual(self.cache.stats['hits'], 2)
+
+    def test_params_are_part_of_the_key_and_size_is_bounded(self):
+        for status in (1, 2, 3):
+            self.cache.fetch(self.mock_db, "SELECT * FROM materials WHERE status = %s", (status,))
+        self.assertEqual(self.cache.stats['size'], 2)
+        self.assertEqual(self.cache.stats['evictions'], 1)
+
+    def test_results_are_copies(self):
+        self.cache.fetch(self.mock_db, "SELECT 1")[0]['status_text'] = 'AVAILABLE'
+        self.assertNotIn('status_text', self.cache.fetch(self.mock_db, "SELECT 1")[0])
+
+    def test_crud_writes_bump_versions(self):
+        """测试 CRUD 写操作使列表查询缓存失效"""
+        versions = TableVersions()
+        with patch('CRUD.query_cache.table_versions', versions), \
+                patch('CRUD.materials_crud.query_cache', QueryCache(versions, enabled=True)):
+            crud = MaterialCRUD(self.mock_db)
+            crud.get_available_materials()
+            crud.get_available_materials()
+            self.assertEqual(self.mock_cursor.execute.call_count, 1)
+
+            crud.update_material_price(1, 9.9)
+            crud.get_available_materials()
+            self.assertEqual(self.mock_cursor.execute.call_count, 3)
+
+            bump_from_event({'table': 'material_types', 'op': 'UPDATE', 'id': 1})
+            crud.get_available_materials()
+            self.assertEqual(self.mock_cursor.execute.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
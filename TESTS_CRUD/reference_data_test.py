@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from CRUD.reference_data import ReferenceData, BorrowingRules
+
+
+class TestReferenceData(unittest.TestCase):
+    def setUp(self):
+        self.mock_db = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchall.side_effect = [
+            [(1, "Student", 5, 30, 0.5), (2, "Teacher", 10, 60, 0.25)],  # user_types
+            [(1, "Book")],  # material_types
+        ]
+        self.mock_cursor.fetchone.return_value = ("v1",)
+        self.cache = ReferenceData(max_age=60)
+
+    def test_rules_loaded_once(self):
+        """测试规则只加载一次，并包含真实的逾期费率"""
+        rules = self.cache.borrowing_rules(self.mock_db, 2)
+        self.assertEqual(rules, BorrowingRules(10, 60, 0.25))
+        max_books, max_days, fee = self.cache.borrowing_rules(self.mock_db, 1)
+        self.assertEqual((max_books, max_days, fee), (5, 30, 0.5))
+        self.assertEqual(self.cache.material_type(self.mock_db, 1).type_name, "Book")
+        self.assertEqual(self.mock_cursor.execute.call_count, 3)
+
+    def test_version_check_after_max_age(self):
+        """测试超过有效期后先比较版本，未变化则不重新加载"""
+        with patch('CRUD.reference_data.time.monotonic', return_value=1000.0):
+            self.cache.load(self.mock_db)
+        with patch('CRUD.reference_data.time.monotonic', return_value=1100.0):
+            self.assertEqual(self.cache.user_type(self.mock_db, 1).type_name, "Student")
+        self.assertEqual(self.mock_cursor.execute.call_count, 4)  # 加载3条 + 版本检查1条
+
+    def test_unknown_type_reloads_once_per_version(self):
+        """测试不存在的类型只触发一次重新加载，直到下次版本变化"""
+        self.mock_cursor.fetchall.side_effect = None
+        self.mock_cursor.fetchall.return_value = [(1, "Student", 5, 30, 0.5)]
+        with patch('CRUD.reference_data.time.monotonic', return_value=1000.0):
+            self.cache.load(self.mock_db)
+            for _ in range(5):
+                self.assertIsNone(self.cache.borrowing_rules(self.mock_db, 99))
+        self.assertEqual(self.mock_cursor.execute.call_count, 6)  # 初次加载3条 + 一次重新加载3条
+
+        self.mock_cursor.fetchone.return_value = ("v2",)   # 类型表已变化
+        with patch('CRUD.reference_data.time.monotonic', return_value=1100.0):
+            self.assertIsNone(self.cache.borrowing_rules(self.mock_db, 99))
+            self.assertIsNone(self.cache.borrowing_rules(self.mock_db, 99))
+        self.assertEqual(self.mock_cursor.execute.call_count, 10)  # 版本检查1条 + 重新加载3条
+
+    def test_invalidate_forces_reload(self):
+        self.cache.load(self.mock_db)
+        self.cache.invalidate()
+        self.mock_cursor.fetchall.side_effect = [[(1, "Student", 8, 30, 0.5)], []]
+
+        self.assertEqual(self.cache.borrowing_rules(self.mock_db, 1).max_borrowings, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
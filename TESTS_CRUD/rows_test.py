@@ -0,0 +1,81 @@
+import copy
+import csv
+import io
+import json
+import pickle
+import unittest
+from unittest.mock import MagicMock
+from CRUD.rows import as_dict, fetch_dicts, fetch_records, merge, record_class
+
+
+class TestRows(unittest.TestCase):
+    def setUp(self):
+        self.cursor = MagicMock()
+        self.cursor.description = [('material_id',), ('material_name',), ('status',)]
+        self.cursor.fetchall.return_value = [(1, "红楼梦", 1), (2, "Dune", 2)]
+
+    def test_records_read_like_dicts(self):
+        """测试记录对象与字典的读取方式兼容"""
+        record = fetch_records(self.cursor)[0]
+        self.assertEqual(record['material_name'], "红楼梦")
+        self.assertEqual(record.values(), (1, "红楼梦", 1))
+        self.assertEqual(record.get('author', '-'), '-')
+        self.assertIn('status', record)
+        self.assertEqual(list(record), ['material_id', 'material_name', 'status'])
+        self.assertEqual(dict(record), {'material_id': 1, 'material_name': "红楼梦", 'status': 1})
+        self.assertEqual(record, {'material_id': 1, 'material_name': "红楼梦", 'status': 1})
+        self.assertNotEqual(record, {'material_id': 1})
+        with self.assertRaises(KeyError):
+            record['author']
+        with self.assertRaises(KeyError):
+            record[0]               # 不是元组，不支持按位置取值
+
+    def test_records_serialize_like_dicts(self):
+        """测试记录对象写入 CSV 和 JSON 时与字典一致"""
+        records = fetch_records(self.cursor)
+        dicts = fetch_dicts(self.cursor)
+
+        def to_csv(rows):
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=['material_id', 'material_name', 'status'])
+            writer.writeheader()
+            writer.writerows(rows)
+            return out.getvalue()
+
+        self.assertEqual(to_csv(records), to_csv(dicts))
+        self.assertIn("1,红楼梦,1", to_csv(records))
+        self.assertEqual(json.dumps(records, default=dict, ensure_ascii=False),
+                         json.dumps(dicts, ensure_ascii=False))
+        first, second, third = records[0]   # 解包得到列名，与字典相同
+        self.assertEqual((first, second, third), tuple(dicts[0]))
+
+    def test_classes_are_cached_by_column_signature(self):
+        first = fetch_records(self.cursor)
+        second = fetch_records(self.cursor, [(3, "Emma", 1)])
+        self.assertIs(type(first[0]), type(second[0]))
+        self.assertIs(type(first[0]), record_class(('material_id', 'material_name', 'status')))
+        self.assertFalse(hasattr(first[0], '__dict__'))
+
+    def test_merge_copies_records_and_updates_dicts(self):
+        record = fetch_records(self.cursor)[1]
+        merged = merge(record, status=1, type_name="Book")
+        self.assertEqual(record['status'], 2)  # 原记录不变
+        self.assertEqual(merged, {'material_id': 2, 'material_name': "Dune", 'status': 1, 'type_name': "Book"})
+
+        row = fetch_dicts(self.cursor)[1]
+        self.assertIs(merge(row, status=1), row)
+        self.assertEqual(row['status'], 1)
+
+    def test_copy_and_hash(self):
+        record = fetch_records(self.cursor)[0]
+        self.assertEqual(copy.deepcopy(record), record)
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+        self.assertEqual(len({record, fetch_records(self.cursor)[0]}), 1)
+
+    def test_as_dict(self):
+        self.assertEqual(as_dict(self.cursor, (5, "Emma", 1)), {'material_id': 5, 'material_name': "Emma", 'status': 1})
+        self.assertIsNone(as_dict(self.cursor, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
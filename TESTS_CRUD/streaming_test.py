@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from CRUD.streaming import iter_rows
+from CRUD.materials_crud import MaterialCRUD
+from CRUD.reference_data import MaterialTypeInfo
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.mock_db = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.description = [('material_id',), ('type_id',)]
+        self.mock_cursor.fetchmany.side_effect = [[(1, 1), (2, 1)], [(3, 2)], []]
+
+    def test_rows_come_from_a_named_cursor_in_batches(self):
+        """测试使用服务器端命名游标分批读取"""
+        rows = iter_rows(self.mock_db, "SELECT material_id, type_id FROM materials", batch_size=2)
+        self.mock_db.cursor.assert_not_called()  # 惰性：迭代前不执行查询
+
+        self.assertEqual(next(rows), {'material_id': 1, 'type_id': 1})
+        self.assertIn('name', self.mock_db.cursor.call_args.kwargs)
+        self.assertEqual(self.mock_cursor.itersize, 2)
+        self.assertEqual(list(rows), [{'material_id': 2, 'type_id': 1}, {'material_id': 3, 'type_id': 2}])
+        self.mock_cursor.fetchmany.assert_called_with(2)
+        self.assertEqual(self.mock_cursor.fetchmany.call_count, 3)
+
+    def test_cursor_names_are_unique(self):
+        list(iter_rows(self.mock_db, "SELECT 1"))
+        self.mock_cursor.fetchmany.side_effect = [[]]
+        list(iter_rows(self.mock_db, "SELECT 1"))
+        names = [call.kwargs['name'] for call in self.mock_db.cursor.call_args_list if call.kwargs]
+        self.assertEqual(len(set(names)), 2)
+
+    @patch('CRUD.materials_crud.reference_data')
+    def test_iter_all_materials_adds_type_names(self, mock_reference_data):
+        mock_reference_data.material_type.side_effect = \
+            lambda conn, type_id: MaterialTypeInfo(type_id, {1: 'Book', 2: 'DVD'}[type_id])
+        materials = list(MaterialCRUD(self.mock_db).iter_all_materials(batch_size=2))
+        self.assertEqual([m['type_name'] for m in materials], ['Book', 'Book', 'DVD'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+from CRUD.tokenizer import tokenize, to_tsquery
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_latin_words_and_cjk_bigrams(self):
+        self.assertEqual(tokenize("Python 图书馆"), ['python', '图书', '书馆', '馆'])
+        self.assertEqual(tokenize("Python 图书馆", for_query=True), ['python', '图书', '书馆'])
+
+    def test_full_width_text_is_normalized(self):
+        """测试全角字符规范化"""
+        self.assertEqual(tokenize("ＳＱＬ　数据库"), ['sql', '数据', '据库', '库'])
+
+    def test_single_character_run(self):
+        self.assertEqual(tokenize("第1卷 书", for_query=True), ['第', '1', '卷', '书'])
+
+    def test_tsquery_quotes_lexemes(self):
+        self.assertEqual(to_tsquery("O'Neil 数据库"), "'o' & 'neil' & '数据' & '据库'")
+        self.assertEqual(to_tsquery("书", mode='or'), "'书':*")
+        self.assertIsNone(to_tsquery("!!"))
+
+
+if __name__ == '__main__':
+    unittest.main()
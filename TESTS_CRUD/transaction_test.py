@@ -0,0 +1,251 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from DATABASE.transaction import after_transaction, read_only_transaction, transaction, transaction_depth
+from CRUD.materials_crud import MaterialCRUD
+from CRUD.invoices_crud import InvoiceCRUD
+from CRUD.streaming import iter_rows
+from DATABASE import drivers
+
+try:
+    import psycopg
+except ImportError:   # psycopg 3 is optional
+    psycopg = None
+
+
+class _StrictConnection:
+    """Like psycopg2: autocommit cannot change while a transaction is open"""
+
+    def __init__(self, rows):
+        self._autocommit = True
+        self.in_transaction = False
+        self.rows = list(rows)
+        self.commits = self.rollbacks = 0
+
+    @property
+    def autocommit(self):
+        return self._autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        if self.in_transaction:
+            raise drivers.psycopg2.ProgrammingError("set_session cannot be used inside a transaction")
+        self._autocommit = value
+
+    def cursor(self, name=None):
+        conn = self
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.description = [('material_id',)]
+
+        def execute(sql, params=None):
+            if not conn.autocommit:
+                conn.in_transaction = True
+
+        def fetchmany(size):
+            batch, conn.rows = conn.rows[:size], conn.rows[size:]
+            return batch
+
+        cursor.execute.side_effect = execute
+        cursor.fetchmany.side_effect = fetchmany
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+        self.in_transaction = False
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+
+class TestTransaction(unittest.TestCase):
+    def setUp(self):
+        self.mock_db = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
+
+    def statements(self):
+        return [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+
+    def test_nested_scopes_use_savepoints_and_commit_once(self):
+        """测试嵌套事务使用保存点，只在最外层提交一次"""
+        with transaction(self.mock_db):
+            with transaction(self.mock_db):
+                self.assertEqual(transaction_depth(self.mock_db), 2)
+            self.mock_db.commit.assert_not_called()
+
+        self.mock_db.commit.assert_called_once()
+        self.assertEqual(self.statements(), ["SAVEPOINT uow_1", "RELEASE SAVEPOINT uow_1"])
+        self.assertEqual(transaction_depth(self.mock_db), 0)
+
+    def test_failed_inner_scope_rolls_back_to_its_savepoint(self):
+        with transaction(self.mock_db):
+            with self.assertRaises(ValueError):
+                with transaction(self.mock_db):
+                    raise ValueError("inner")
+
+        self.assertEqual(self.statements(), ["SAVEPOINT uow_1", "ROLLBACK TO SAVEPOINT uow_1"])
+        self.mock_db.rollback.assert_not_called()
+        self.mock_db.commit.assert_called_once()
+
+    def test_outer_failure_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            with transaction(self.mock_db):
+                raise ValueError("boom")
+        self.mock_db.rollback.assert_called_once()
+        self.mock_db.commit.assert_not_called()
+        self.assertEqual(transaction_depth(self.mock_db), 0)
+
+    def test_crud_writes_join_the_enclosing_unit_of_work(self):
+        """测试CRUD写操作在外层事务中不单独提交"""
+        self.mock_cursor.fetchone.side_effect = [(101,), (7,)]
+        with transaction(self.mock_db):
+            MaterialCRUD(self.mock_db).create_material("Dune", "Herbert", "Ace", 1, None, 9.9, 1)
+            InvoiceCRUD(self.mock_db).create(3, 1.5, "Late return")
+            self.mock_db.commit.assert_not_called()
+        self.mock_db.commit.assert_called_once()
+
+    def test_crud_write_alone_commits(self):
+        self.mock_cursor.fetchone.return_value = (7,)
+        self.assertEqual(InvoiceCRUD(self.mock_db).create(3, 1.5, "Late return"), (True, 7))
+        self.mock_db.commit.assert_called_once()
+
+    def test_autocommit_connection_gets_an_explicit_transaction(self):
+        """测试自动提交连接上的写操作在显式事务中执行，结束后恢复自动提交"""
+        self.mock_db.autocommit = True
+        with transaction(self.mock_db):
+            self.assertFalse(self.mock_db.autocommit)
+        self.mock_db.commit.assert_called_once()
+        self.assertTrue(self.mock_db.autocommit)
+
+        with self.assertRaises(RuntimeError):
+            with transaction(self.mock_db):
+                raise ValueError("boom")
+        self.mock_db.rollback.assert_called_once()
+        self.assertTrue(self.mock_db.autocommit)
+
+    def test_read_only_transaction(self):
+        self.mock_db.autocommit = True
+        with read_only_transaction(self.mock_db):
+            self.assertFalse(self.mock_db.autocommit)
+        self.assertEqual(self.statements(), ["SET TRANSACTION READ ONLY"])
+        self.mock_db.commit.assert_called_once()
+        self.assertTrue(self.mock_db.autocommit)
+
+    def test_read_only_transaction_joins_open_transaction(self):
+        with transaction(self.mock_db):
+            with read_only_transaction(self.mock_db):
+                pass
+        self.assertEqual(self.statements(), [])
+        self.mock_db.commit.assert_called_once()
+
+    def test_pipeline_is_a_no_op_on_psycopg2(self):
+        with transaction(self.mock_db, pipeline=True):
+            pass
+        self.mock_db.pipeline.assert_not_called()
+        self.mock_db.commit.assert_called_once()
+
+    def test_pipelined_scope_commits_inside_the_pipeline(self):
+        """测试流水线模式下COMMIT与语句一起发送，回滚在流水线关闭之后"""
+        events = []
+        self.mock_db.pipeline.return_value.__enter__.side_effect = lambda: events.append('open')
+        self.mock_db.pipeline.return_value.__exit__.side_effect = lambda *exc: events.append('close')
+        self.mock_db.commit.side_effect = lambda: events.append('commit')
+        self.mock_db.rollback.side_effect = lambda: events.append('rollback')
+
+        with patch.object(drivers, 'psycopg', MagicMock()), \
+                patch.object(drivers, 'is_psycopg3', return_value=True):
+            with transaction(self.mock_db, pipeline=True):
+                pass
+            self.assertEqual(events, ['open', 'commit', 'close'])
+
+            events.clear()
+            with self.assertRaises(RuntimeError):
+                with transaction(self.mock_db, pipeline=True):
+                    raise ValueError("boom")
+            self.assertEqual(events, ['open', 'close', 'rollback'])
+
+    def pipelined_write_failing_at_sync(self, failure):
+        """Nested CRUD write in a pipelined scope whose reply (read at the sync) is `failure`"""
+        events = []
+        exits = iter([failure, None])   # nested pipeline block first, then the outer one
+
+        def close(*exc):
+            events.append('sync')
+            error = next(exits)
+            if error is not None:
+                raise error
+
+        self.mock_db.pipeline.return_value.__enter__.side_effect = lambda: events.append('open')
+        self.mock_db.pipeline.return_value.__exit__.side_effect = close
+        self.mock_cursor.execute.side_effect = lambda sql, *params: events.append(
+            sql if 'SAVEPOINT' in sql else sql.split()[0])
+        self.mock_db.commit.side_effect = lambda: events.append('commit')
+
+        with transaction(self.mock_db, pipeline=True):
+            result = MaterialCRUD(self.mock_db).update_material(7, {'status': 2})
+        return result, events
+
+    def test_pipelined_nested_scope_syncs_at_its_end(self):
+        """测试流水线模式下嵌套作用域在结束时同步，写入失败在CRUD调用内返回"""
+        with patch.object(drivers, 'psycopg', MagicMock()), \
+                patch.object(drivers, 'is_psycopg3', return_value=True), \
+                patch.object(drivers, 'in_pipeline', side_effect=lambda conn: self.mock_db.pipeline.called):
+            # In a pipeline once the outermost scope has opened one
+            (success, message), events = self.pipelined_write_failing_at_sync(ValueError("duplicate key"))
+
+        self.assertFalse(success)
+        self.assertIn("duplicate key", message)
+        self.assertEqual(events, ['open', 'SAVEPOINT uow_1', 'open', 'UPDATE', 'sync',
+                                  'ROLLBACK TO SAVEPOINT uow_1', 'commit', 'sync'])
+
+    @unittest.skipUnless(psycopg, "psycopg 3 is not installed")
+    def test_psycopg3_pipelined_write_error_is_returned_by_the_crud_call(self):
+        self.mock_db = MagicMock(spec=psycopg.Connection)
+        self.mock_db.autocommit = False
+        self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_db.pgconn = MagicMock(pipeline_status=psycopg.pq.PipelineStatus.ON)
+        with patch.object(psycopg.Pipeline, 'is_supported', return_value=True):
+            (success, _), events = self.pipelined_write_failing_at_sync(
+                psycopg.errors.UniqueViolation("duplicate key"))
+
+        self.assertFalse(success)
+        self.assertLess(events.index('sync'), events.index('ROLLBACK TO SAVEPOINT uow_1'))
+        self.assertEqual(events[-2:], ['commit', 'sync'])
+
+    def test_after_transaction_runs_when_outermost_scope_ends(self):
+        calls = []
+        after_transaction(self.mock_db, lambda: calls.append('now'))
+        with transaction(self.mock_db):
+            with transaction(self.mock_db):
+                after_transaction(self.mock_db, lambda: calls.append('inner'))
+            self.assertEqual(calls, ['now'])
+        self.assertEqual(calls, ['now', 'inner'])
+
+        with self.assertRaises(RuntimeError):
+            with transaction(self.mock_db):
+                after_transaction(self.mock_db, lambda: calls.append('rolled back'))
+                raise ValueError("boom")
+        self.assertEqual(calls[-1], 'rolled back')
+
+    def test_abandoned_stream_rolls_back_before_restoring_autocommit(self):
+        """测试中途放弃的流式读取会回滚事务并恢复自动提交"""
+        conn = _StrictConnection([(i,) for i in range(10)])
+        rows = iter_rows(conn, "SELECT material_id FROM materials", batch_size=3)
+        self.assertEqual(next(rows)['material_id'], 0)
+        self.assertTrue(conn.in_transaction)
+
+        rows.close()    # GeneratorExit at the yield
+
+        self.assertEqual((conn.rollbacks, conn.commits), (1, 0))
+        self.assertFalse(conn.in_transaction)
+        self.assertTrue(conn.autocommit)
+        self.assertEqual(transaction_depth(conn), 0)
+
+    def test_connector_rejects_unknown_driver(self):
+        with self.assertRaises(ValueError):
+            drivers.connector('mysql', {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from CRUD.users_crud import UserCRUD
+from CRUD.reference_data import UserTypeInfo
 
 
 class TestUserCRUD(unittest.TestCase):
@@ -12,16 +13,19 @@ class TestUserCRUD(unittest.TestCase):
         self.mock_cursor = MagicMock()
         self.mock_db.cursor.return_value.__enter__.return_value = self.mock_cursor
 
+        # 用户类型信息来自参考数据缓存
+        patcher = patch('CRUD.users_crud.reference_data')
+        self.reference_data = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reference_data.user_type.return_value = UserTypeInfo(1, "Student", 5, 30, 0.5)
+
     def test_get_user_with_type_info(self):
         # 准备模拟数据 - 确保字段顺序与SQL查询一致
         mock_user_data = (
             101,  # user_id
             "林娟",  # name
             "lin@test.com",  # contact
-            1,  # user_type_id
-            "Student",  # type_name
-            5,  # max_borrowings
-            30  # max_borrowing_days
+            1  # user_type_id
         )
 
         # 正确配置fetchone返回值
@@ -29,9 +33,7 @@ class TestUserCRUD(unittest.TestCase):
 
         # 配置cursor.description以支持字典转换
         self.mock_cursor.description = [
-            ('user_id',), ('name',), ('contact',),
-            ('user_type_id',), ('type_name',),
-            ('max_borrowings',), ('max_borrowing_days',)
+            ('user_id',), ('name',), ('contact',), ('user_type_id',)
         ]
 
         # 执行测试
@@ -41,6 +43,8 @@ class TestUserCRUD(unittest.TestCase):
         self.assertEqual(user["user_id"], 101)
         self.assertEqual(user["name"], "林娟")
         self.assertEqual(user["type_name"], "Student")
+        self.assertEqual(user["max_borrowing_days"], 30)
+        self.assertNotIn("JOIN", self.mock_cursor.execute.call_args[0][0])
 
     def test_create_user_success(self):
         # 配置fetchone返回创建的user_id
@@ -52,6 +56,53 @@ class TestUserCRUD(unittest.TestCase):
         self.assertEqual(user_id, 101)
         self.mock_db.commit.assert_called_once()
 
+    def test_search_uses_token_query(self):
+        self.mock_cursor.fetchall.return_value = [(101, "林娟", 0.6)]
+        self.mock_cursor.description = [('user_id',), ('name',), ('rank',)]
+
+        users = self.crud.search("林娟")
+
+        self.assertEqual(users[0]["name"], "林娟")
+        params = self.mock_cursor.execute.call_args[0][1]
+        self.assertEqual(params, ("'林娟'", "%林娟%", None, None, 50))
+
+    def test_search_without_index_falls_back_to_substring_match(self):
+        """测试未执行迁移 0005 时退回按姓名子串和用户ID搜索，而不是返回空列表"""
+        self.mock_cursor.fetchone.return_value = (False,)
+        self.mock_cursor.fetchall.return_value = [(101, "林娟")]
+        self.mock_cursor.description = [('user_id',), ('name',)]
+
+        self.assertEqual(self.crud.search("101"), [{'user_id': 101, 'name': "林娟"}])
+        self.assertEqual(self.crud.search("林")[0]['name'], "林娟")
+
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertNotIn("search_vector", sql)
+        self.assertEqual(params, ("%林%", None, None, 50))
+        probes = [call for call in self.mock_cursor.execute.call_args_list if 'information_schema' in call[0][0]]
+        self.assertEqual(len(probes), 1)
+
+    def test_list_users_seeks_past_last_id(self):
+        """测试键集分页"""
+        self.mock_cursor.description = [('user_id',), ('name',), ('user_type_id',)]
+        self.mock_cursor.fetchall.return_value = [(101, "林娟", 1)]
+
+        page = self.crud.list_users(after_id=100, limit=1)
+
+        self.assertEqual(page[0]["type_name"], "Student")
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("u.user_id > %s", sql)
+        self.assertEqual(params, [100, 1])
+
+    def test_list_users_projection(self):
+        self.mock_cursor.description = [('user_id',), ('name',), ('user_type_id',)]
+        self.mock_cursor.fetchall.return_value = [(101, "林娟", 1)]
+
+        self.crud.list_users(fields=('name', 'type_name'))
+
+        sql = self.mock_cursor.execute.call_args[0][0]
+        self.assertIn("SELECT u.user_id, u.name, u.user_type_id\n", sql)
+        self.assertNotIn("contact", sql)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,110 @@
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+from SERVICES.catalog_index import CatalogIndex
+from SERVICES.material_service import MaterialService
+from CRUD.constants import MaterialStatus
+
+
+MATERIALS = [
+    {'material_id': 1, 'material_name': 'Introduction to Python', 'author': 'Mark Lutz',
+     'publisher': "O'Reilly", 'type_id': 1, 'status': MaterialStatus.AVAILABLE.value},
+    {'material_id': 2, 'material_name': 'Fluent Python', 'author': 'Luciano Ramalho',
+     'publisher': "O'Reilly", 'type_id': 1, 'status': MaterialStatus.BORROWED.value},
+    {'material_id': 3, 'material_name': 'Database Systems', 'author': 'Raghu Ramakrishnan',
+     'publisher': 'McGraw-Hill', 'type_id': 2, 'status': MaterialStatus.AVAILABLE.value},
+]
+
+
+class TestCatalogIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = CatalogIndex()
+        self.index.build(MATERIALS)
+
+    def test_and_or_queries(self):
+        """测试 AND / OR 查询"""
+        self.assertEqual([m['material_id'] for m in self.index.search("python lutz")], [1])
+        self.assertCountEqual([m['material_id'] for m in self.index.search("lutz database", mode='or')], [1, 3])
+        self.assertEqual(self.index.search("python cobol"), [])
+
+    def test_bm25_prefers_rarer_terms(self):
+        """测试 BM25 排序：稀有词得分更高"""
+        results = self.index.search("reilly ramalho", mode='or')
+        self.assertEqual(results[0]['material_id'], 2)
+
+    def test_filters_and_status_updates(self):
+        """测试状态过滤及借还事件的增量更新"""
+        available = MaterialStatus.AVAILABLE.value
+        self.assertEqual([m['material_id'] for m in self.index.search("python", status=available)], [1])
+
+        self.index.update_status(2, available)
+        self.assertCountEqual([m['material_id'] for m in self.index.search("python", status=available)], [1, 2])
+        self.assertEqual(self.index.search("python", type_id=2), [])
+
+    def test_add_and_remove(self):
+        """测试新增、修改和删除资料"""
+        self.index.add({'material_id': 4, 'material_name': 'Python Cookbook', 'author': 'David Beazley',
+                        'publisher': "O'Reilly", 'type_id': 1, 'status': 1})
+        self.index.add(dict(MATERIALS[0], material_name='Learning Perl'))
+        self.index.remove(3)
+
+        self.assertCountEqual([m['material_id'] for m in self.index.search("python")], [2, 4])
+        self.assertEqual([m['material_id'] for m in self.index.search("perl")], [1])
+        self.assertEqual(self.index.search("database"), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_results_are_copies(self):
+        result = self.index.search("database")[0]
+        result['status_text'] = 'AVAILABLE'
+        self.assertNotIn('status_text', self.index.get(3))
+
+    def test_cjk_titles(self):
+        """测试中文书名的二元分词检索"""
+        self.index.add({'material_id': 5, 'material_name': '数据库系统概论', 'author': '王珊',
+                        'publisher': '高等教育出版社', 'type_id': 1,
+                        'status': MaterialStatus.AVAILABLE.value})
+
+        self.assertEqual([m['material_id'] for m in self.index.search("数据库")], [5])
+        self.assertEqual([m['material_id'] for m in self.index.search("系统")], [5])
+        self.assertEqual([m['material_id'] for m in self.index.search("珊")], [5])
+        self.assertEqual(self.index.search("数据结构"), [])
+
+        self.index.remove(5)
+        self.assertEqual(self.index.search("数"), [])
+
+    def test_desk_window_follows_other_desks_changes(self):
+        """测试借阅台窗口根据其他借阅台的变更事件更新搜索索引"""
+        # Only the window's event handling runs; no Tk window is created
+        with patch.dict(sys.modules, {'guizero': MagicMock()}):
+            from GUI.Gui import LibraryBorrowSystem
+            window = MagicMock(catalog_loaded=True, user_trie_loaded=True)
+            apply = LibraryBorrowSystem.apply_change_event
+
+            apply(window, {'table': 'loans', 'op': 'UPDATE', 'id': 9, 'material_id': 7, 'user_id': 3})
+            window.reindex_material.assert_called_once_with(7)
+            apply(window, {'table': 'users', 'op': 'UPDATE', 'id': 3})
+            window.reindex_user.assert_called_once_with(3)
+            self.assertTrue(window.catalog_loaded and window.user_trie_loaded)
+
+            apply(window, {'table': 'materials', 'op': 'INSERT', 'rows': 500})
+            self.assertFalse(window.catalog_loaded)
+            self.assertTrue(window.user_trie_loaded)
+            window.fuzzy_search.invalidate.assert_called_with(users=False, materials=True)
+
+            apply(window, {'table': None, 'op': 'RESET'})
+            self.assertFalse(window.user_trie_loaded)
+            window.fuzzy_search.invalidate.assert_called_with(users=True, materials=True)
+
+    def test_material_service_uses_index(self):
+        """测试 MaterialService 使用内存索引而不是数据库"""
+        service = MaterialService(MagicMock(), catalog_index=self.index)
+        service.crud = MagicMock()
+
+        materials = service.search_materials("python")
+
+        self.assertEqual([m['material_id'] for m in materials], [1])
+        service.crud.search.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
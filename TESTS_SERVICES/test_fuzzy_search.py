@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import MagicMock
+from SERVICES.fuzzy_search import FuzzyIndex, FuzzySearchService, edit_distance
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FuzzyIndex()
+        self.index.build([(1, 'John Doe'), (2, 'Jane Smith'), (3, '林娟'), (4, 'Raghu Ramakrishnan')])
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("kitten", "sitting", 3), 3)
+        self.assertEqual(edit_distance("smith", "smiht", 2), 1)  # 相邻换位算一次编辑
+        self.assertEqual(edit_distance("abcdef", "uvwxyz", 2), 3)
+
+    def test_lookup_tolerates_typos(self):
+        """测试拼写错误容忍"""
+        self.assertEqual(self.index.lookup("Jhon"), [(1, 1)])
+        self.assertEqual(self.index.lookup("smiht jane"), [(2, 1)])
+        self.assertEqual(self.index.lookup("Ramakrisnan"), [(4, 1)])
+        self.assertEqual(self.index.lookup("林涓"), [(3, 1)])
+        self.assertEqual(self.index.lookup("Jxyz"), [])
+
+    def test_short_words_need_exact_match(self):
+        self.index.add(5, 'A B')
+        self.assertEqual(self.index.lookup("c"), [])
+        self.assertEqual(self.index.lookup("a"), [(5, 0)])
+
+    def test_incremental_add_and_remove(self):
+        """测试增量插入与删除"""
+        self.index.add(6, 'Jon Doe')
+        self.assertEqual(self.index.lookup("Jon"), [(6, 0), (1, 1)])
+
+        self.index.remove(1)
+        self.assertEqual(self.index.lookup("Jhon"), [(6, 1)])
+        self.assertEqual(len(self.index), 4)
+
+        self.index.add(6, 'Jane Doe')  # 重新索引已编辑的条目
+        self.assertEqual(self.index.lookup("Jhon"), [])
+
+    def test_service_fetches_suggestions_in_one_query(self):
+        service = FuzzySearchService(MagicMock())
+        service.user_crud = MagicMock()
+        service.user_crud.get_all_users.return_value = [
+            {'user_id': 1, 'name': 'John Doe'}, {'user_id': 2, 'name': 'Joan Doe'}]
+        service.user_crud.get_users_by_ids.return_value = {
+            1: {'user_id': 1, 'name': 'John Doe'}, 2: {'user_id': 2, 'name': 'Joan Doe'}}
+
+        users = service.suggest_users("Jon")
+
+        self.assertEqual([u['user_id'] for u in users], [1, 2])
+        service.user_crud.get_users_by_ids.assert_called_once_with([1, 2])
+
+    def test_invalidate_reloads_on_next_suggestion(self):
+        service = FuzzySearchService(MagicMock())
+        service.user_crud = MagicMock()
+        service.user_crud.get_all_users.return_value = [{'user_id': 1, 'name': 'John Doe'}]
+        service.user_crud.get_users_by_ids.return_value = {}
+
+        service.suggest_users("Jon")
+        service.suggest_users("Jon")
+        service.invalidate(materials=False)
+        service.suggest_users("Jon")
+
+        self.assertEqual(service.user_crud.get_all_users.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
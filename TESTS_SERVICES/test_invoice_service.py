@@ -33,16 +33,16 @@ class TestInvoiceService(unittest.TestCase):
 
     def test_get_user_invoices(self):
         """测试获取用户发票列表"""
-        test_invoices = [{'invoice_id': 1, 'amount': 10.0}]
-        self.mock_invoice_crud.get_unpaid_by_user.return_value = test_invoices
-        self.mock_payment_crud.get_by_invoice.return_value = [
-            {'amount': 5.0}, {'amount': 3.0}
-        ]
+        test_invoices = [{'invoice_id': 1, 'amount': 10.0, 'paid_amount': 8.0,
+                          'outstanding_amount': 2.0, 'payment_status': 'Unpaid'}]
+        self.mock_invoice_crud.get_by_user.return_value = test_invoices
 
         invoices = self.service.get_user_invoices(1)
 
         self.assertEqual(len(invoices), 1)
         self.assertEqual(invoices[0]['outstanding_amount'], 2.0)
+        self.mock_invoice_crud.get_by_user.assert_called_once_with(1, include_paid=False)
+        self.mock_payment_crud.get_by_invoice.assert_not_called()
 
 
 if __name__ == '__main__':
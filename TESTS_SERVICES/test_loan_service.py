@@ -1,5 +1,7 @@
+import sys
 import unittest
-from unittest.mock import MagicMock
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 from SERVICES.loan_service import LoanService
 from CRUD.constants import MaterialStatus
 
@@ -39,5 +41,70 @@ class TestLoanService(unittest.TestCase):
         self.assertFalse(success)
         self.assertEqual(message, "资料当前不可借阅")
 
+    def test_get_overdue_summary_single_query(self):
+        self.loan_service.loan_crud._has_overdue_table = True
+        mock_cursor = MagicMock()
+        self.mock_db.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.description = [('user_id',), ('name',), ('overdue_count',),
+                                   ('oldest_due_date',), ('accrued_fee',)]
+        mock_cursor.fetchall.return_value = [(1, "Alice", 2, "2025-01-01", 3.5),
+                                             (2, "Bob", 1, "2025-02-01", 0.5)]
+
+        summary = self.loan_service.get_overdue_summary()
+
+        self.assertEqual(len(summary), 2)
+        self.assertEqual(summary[0]['overdue_count'], 2)
+        mock_cursor.execute.assert_called_once()
+        sql = mock_cursor.execute.call_args[0][0]
+        self.assertIn("GROUP BY u.user_id", sql)
+        self.assertRegex(sql, r"SUM\(\(CURRENT_DATE - \w+\.return_date\) \* t\.late_fee_per_day\)")
+        self.assertIn("FROM overdue_loans", sql)
+
+    def test_overdue_queries_fall_back_to_loans_without_migration(self):
+        """测试未执行迁移 0003 时逾期查询直接关联 loans 表"""
+        self.loan_service.loan_crud._has_overdue_table = False
+        mock_cursor = MagicMock()
+        self.mock_db.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.description = [('user_id',)]
+        mock_cursor.fetchall.return_value = []
+
+        self.loan_service.get_overdue_summary()
+        self.loan_service.get_overdue_loans_by_user(3)
+
+        for call in mock_cursor.execute.call_args_list:
+            self.assertIn("FROM loans l", call[0][0])
+            self.assertNotIn("overdue_loans", call[0][0])
+        self.assertEqual(mock_cursor.execute.call_args[0][1], (3,))
+
+    def test_overdue_loans_by_user_reads_precomputed_set(self):
+        self.loan_service.loan_crud._has_overdue_table = True
+        mock_cursor = MagicMock()
+        self.mock_db.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.description = [('loan_id',)]
+        mock_cursor.fetchall.return_value = [(9,)]
+
+        self.assertEqual(self.loan_service.get_overdue_loans_by_user(3), [{'loan_id': 9}])
+        sql, params = mock_cursor.execute.call_args[0]
+        self.assertIn("FROM overdue_loans o", sql)
+        self.assertIn("AND o.user_id = %s", sql)
+        self.assertEqual(params, [3, 3])
+
+    def test_overdue_user_list_uses_only_the_summary(self):
+        """测试逾期用户列表只调用汇总查询，不再逐个用户查询"""
+        service = MagicMock()
+        service.get_overdue_summary.return_value = [
+            {'user_id': 1, 'name': "Alice", 'overdue_count': 2, 'oldest_due_date': "2025-01-01", 'accrued_fee': 3.5}]
+        window = SimpleNamespace(loan_service=service, user_crud=MagicMock(), overdue_user_listbox=MagicMock())
+
+        # Only the window's list logic runs; no Tk window is created
+        with patch.dict(sys.modules, {'guizero': MagicMock()}):
+            from GUI.loan import OverdueGUI
+            OverdueGUI.load_overdue_users(window)
+
+        self.assertEqual(service.method_calls, [('get_overdue_summary', (), {})])
+        window.user_crud.get_user.assert_not_called()
+        window.overdue_user_listbox.append.assert_called_once()
+        self.assertIn("Alice (ID: 1)", window.overdue_user_listbox.append.call_args[0][0])
+
 if __name__ == "__main__":
     unittest.main()
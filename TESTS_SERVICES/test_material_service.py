@@ -31,6 +31,19 @@ class TestMaterialService(unittest.TestCase):
         self.assertEqual(material['status_text'], 'AVAILABLE')
         self.mock_crud.get_material.assert_called_once_with(1)
 
+    def test_search_materials_uses_database_search(self):
+        """测试关键字搜索走数据库排序检索"""
+        self.mock_crud.search.return_value = [
+            {'material_id': 1, 'status': MaterialStatus.AVAILABLE.value}
+        ]
+
+        materials = self.service.search_materials("python", material_type=1)
+
+        self.assertEqual(materials[0]['status_text'], 'AVAILABLE')
+        self.mock_crud.search.assert_called_once_with(
+            "python", type_id=1, status=MaterialStatus.AVAILABLE.value, limit=50)
+        self.mock_crud.get_available_materials.assert_not_called()
+
     def test_update_material_status_invalid(self):
         """测试更新无效资料状态"""
         success, msg = self.service.update_material_status(1, 99)
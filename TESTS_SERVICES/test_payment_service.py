@@ -41,6 +41,46 @@ class TestPaymentService(unittest.TestCase):
         self.assertIn("5001", result)
         self.mock_invoice_crud.mark_as_paid.assert_called_once_with(1)
 
+    def test_failed_payment_step_commits_no_invoice(self):
+        """测试缴费中途失败时整个事务回滚，不会留下孤立的发票"""
+        self.service.loan_crud = MagicMock()
+        self.service.material_crud = MagicMock()
+        self.service.loan_crud._get_loan_info.return_value = {'material_id': 7, 'material_name': "Dune"}
+        self.mock_conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (3,)
+        self.service.calculate_overdue_fee = MagicMock(return_value=(True, 5.0, ""))
+        self.mock_invoice_crud.create.return_value = (True, 9)
+        self.mock_invoice_crud.get_invoice.return_value = {'invoice_id': 9, 'status': InvoiceStatus.UNPAID.value}
+        self.mock_payment_crud.record.return_value = (False, "Card declined")
+
+        success, message = self.service.pay_overdue_fee(1)
+
+        self.assertFalse(success)
+        self.assertIn("Card declined", message)
+        self.mock_invoice_crud.create.assert_called_once()
+        self.mock_conn.commit.assert_not_called()
+        self.mock_conn.rollback.assert_called_once()
+        self.service.loan_crud.update_loan.assert_not_called()
+
+    def test_failed_status_update_rolls_back_payment(self):
+        """测试更新借阅记录失败时已记录的支付一并回滚"""
+        self.service.loan_crud = MagicMock()
+        self.service.material_crud = MagicMock()
+        self.service.loan_crud._get_loan_info.return_value = {'material_id': 7, 'material_name': "Dune"}
+        self.mock_conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (3,)
+        self.service.calculate_overdue_fee = MagicMock(return_value=(True, 5.0, ""))
+        self.mock_invoice_crud.create.return_value = (True, 9)
+        self.mock_invoice_crud.get_invoice.return_value = {'invoice_id': 9, 'status': InvoiceStatus.UNPAID.value}
+        self.mock_payment_crud.record.return_value = (True, 5001)
+        self.mock_payment_crud.get_total_paid.return_value = 5.0
+        self.service.loan_crud.update_loan.return_value = (False, "Failed to update borrowing record")
+
+        success, _ = self.service.pay_overdue_fee(1)
+
+        self.assertFalse(success)
+        self.mock_conn.commit.assert_not_called()
+        self.mock_conn.rollback.assert_called_once()
+        self.service.material_crud.update_material.assert_not_called()
+
     def test_get_invoice_payments(self):
         """测试获取发票支付记录"""
         test_payments = [{'payment_id': 1, 'amount': 5.0}]
@@ -0,0 +1,39 @@
+import unittest
+from SERVICES.prefix_trie import PrefixTrie
+
+
+class TestPrefixTrie(unittest.TestCase):
+    def setUp(self):
+        self.trie = PrefixTrie()
+        self.trie.build([(1, "1 John Doe"), (2, "2 Joan Dale"), (3, "3 Jo Smith"), (12, "12 数据库系统概论")])
+
+    def test_prefix_search_shortest_first(self):
+        """测试前缀匹配：较短的补全优先"""
+        self.assertEqual(self.trie.search("jo"), [3, 2, 1])
+        self.assertEqual(self.trie.search("JOH"), [1])
+        self.assertEqual(self.trie.search("xyz"), [])
+
+    def test_multiple_words_and_ids(self):
+        self.assertEqual(self.trie.search("jo d"), [2, 1])
+        self.assertEqual(self.trie.search("1"), [1, 12])
+
+    def test_cjk_title_infix(self):
+        """测试中文书名中间位置的前缀"""
+        self.assertEqual(self.trie.search("系统"), [12])
+        self.assertEqual(self.trie.search("数据"), [12])
+
+    def test_limit(self):
+        self.assertEqual(len(self.trie.search("jo", limit=2)), 2)
+
+    def test_insert_and_remove(self):
+        self.trie.insert(1, "1 Jack Doe")
+        self.assertEqual(self.trie.search("john"), [])
+        self.assertEqual(self.trie.search("jack"), [1])
+
+        self.trie.remove(3)
+        self.assertEqual(self.trie.search("smith"), [])
+        self.assertEqual(len(self.trie), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,6 +45,23 @@ class TestReservationService(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual(msg, "取消成功")
 
+    def test_get_user_reservations_single_material_lookup(self):
+        """测试预约列表只查询一次资料"""
+        self.mock_reservation_crud.get_active_by_user.return_value = [
+            {'reservation_id': 1, 'material_id': 10},
+            {'reservation_id': 2, 'material_id': 11},
+        ]
+        self.mock_material_crud.get_materials_by_ids.return_value = {
+            10: {'material_id': 10, 'material_name': 'Book A'},
+            11: {'material_id': 11, 'material_name': 'Book B'},
+        }
+
+        reservations = self.service.get_user_reservations(1)
+
+        self.mock_material_crud.get_materials_by_ids.assert_called_once()
+        self.mock_material_crud.get_material.assert_not_called()
+        self.assertEqual(reservations[1]['material_details']['material_name'], 'Book B')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
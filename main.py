@@ -20,6 +20,7 @@ class LibraryApp:
 
     def return_to_main(self):
         self.overdue_app.app.destroy()
+        self.overdue_app.db.disconnect()
         self.app.app.show()
 
 